@@ -1,17 +1,22 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from typing import Dict, Optional
 import json
-import cv2
-import numpy as np
 import base64
-from ..core.watermark import WatermarkProcessor
 import asyncio
 import time
-import psutil
 import logging
+from ..utils.metrics import sampler, FRAMES_CAPTURED, FRAMES_WATERMARKED, FRAMES_ENCODED, FRAMES_SENT, BYTES_SENT
 
 router = APIRouter()
-processor = WatermarkProcessor()
+_processor = None
+
+def get_processor():
+    """取得浮水印處理器，第一次使用時才載入 OpenCV 並建立實例"""
+    global _processor
+    if _processor is None:
+        from ..core.watermark import WatermarkProcessor
+        _processor = WatermarkProcessor()
+    return _processor
 
 # 用於追蹤活動的 WebSocket 連接
 active_connections: Dict[str, WebSocket] = {}
@@ -49,6 +54,8 @@ state = WatermarkState()
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    processor = get_processor()
+    sampler.start()
     client_id = str(id(websocket))
     active_connections[client_id] = websocket
     
@@ -76,13 +83,14 @@ async def websocket_endpoint(websocket: WebSocket):
                     state.process_interval = command["process_interval"]
                     processor.set_process_interval(state.process_interval)
                     
-            # 發送性能數據
+            # 發送性能數據（由背景取樣器提供，不在此呼叫 psutil）
             if state.is_processing:
+                snapshot = sampler.snapshot
                 performance_data = {
                     "type": "performance",
-                    "fps": round(state.get_fps(), 1),
-                    "cpu_usage": psutil.cpu_percent(),
-                    "memory_usage": round(psutil.Process().memory_info().rss / 1024 / 1024, 1),  # MB
+                    "fps": snapshot["fps"],
+                    "cpu_usage": snapshot["cpu_usage"],
+                    "memory_usage": snapshot["memory_usage"],  # MB
                     "latency": round(time.time() * 1000) % 100  # 模擬延遲數據
                 }
                 await websocket.send_json(performance_data)
@@ -99,6 +107,10 @@ async def websocket_endpoint(websocket: WebSocket):
 @router.websocket("/stream")
 async def video_stream(websocket: WebSocket):
     await websocket.accept()
+    import cv2
+    processor = get_processor()
+    sampler.start()
+    client = str(id(websocket))
     
     try:
         while True:
@@ -108,17 +120,21 @@ async def video_stream(websocket: WebSocket):
                 
             # 擷取並處理影格
             frame = processor.capture_screen()
+            FRAMES_CAPTURED.inc()
             processed_frame, was_processed = processor.process_frame(
                 frame, 
                 state.watermark_text,
                 state.is_visible
             )
+            if was_processed:
+                FRAMES_WATERMARKED.inc(mode="visible" if state.is_visible else "lsb")
             
             # 更新幀計數
             state.update_frame_count()
             
             # 轉換為 JPEG 格式
             _, buffer = cv2.imencode('.jpg', processed_frame)
+            FRAMES_ENCODED.inc()
             
             # 轉換為 base64 字串
             frame_data = base64.b64encode(buffer).decode('utf-8')
@@ -129,6 +145,8 @@ async def video_stream(websocket: WebSocket):
                 "data": frame_data,
                 "processed": was_processed
             })
+            FRAMES_SENT.inc(client=client)
+            BYTES_SENT.inc(len(frame_data), client=client)
             
             # 控制更新頻率
             await asyncio.sleep(1/30)  # 限制最大 FPS 為 30
@@ -136,4 +154,7 @@ async def video_stream(websocket: WebSocket):
     except WebSocketDisconnect:
         pass
     except Exception as e:
-        logging.error(f"Video stream error: {str(e)}") 
\ No newline at end of file
+        logging.error(f"Video stream error: {str(e)}")
+    finally:
+        FRAMES_SENT.remove(client=client)
+        BYTES_SENT.remove(client=client) 
\ No newline at end of file
@@ -0,0 +1,370 @@
+"""
+浮水印解碼模組
+
+只依賴 NumPy 的解碼器，涵蓋本程式寫入的所有浮水印版面：
+標準 LSB、冗餘 LSB、時間分散區塊、頻率域（區塊 DCT）、動態鑑識浮水印、Reed-Solomon 錯誤更正、
+多位元平面 LSB（版面由標頭決定），以及 WatermarkProcessor 舊版的三通道 LSB。時間分散浮水印需要多個影格，
+以這裡匯出的 read_chunk、TemporalDecoder 與 decode_frames 收集。
+
+不會匯入 OpenCV、mss、pygetwindow，也不會開啟螢幕擷取資源，
+可直接在無桌面的 Linux 主機或 fork 出來的驗證工作行程中使用。
+讀圖由 load_image 處理：未壓縮的 BMP（截圖的格式）與 .npy 以 NumPy 讀取，
+其他格式在 OpenCV 或 Pillow 可用時才使用。
+
+使用方式：
+    python -m app.core.decoder screen_shot/watermarked_20250101_120000.bmp
+"""
+import argparse
+import json
+import os
+import sys
+import zlib
+import numpy as np
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.bitplane_payload import read_bitplane_text
+from ..utils.dct_watermark import BLOCK, KERNEL, MAX_PAYLOAD_BYTES as DCT_MAX_PAYLOAD_BYTES, PERIOD_BITS
+from ..utils.dynamic_payload import format_payload, read_payload, read_payload_redundant
+from ..utils.ecc_payload import prefers_repetition, read_ecc_text
+from ..utils.lsb_layout import REDUNDANCY, redundancy_positions
+from ..utils.temporal_payload import TemporalDecoder, decode_frames, read_chunk
+
+# 單一浮水印最多解析的字元數（避免在雜訊上無限讀取）
+MAX_PAYLOAD_CHARS = 256
+
+# 冗餘模式中投票近乎一致的位元比例下限
+MIN_AGREEMENT = 0.9
+
+# BGR 轉灰階的係數（與 OpenCV 的 COLOR_BGR2GRAY 相同）
+GRAY_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def _bits_to_text(bits: np.ndarray) -> Optional[str]:
+    """
+    將位元陣列轉換為文字，遇到結束標記（0x00）即停止
+
+    Args:
+        bits: 0/1 組成的位元陣列
+
+    Returns:
+        Optional[str]: 解出的文字，若沒有結束標記或含非 ASCII 可列印字元則返回 None
+    """
+    data = np.packbits(bits[:len(bits) // 8 * 8].astype(np.uint8))
+    end = np.flatnonzero(data == 0)
+    if len(end) == 0 or end[0] == 0:
+        return None
+    text = data[:end[0]].tobytes().decode('latin-1')
+    if not (text.isascii() and text.isprintable()):
+        return None
+    return text
+
+
+def extract_lsb_text(frame: np.ndarray) -> Optional[str]:
+    """
+    提取標準 LSB 浮水印（藍色通道、由左上角逐像素寫入）
+
+    Args:
+        frame: BGR 影像
+
+    Returns:
+        Optional[str]: 浮水印文字，失敗則返回 None
+    """
+    count = (MAX_PAYLOAD_CHARS + 1) * 8
+    blue = frame[:, :, 0].reshape(-1)[:count]
+    return _bits_to_text(blue & 1)
+
+
+def extract_redundant_text(frame: np.ndarray) -> Optional[str]:
+    """
+    提取冗餘 LSB 浮水印，每個位元以多數決還原
+
+    Args:
+        frame: BGR 影像
+
+    Returns:
+        Optional[str]: 浮水印文字，失敗則返回 None
+    """
+    positions = redundancy_positions(frame.shape[:2], (MAX_PAYLOAD_CHARS + 1) * 8 * REDUNDANCY)
+    positions = positions[positions < frame.size]
+    usable = len(positions) // REDUNDANCY * REDUNDANCY
+    votes = (frame.reshape(-1)[positions[:usable]] & 1).reshape(-1, REDUNDANCY).sum(axis=1)
+    bits = (votes * 2 > REDUNDANCY).astype(np.uint8)
+    text = _bits_to_text(bits)
+    if text is None:
+        return None
+    # 真正的浮水印幾乎每個位元都全票一致，雜訊則呈二項分布
+    used = votes[:(len(text) + 1) * 8]
+    agreement = np.mean((used <= 1) | (used >= REDUNDANCY - 1))
+    return text if agreement >= MIN_AGREEMENT else None
+
+
+def extract_dct(frame: np.ndarray) -> Optional[str]:
+    """
+    提取區塊 DCT 浮水印
+
+    係數差值是亮度的線性函數，以 NumPy 計算浮點灰階即可；
+    行程已載入 OpenCV 時（例如錄影掃描）改用較快的 cvtColor，不會為此額外匯入。
+
+    Args:
+        frame: BGR 影像（可為經過 JPEG 或影片壓縮的畫面）
+
+    Returns:
+        Optional[str]: 浮水印文字，檢查碼不符則返回 None
+    """
+    rows, cols = frame.shape[0] // BLOCK, frame.shape[1] // BLOCK
+    if rows * cols < PERIOD_BITS:
+        return None
+    cropped = frame[:rows * BLOCK, :cols * BLOCK, :3]
+    cv2 = sys.modules.get('cv2')
+    if cv2 is not None:
+        gray = cv2.cvtColor(np.ascontiguousarray(cropped), cv2.COLOR_BGR2GRAY)
+    else:
+        gray = cropped.astype(np.float32) @ GRAY_WEIGHTS
+    blocks = gray.reshape(rows, BLOCK, cols, BLOCK).swapaxes(1, 2).reshape(rows * cols, -1)
+    diff = blocks.astype(np.float32) @ KERNEL
+
+    # 同一位元的所有區塊差值加總後取正負號
+    usable = len(diff) // PERIOD_BITS * PERIOD_BITS
+    score = diff[:usable].reshape(-1, PERIOD_BITS).sum(axis=0)
+    remainder = len(diff) - usable
+    score[:remainder] += diff[usable:]
+    framed = np.packbits((score > 0).astype(np.uint8)).tobytes()
+
+    length = framed[0]
+    if length == 0 or length > DCT_MAX_PAYLOAD_BYTES:
+        return None
+    body = framed[:length + 1]
+    if zlib.crc32(body) & 0xFFFF != int.from_bytes(framed[length + 1:length + 3], 'big'):
+        return None
+    text = body[1:].decode('latin-1')
+    return text if text.isprintable() else None
+
+
+def extract_dynamic_text(frame: np.ndarray) -> Optional[str]:
+    """
+    提取標準版面的動態鑑識浮水印
+
+    Args:
+        frame: BGR 影像
+
+    Returns:
+        Optional[str]: 「裝置#計數@時間」，失敗則返回 None
+    """
+    payload = read_payload(frame)
+    return format_payload(payload) if payload else None
+
+
+def extract_dynamic_redundant_text(frame: np.ndarray) -> Optional[str]:
+    """
+    提取冗餘版面的動態鑑識浮水印
+
+    Args:
+        frame: BGR 影像
+
+    Returns:
+        Optional[str]: 「裝置#計數@時間」，失敗則返回 None
+    """
+    payload = read_payload_redundant(frame)
+    return format_payload(payload) if payload else None
+
+
+def extract_ecc_text(frame: np.ndarray) -> Optional[str]:
+    """
+    提取標準版面的 Reed-Solomon 錯誤更正浮水印
+
+    Args:
+        frame: BGR 影像
+
+    Returns:
+        Optional[str]: 浮水印文字，無法修正則返回 None
+    """
+    return read_ecc_text(frame)
+
+
+def extract_ecc_redundant_text(frame: np.ndarray) -> Optional[str]:
+    """
+    提取分散版面的 Reed-Solomon 錯誤更正浮水印
+
+    極短的 ASCII 文字嵌入時改用冗餘 LSB（見 prefers_repetition），讀不到錯誤更正標頭時也嘗試冗餘 LSB，
+    只接受符合該條件的文字。
+
+    Args:
+        frame: BGR 影像
+
+    Returns:
+        Optional[str]: 浮水印文字，無法修正則返回 None
+    """
+    text = read_ecc_text(frame, redundant=True)
+    if text is None:
+        text = extract_redundant_text(frame)
+        if not text or not prefers_repetition(text):
+            return None
+    return text
+
+
+def extract_bitplane_text(frame: np.ndarray) -> Optional[str]:
+    """
+    提取多位元平面 LSB 浮水印，位元數、通道與重複次數由畫面開頭的標頭決定
+
+    Args:
+        frame: BGR 影像
+
+    Returns:
+        Optional[str]: 浮水印文字，標頭不符或檢查碼錯誤則返回 None
+    """
+    return read_bitplane_text(frame)
+
+
+def extract_legacy_lsb(frame: np.ndarray, length: int) -> str:
+    """
+    提取 WatermarkProcessor 舊版 LSB 浮水印（依序寫入 B、G、R 三個通道，沒有結束標記）
+
+    Args:
+        frame: BGR 影像
+        length: 浮水印文字長度
+
+    Returns:
+        str: 提取出的浮水印文字
+    """
+    bits = frame.reshape(-1)[:length * 8] & 1
+    return np.packbits(bits).tobytes()[:length].decode('latin-1')
+
+
+# 單一影格即可解出的解碼器，依成本由低到高排列
+EXTRACTORS: Dict[str, Callable[[np.ndarray], Optional[str]]] = {
+    'lsb': extract_lsb_text,
+    'bitplane': extract_bitplane_text,
+    'dynamic': extract_dynamic_text,
+    'ecc': extract_ecc_text,
+    'dct': extract_dct,
+    'redundant': extract_redundant_text,
+    'dynamic_redundant': extract_dynamic_redundant_text,
+    'ecc_redundant': extract_ecc_redundant_text,
+}
+
+
+def decode(frame: np.ndarray, modes: Optional[List[str]] = None) -> Optional[Tuple[str, str]]:
+    """
+    依序嘗試解碼器，返回第一個成功的結果
+
+    Args:
+        frame: BGR 影像
+        modes: 使用的解碼器，預設為全部
+
+    Returns:
+        Optional[Tuple[str, str]]: (模式, 浮水印文字)，未偵測到則返回 None
+    """
+    for mode in modes or EXTRACTORS:
+        text = EXTRACTORS[mode](frame)
+        if text:
+            return mode, text
+    return None
+
+
+def _read_bmp(path: str) -> Optional[np.ndarray]:
+    """以 NumPy 讀取未壓縮的 24／32 位元 BMP，其他 BMP 變體返回 None"""
+    header = np.fromfile(path, dtype=np.uint8, count=54)
+    if len(header) < 54 or header[:2].tobytes() != b'BM':
+        return None
+    offset = int(header[10:14].view('<u4')[0])
+    width = int(header[18:22].view('<i4')[0])
+    height = int(header[22:26].view('<i4')[0])
+    bpp = int(header[28:30].view('<u2')[0])
+    compression = int(header[30:34].view('<u4')[0])
+    if bpp not in (24, 32) or compression not in (0, 3) or width <= 0:
+        return None
+    channels = bpp // 8
+    stride = (width * channels + 3) & ~3
+    data = np.fromfile(path, dtype=np.uint8, offset=offset, count=stride * abs(height))
+    image = data.reshape(abs(height), stride)[:, :width * channels].reshape(abs(height), width, channels)
+    # 高度為正表示由下往上存放
+    if height > 0:
+        image = image[::-1]
+    return np.ascontiguousarray(image[:, :, :3])
+
+
+def load_image(path: str) -> np.ndarray:
+    """
+    讀取 BGR 影像
+
+    未壓縮的 BMP 與 .npy 只使用 NumPy；其他格式依序嘗試 OpenCV 與 Pillow。
+
+    Args:
+        path: 圖檔路徑
+
+    Returns:
+        np.ndarray: BGR 影像
+    """
+    if path.lower().endswith('.npy'):
+        return np.load(path)
+    if path.lower().endswith('.bmp'):
+        image = _read_bmp(path)
+        if image is not None:
+            return image
+    try:
+        import cv2
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is not None:
+            return image
+    except ImportError:
+        pass
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            return np.ascontiguousarray(np.asarray(img.convert('RGB'))[:, :, ::-1])
+    except ImportError:
+        raise ValueError(f"無法讀取圖檔（需要 OpenCV 或 Pillow）: {path}")
+
+
+def decode_files(paths: Iterable[str], modes: Optional[List[str]] = None) -> List[Dict]:
+    """
+    解碼多個圖檔；時間分散浮水印以檔案順序視為連續影格收集
+
+    Args:
+        paths: 圖檔路徑
+        modes: 單幀解碼器，預設為全部
+
+    Returns:
+        List[Dict]: 每個檔案的結果，temporal 欄位為收齊區塊時重建的文字
+    """
+    results = []
+    temporal = TemporalDecoder()
+    for path in paths:
+        frame = load_image(path)
+        found = decode(frame, modes)
+        results.append({
+            "path": path,
+            "mode": found[0] if found else None,
+            "payload": found[1] if found else None,
+            "temporal": temporal.feed(frame),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解碼圖檔中的浮水印（只需要 NumPy）")
+    parser.add_argument("paths", nargs="+", help="圖檔路徑")
+    parser.add_argument("--modes", default=",".join(EXTRACTORS), help="解碼模式，以逗號分隔")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args()
+
+    modes = [mode for mode in args.modes.split(",") if mode]
+    for mode in modes:
+        if mode not in EXTRACTORS:
+            parser.error(f"不支援的解碼模式: {mode}")
+    results = decode_files(args.paths, modes)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    for result in results:
+        name = os.path.basename(result["path"])
+        if result["payload"]:
+            print(f"{name}: [{result['mode']}] {result['payload']}")
+        else:
+            print(f"{name}: 未偵測到浮水印")
+        if result["temporal"]:
+            print(f"  時間分散浮水印: {result['temporal']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,5 @@
 import cv2
 import numpy as np
-import mss
-import pygetwindow as gw
 from typing import Optional, Tuple, Dict
 import socket
 
@@ -10,11 +8,19 @@ class WatermarkProcessor:
         """初始化浮水印處理器"""
         self.device_name = socket.gethostname()
         self.watermark = self.device_name
-        self.sct = mss.mss()
+        self._sct = None  # 第一次擷取時才建立
         self.is_processing = False
         self.frame_counter = 0
         self.process_interval = 5  # 預設每5幀處理一次
 
+    @property
+    def sct(self):
+        """螢幕擷取物件（延遲建立，可由 LSB_CAPTURE_SOURCE 改用合成畫面）"""
+        if self._sct is None:
+            from ..utils.synthetic_capture import open_capture
+            self._sct = open_capture()
+        return self._sct
+
     def capture_screen(self) -> np.ndarray:
         """擷取螢幕畫面
         
@@ -129,25 +135,8 @@ class WatermarkProcessor:
         Returns:
             str: 提取出的浮水印文字
         """
-        binary_data = ""
-        for i in range(frame.shape[0]):
-            for j in range(frame.shape[1]):
-                for k in range(3):
-                    binary_data += str(frame[i, j, k] & 1)
-                    if len(binary_data) >= length * 8:
-                        break
-                if len(binary_data) >= length * 8:
-                    break
-            if len(binary_data) >= length * 8:
-                break
-                
-        # 將二進制轉換回文字
-        extracted_text = ""
-        for i in range(0, length * 8, 8):
-            byte = binary_data[i:i+8]
-            extracted_text += chr(int(byte, 2))
-            
-        return extracted_text
+        from .decoder import extract_legacy_lsb
+        return extract_legacy_lsb(frame, length)
 
     def set_process_interval(self, interval: int) -> None:
         """設定處理間隔
@@ -159,4 +148,6 @@ class WatermarkProcessor:
 
     def cleanup(self) -> None:
         """清理資源"""
-        self.sct.close() 
\ No newline at end of file
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None 
\ No newline at end of file
@@ -1,14 +1,21 @@
 """
 FastAPI 主應用程式
+
+OpenCV、NumPy、mss 與 psutil 都在第一次使用對應功能時才載入，
+匯入本模組與啟動伺服器不需要螢幕，也不會建立擷取資源。
 """
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import uvicorn
 from pathlib import Path
 import logging
-from .routers import stream
+from .routers import embed, stream
+from .utils.metrics import registry, sampler
 
 # 設定日誌
 logging.basicConfig(
@@ -24,6 +31,27 @@ templates = Jinja2Templates(directory=current_dir / "templates")
 
 # 註冊路由
 app.include_router(stream.router, prefix="/api")
+app.include_router(embed.router, prefix="/api")
+
+@app.on_event("startup")
+async def log_startup_time():
+    logging.info(f"應用程式啟動完成，耗時 {(time.perf_counter() - _import_started) * 1000:.1f} ms")
+
+@app.on_event("startup")
+async def start_warm_up():
+    # 在背景載入影像處理模組並建立目前設定的快取，第一次串流不必等待
+    stream.start_warm_up()
+
+@app.on_event("shutdown")
+async def stop_metrics_sampler():
+    sampler.stop()
+    embed.close_embed_service()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 格式的效能指標"""
+    sampler.start()
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
@@ -0,0 +1,236 @@
+"""
+影像嵌入路由模組
+
+POST /api/embed 接受單張影像（請求本文即影像檔）或 multipart/form-data 批次上傳，
+批次結果以 multipart/mixed 或 zip 串流回傳，每張影像處理完就送出。
+"""
+import secrets
+import zipfile
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart 0.0.6（requirements.txt 指定的版本）
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from ..utils.bitplane_layout import DEFAULT_BITS, DEFAULT_CHANNELS
+from ..utils.embed_service import (
+    EmbedService, MAX_IMAGE_BYTES, OUTPUT_FORMATS, check_options
+)
+from ..utils.metrics import EMBED_IMAGES
+
+router = APIRouter()
+_embed_service = None
+
+
+def get_embed_service() -> EmbedService:
+    """
+    取得共用的嵌入服務
+
+    Returns:
+        EmbedService: 嵌入服務
+    """
+    global _embed_service
+    if _embed_service is None:
+        _embed_service = EmbedService()
+    return _embed_service
+
+
+def close_embed_service():
+    """關閉嵌入服務的工作行程（伺服器關閉時呼叫）"""
+    if _embed_service is not None:
+        _embed_service.close()
+
+
+async def _iter_uploads(request: Request, boundary: bytes) -> AsyncIterator[Tuple[str, Optional[bytes]]]:
+    """
+    邊接收邊解析 multipart/form-data，每收完一個檔案欄位就產生一次
+
+    Yields:
+        Tuple[str, Optional[bytes]]: (檔名, 檔案內容)，超過 MAX_IMAGE_BYTES 的檔案內容為 None；
+        沒有檔名的一般欄位會略過
+    """
+    parts: Deque[Tuple[str, Optional[bytes]]] = deque()
+    state = {"headers": {}, "field": b"", "value": b"", "chunks": [], "size": 0}
+
+    def on_part_begin():
+        state.update(headers={}, chunks=[], size=0)
+
+    def on_header_field(data, start, end):
+        state["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["field"].lower()] = state["value"]
+        state.update(field=b"", value=b"")
+
+    def on_part_data(data, start, end):
+        # 回應已開始串流，超過上限的檔案不中止整批，只丟棄內容並在結果中標示為失敗
+        state["size"] += end - start
+        if state["size"] <= MAX_IMAGE_BYTES:
+            state["chunks"].append(data[start:end])
+
+    def on_part_end():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        filename = disposition.get(b"filename")
+        if filename:
+            data = b"".join(state["chunks"]) if state["size"] <= MAX_IMAGE_BYTES else None
+            parts.append((filename.decode("utf-8", "replace"), data))
+        state["chunks"] = []
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    async for chunk in request.stream():
+        parser.write(chunk)
+        while parts:
+            yield parts.popleft()
+    parser.finalize()
+    while parts:
+        yield parts.popleft()
+
+
+def _output_name(index: int, filename: str, extension: str) -> str:
+    """輸出檔名：批次序號加上原始檔名（去掉路徑與副檔名），避免重複"""
+    stem = filename.replace("\\", "/").rsplit("/", 1)[-1].rsplit(".", 1)[0] or "image"
+    return f"{index:04d}_{stem}{extension}"
+
+
+async def _multipart_body(results, fmt: str, boundary: str) -> AsyncIterator[bytes]:
+    """以 multipart/mixed 逐張送出結果，失敗的影像以 text/plain 部分說明原因"""
+    extension, _, mime = OUTPUT_FORMATS[fmt]
+    index = 0
+    async for filename, data, detail in results:
+        name = _output_name(index, filename, extension)
+        if data is None:
+            headers = (f"Content-Type: text/plain; charset=utf-8\r\n"
+                       f"Content-Disposition: attachment; filename=\"{name}.error.txt\"\r\nX-Embed-Error: 1\r\n")
+            data = detail.encode("utf-8")
+        else:
+            headers = (f"Content-Type: {mime}\r\nContent-Disposition: attachment; filename=\"{name}\"\r\n"
+                       f"X-Watermark-Mode: {detail}\r\n")
+        yield f"--{boundary}\r\n{headers}Content-Length: {len(data)}\r\n\r\n".encode() + data + b"\r\n"
+        index += 1
+    yield f"--{boundary}--\r\n".encode()
+
+
+class _ZipStream:
+    """只能附加寫入的緩衝區，讓 zipfile 以資料描述元格式輸出，每寫完一個檔案就取出位元組"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def _zip_body(results, fmt: str) -> AsyncIterator[bytes]:
+    """以 zip 逐張送出結果（PNG、WebP 已壓縮，以 STORED 存放），失敗的影像寫入 .error.txt"""
+    extension, _, _ = OUTPUT_FORMATS[fmt]
+    compression = zipfile.ZIP_DEFLATED if fmt == "bmp" else zipfile.ZIP_STORED
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, "w", compression=compression) as archive:
+        index = 0
+        async for filename, data, detail in results:
+            name = _output_name(index, filename, extension)
+            if data is None:
+                archive.writestr(f"{name}.error.txt", detail.encode("utf-8"))
+            else:
+                archive.writestr(name, data)
+            index += 1
+            yield stream.take()
+    yield stream.take()
+
+
+class _UploadStreamingResponse(StreamingResponse):
+    """
+    邊讀取請求本文邊送出的串流回應
+
+    StreamingResponse 在舊版 ASGI 伺服器上會同時以 receive 等待斷線，與讀取上傳內容的產生器
+    搶同一個 receive，因此這裡只送出回應；客戶端斷線時 send 會拋出例外而結束。
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+async def _counted(results, mode: str):
+    """更新嵌入數量指標"""
+    async for filename, data, detail in results:
+        EMBED_IMAGES.inc(mode=mode, status="error" if data is None else "success")
+        yield filename, data, detail
+
+
+@router.post("/embed")
+async def embed_images(request: Request, text: str = Query(..., min_length=1), mode: str = "lsb",
+                       fmt: str = Query("png", alias="format"), output: str = "multipart",
+                       device: str = "", bits: int = DEFAULT_BITS, channels: str = DEFAULT_CHANNELS):
+    """
+    嵌入浮水印
+
+    單張影像：請求本文為影像檔（任何 image/* 或 application/octet-stream），回應為嵌入後的影像。
+    批次：multipart/form-data，每個檔案欄位一張影像，output 為 multipart（multipart/mixed）或 zip。
+
+    Args:
+        text: 浮水印文字
+        mode: 浮水印模式，見 EMBED_MODES
+        fmt: 輸出格式 png、bmp、webp（無損）或 jpeg（僅可見與頻率域模式）
+        output: 批次結果的封裝方式
+        device: 動態浮水印的裝置名稱，預設為伺服器主機名稱
+        bits: 多位元平面模式每個通道寫入的最低位元數（1 或 2）
+        channels: 多位元平面模式使用的通道（b、g、r 的組合）
+    """
+    try:
+        check_options(mode, fmt, bits, channels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if output not in ("multipart", "zip"):
+        raise HTTPException(status_code=400, detail="output 必須為 multipart 或 zip")
+    service = get_embed_service()
+    options: Dict = {"text": text, "mode": mode, "format": fmt, "device": device, "bits": bits, "channels": channels}
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+
+    if content_type != b"multipart/form-data":
+        data = await request.body()
+        if not data:
+            raise HTTPException(status_code=400, detail="請求本文沒有影像")
+        if len(data) > MAX_IMAGE_BYTES:
+            raise HTTPException(status_code=413, detail=f"影像超過 {MAX_IMAGE_BYTES // (1024 * 1024)} MB")
+        try:
+            watermarked, applied = await service.embed(data, options)
+        except ValueError as e:
+            EMBED_IMAGES.inc(mode=mode, status="error")
+            raise HTTPException(status_code=422, detail=str(e))
+        EMBED_IMAGES.inc(mode=mode, status="success")
+        return Response(content=watermarked, media_type=OUTPUT_FORMATS[fmt][2],
+                        headers={"X-Watermark-Mode": applied})
+
+    if not params.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="multipart 請求缺少 boundary")
+    results = _counted(service.embed_stream(_iter_uploads(request, params[b"boundary"]), options), mode)
+    if output == "zip":
+        return _UploadStreamingResponse(_zip_body(results, fmt), media_type="application/zip",
+                                        headers={"Content-Disposition": "attachment; filename=\"watermarked.zip\""})
+    boundary = secrets.token_hex(16)
+    return _UploadStreamingResponse(_multipart_body(results, fmt, boundary),
+                                    media_type=f"multipart/mixed; boundary={boundary}")
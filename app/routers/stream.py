@@ -1,20 +1,87 @@
 """
 串流路由處理模組
 """
-from fastapi import APIRouter, WebSocket
-from ..utils.screen_capture import ScreenCapture
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from ..utils.frame_broadcaster import FrameBroadcaster, FrameRateLimiter
+from ..utils.memory_guard import memory_guard
+from ..utils.metrics import sampler, FRAMES_SENT, BYTES_SENT, RECORDER_QUEUE_DEPTH
 import asyncio
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import os
 import subprocess
 import platform
+import threading
 
 router = APIRouter()
-screen_capture = ScreenCapture()
+_screen_capture = None
+_screen_capture_lock = threading.Lock()
+_broadcaster = None
+
+MJPEG_BOUNDARY = "frame"
+
+# config 訊息中需要暖機後才切換的浮水印設定
+WATERMARK_CONFIG_KEYS = ('watermarkText', 'deviceName', 'bitplaneBits', 'bitplaneChannels')
+
+def get_screen_capture():
+    """
+    取得螢幕擷取工具，第一次使用時才載入 OpenCV、NumPy 並建立實例
+    
+    Returns:
+        ScreenCapture: 共用的螢幕擷取工具
+    """
+    global _screen_capture
+    if _screen_capture is None:
+        # 啟動暖機的背景執行緒可能同時建立
+        with _screen_capture_lock:
+            if _screen_capture is None:
+                from ..utils.screen_capture import ScreenCapture
+                _screen_capture = ScreenCapture()
+    return _screen_capture
+
+def _startup_warm_up():
+    """載入 OpenCV、NumPy 並以目前設定與螢幕解析度暖機（於背景執行緒執行）"""
+    try:
+        get_screen_capture().warm_up(probe_shape=True)
+    except Exception as e:
+        print(f"啟動暖機失敗: {str(e)}")
+
+def start_warm_up():
+    """伺服器啟動後在背景暖機，設定 LSB_WARM_UP=0 時略過"""
+    if os.environ.get("LSB_WARM_UP") == "0":
+        return
+    threading.Thread(target=_startup_warm_up, name="startup-warm-up", daemon=True).start()
+
+def get_broadcaster() -> FrameBroadcaster:
+    """
+    取得共用的畫面廣播器，所有串流端點讀取同一份編碼結果
+    
+    Returns:
+        FrameBroadcaster: 畫面廣播器
+    """
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = FrameBroadcaster(get_screen_capture().get_frame_jpeg)
+    return _broadcaster
+
+def _sample_recorder_queue():
+    """由背景取樣器更新錄影佇列深度"""
+    recorder = _screen_capture.recorder if _screen_capture else None
+    RECORDER_QUEUE_DEPTH.set(recorder.queue_depth if recorder else 0)
+
+def _tune_governor():
+    """由背景取樣器依 CPU 使用率調整處理頻率"""
+    if _screen_capture is not None:
+        _screen_capture.tune_interval()
+
+sampler.add_source(_sample_recorder_queue)
+sampler.add_source(_tune_governor)
 
 async def open_folder(path):
-    """開啟檔案總管並顯示指定路徑"""
+    """開啟檔案總管並顯示指定路徑（設定 LSB_NO_OPEN_FOLDER=1 時略過，例如壓力測試）"""
+    if os.environ.get("LSB_NO_OPEN_FOLDER") == "1":
+        return True
     try:
         if platform.system() == "Windows":
             os.startfile(os.path.dirname(path))
@@ -27,12 +94,157 @@ async def open_folder(path):
         print(f"無法開啟檔案總管: {e}")
         return False
 
+@router.get("/mjpeg")
+async def mjpeg_stream(request: Request, fps: Optional[float] = None):
+    """
+    MJPEG（multipart/x-mixed-replace）串流端點，可直接用 <img> 或錄影工具讀取
+    
+    Args:
+        fps: 此觀看端的幀率上限，未指定時跟隨擷取幀率
+    """
+    broadcaster = get_broadcaster()
+    sampler.start()
+    client = f"{request.client.host}:{request.client.port}" if request.client else str(id(request))
+    
+    async def generate():
+        broadcaster.subscribe()
+        limiter = FrameRateLimiter(fps)
+        sequence = 0
+        try:
+            while True:
+                await limiter.wait()
+                sequence, frame_data = await broadcaster.wait_frame(sequence)
+                yield (f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                       f"Content-Length: {len(frame_data)}\r\n\r\n").encode() + frame_data + b"\r\n"
+                FRAMES_SENT.inc(client=client)
+                BYTES_SENT.inc(len(frame_data), client=client)
+        finally:
+            broadcaster.unsubscribe()
+            FRAMES_SENT.remove(client=client)
+            BYTES_SENT.remove(client=client)
+    
+    return StreamingResponse(
+        generate(),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-cache, no-store"}
+    )
+
+def _apply_memory_settings(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    套用記憶體預算設定並返回目前狀態
+    
+    Args:
+        settings: 可包含 budget_mb（預算 MB）與 profiling（是否開啟 tracemalloc 分析）
+    
+    Returns:
+        Dict[str, Any]: 記憶體預算狀態
+    """
+    if settings.get('budget_mb') is not None:
+        memory_guard.set_budget(float(settings['budget_mb']))
+    if 'profiling' in settings:
+        memory_guard.set_profiling(bool(settings['profiling']))
+    return memory_guard.status()
+
+@router.get("/memory")
+async def memory_status():
+    """記憶體預算、最近的拒絕或降級決策，以及分析模式下各操作配置最多的程式位置"""
+    return memory_guard.status()
+
+@router.post("/memory")
+async def memory_settings(request: Request):
+    """
+    調整記憶體預算或開關分析模式，例如 {"budget_mb": 1024, "profiling": true}
+    """
+    return _apply_memory_settings(await request.json())
+
+def _comparison_request(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    解析觀看端要求的比較圖預覽參數
+    
+    Args:
+        settings: 可包含 viewport（{"width", "height"}，裝置像素）、format（jpeg 或 webp）與 quality
+    
+    Returns:
+        Dict[str, Any]: ComparisonCache.encode 的 fmt、quality、viewport 參數
+    """
+    from ..utils.comparison_cache import DEFAULT_PREVIEW_QUALITY, DEFAULT_VIEWPORT
+    viewport = settings.get('viewport') or {}
+    return {
+        "fmt": settings.get('format') if settings.get('format') in ('jpeg', 'webp') else 'jpeg',
+        "quality": int(settings.get('quality') or DEFAULT_PREVIEW_QUALITY),
+        "viewport": (int(viewport.get('width') or DEFAULT_VIEWPORT[0]),
+                     int(viewport.get('height') or DEFAULT_VIEWPORT[1])),
+    }
+
+async def _send_comparison(websocket: WebSocket, comparison_id: str, settings: Dict[str, Any]) -> bool:
+    """
+    發送縮小至觀看端可視區域的比較圖預覽（先送說明訊息，再送影像資料）
+    
+    Returns:
+        bool: 比較圖是否仍在快取中
+    """
+    encoded = get_screen_capture().comparison_cache.encode(comparison_id, **_comparison_request(settings))
+    if encoded is None:
+        return False
+    data, mime, (width, height) = encoded
+    await websocket.send_json({
+        "type": "comparison",
+        "id": comparison_id,
+        "mime": mime,
+        "width": width,
+        "height": height,
+        "full_url": f"/api/comparison/{comparison_id}",
+    })
+    await websocket.send_bytes(data)
+    return True
+
+@router.get("/comparison/{comparison_id}")
+def comparison_image(comparison_id: str, width: Optional[int] = None, height: Optional[int] = None,
+                     fmt: str = Query("png", alias="format"), quality: int = 90):
+    """
+    依 id 取得比較圖，未指定寬高時為完整解析度（預設 PNG 無損），結果由記憶體快取提供
+    """
+    from ..utils.comparison_cache import MAX_VIEWPORT
+    viewport = (width or MAX_VIEWPORT, height or MAX_VIEWPORT) if (width or height) else None
+    encoded = get_screen_capture().comparison_cache.encode(comparison_id, fmt, quality, viewport)
+    if encoded is None:
+        raise HTTPException(status_code=404, detail="比較圖不存在或已從快取淘汰")
+    data, mime, _ = encoded
+    return Response(content=data, media_type=mime, headers={"Cache-Control": "private, max-age=3600"})
+
+@router.get("/warmup")
+async def warm_up_status():
+    """最近一次暖機的狀態：warming、ready（等待下一幀切換）或 applied，以及耗時與暖機的影像大小"""
+    return get_screen_capture().warm_up_status
+
+@router.get("/ring")
+async def frame_ring_status():
+    """原始影格環形緩衝區的路徑、槽位數與已發布的影格數"""
+    return get_screen_capture().frame_ring_status()
+
+@router.post("/ring")
+async def frame_ring_settings(request: Request):
+    """
+    啟用或停用原始影格環形緩衝區，例如 {"path": "/dev/shm/lsb_frames.ring", "slots": 4}，path 為 null 時停用
+    """
+    settings = await request.json()
+    screen_capture = get_screen_capture()
+    screen_capture.set_frame_ring(settings.get('path'), settings.get('slots'))
+    return screen_capture.frame_ring_status()
+
 @router.websocket("/stream")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, fps: Optional[float] = None):
     """
     WebSocket 端點，用於串流螢幕畫面
+    
+    Args:
+        fps: 此觀看端的幀率上限，未指定時跟隨擷取幀率
     """
     await websocket.accept()
+    screen_capture = get_screen_capture()
+    broadcaster = get_broadcaster()
+    sampler.start()
+    client = f"{websocket.client.host}:{websocket.client.port}" if websocket.client else str(id(websocket))
     
     # 建立訊息處理任務
     async def handle_messages():
@@ -43,14 +255,51 @@ async def websocket_endpoint(websocket: WebSocket):
                 
                 if message.get('type') == 'config':
                     config = message.get('data', {})
-                    if 'watermarkText' in config:
-                        screen_capture.set_watermark(
-                            config['watermarkText'],
-                            config.get('watermarkVisible', False),
-                            config.get('watermarkRedundancy', False)
-                        )
+                    if any(key in config for key in WATERMARK_CONFIG_KEYS):
+                        # 浮水印設定先在背景暖機，完成後擷取端在兩幀之間一次切換
+                        staging = screen_capture.stage_settings()
+                        if 'watermarkText' in config:
+                            staging.set_watermark(
+                                config['watermarkText'],
+                                config.get('watermarkVisible', False),
+                                config.get('watermarkRedundancy', False),
+                                config.get('watermarkTemporal', False),
+                                config.get('watermarkDct', False),
+                                config.get('watermarkDynamic', False),
+                                config.get('watermarkEcc', False),
+                                config.get('watermarkBitplane', False),
+                                config.get('watermarkHybrid', False)
+                            )
+                        if 'bitplaneBits' in config or 'bitplaneChannels' in config:
+                            try:
+                                staging.set_bitplane_layout(
+                                    int(config.get('bitplaneBits') or staging.bitplane_bits),
+                                    config.get('bitplaneChannels') or staging.bitplane_channels
+                                )
+                            except ValueError as e:
+                                print(f"多位元平面版面設定錯誤: {str(e)}")
+                        if 'deviceName' in config:
+                            staging.set_device_name(config['deviceName'] or '')
+                        screen_capture.warm_up(staging)
                     if 'frameInterval' in config:
                         screen_capture.set_frame_interval(int(config['frameInterval']))
+                    if 'workerMode' in config:
+                        worker_count = config.get('workerCount')
+                        screen_capture.set_worker_mode(
+                            bool(config['workerMode']),
+                            int(worker_count) if worker_count else None
+                        )
+                    if 'cpuGovernor' in config:
+                        cpu_target = config.get('cpuTarget')
+                        screen_capture.set_cpu_governor(
+                            bool(config['cpuGovernor']),
+                            float(cpu_target) if cpu_target else None
+                        )
+                    if 'targetWindows' in config:
+                        target_windows = config['targetWindows'] or []
+                        if isinstance(target_windows, str):
+                            target_windows = target_windows.split(',')
+                        screen_capture.set_target_windows(target_windows)
                     if 'processing' in config:
                         screen_capture.set_processing(config['processing'])
                 
@@ -82,21 +331,22 @@ async def websocket_endpoint(websocket: WebSocket):
                 elif message.get('type') == 'compare_images':
                     try:
                         # 執行截圖、加浮水印、比較的整合流程
-                        comparison_path = screen_capture.screenshot_and_compare()
+                        with memory_guard.operation("compare"):
+                            comparison_path = screen_capture.screenshot_and_compare()
                         if comparison_path:
                             # 先發送成功消息
+                            comparison_id = screen_capture.last_comparison_id
                             await websocket.send_json({
                                 "type": "compare_images",
                                 "status": "success",
                                 "message": "截圖比較完成",
-                                "comparison_path": str(comparison_path)
+                                "comparison_path": str(comparison_path),
+                                "comparison_id": comparison_id
                             })
                             
-                            # 獲取並發送比較圖像
+                            # 發送縮小到可視區域的預覽，完整解析度由 /api/comparison/{id} 提供
                             try:
-                                with open(comparison_path, 'rb') as f:
-                                    image_data = f.read()
-                                await websocket.send_bytes(image_data)
+                                await _send_comparison(websocket, comparison_id, message)
                             except Exception as img_error:
                                 print(f"發送比較圖像失敗: {str(img_error)}")
                             
@@ -115,6 +365,19 @@ async def websocket_endpoint(websocket: WebSocket):
                             "status": "error",
                             "message": f"比較截圖錯誤: {str(e)}"
                         })
+                elif message.get('type') == 'comparison':
+                    # 重新取得快取中的比較圖預覽（例如視窗大小改變）
+                    if not await _send_comparison(websocket, message.get('id', ''), message):
+                        await websocket.send_json({
+                            "type": "comparison",
+                            "status": "error",
+                            "message": "比較圖不存在或已從快取淘汰"
+                        })
+                elif message.get('type') == 'memory':
+                    await websocket.send_json({
+                        "type": "memory",
+                        "data": _apply_memory_settings(message.get('data') or {})
+                    })
                 elif message.get('type') == 'open_folder':
                     success = await open_folder(message.get('path'))
                     if not success:
@@ -127,18 +390,40 @@ async def websocket_endpoint(websocket: WebSocket):
                 print(f"接收訊息錯誤: {str(e)}")
                 break
     
-    # 建立畫面串流任務
+    # 建立畫面串流任務（讀取共用的編碼緩衝區）
     async def stream_frames():
+        limiter = FrameRateLimiter(fps)
+        sequence = 0
         while True:
             try:
-                success, frame_data = screen_capture.get_frame_jpeg()
-                if success:
-                    await websocket.send_bytes(frame_data)
-                await asyncio.sleep(1/30)  # 30 FPS
+                await limiter.wait()
+                sequence, frame_data = await broadcaster.wait_frame(sequence)
+                await websocket.send_bytes(frame_data)
+                FRAMES_SENT.inc(client=client)
+                BYTES_SENT.inc(len(frame_data), client=client)
             except Exception as e:
                 print(f"串流畫面錯誤: {str(e)}")
                 break
     
+    # 調節器有新的決策時通知介面
+    async def report_governor():
+        reported = -1
+        while True:
+            await asyncio.sleep(sampler.interval)
+            governor = screen_capture.governor
+            if governor is None or governor.sequence == reported:
+                continue
+            reported = governor.sequence
+            status = governor.status()
+            status["interval"] = screen_capture.frame_interval
+            try:
+                await websocket.send_json({"type": "governor", "data": status})
+            except Exception as e:
+                print(f"傳送調節器狀態錯誤: {str(e)}")
+                break
+    
+    broadcaster.subscribe()
+    reporter = asyncio.create_task(report_governor())
     try:
         # 同時執行訊息處理和畫面串流
         await asyncio.gather(
@@ -148,4 +433,8 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         print(f"WebSocket 錯誤: {str(e)}")
     finally:
+        reporter.cancel()
+        broadcaster.unsubscribe()
+        FRAMES_SENT.remove(client=client)
+        BYTES_SENT.remove(client=client)
         await websocket.close()
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+多位元平面 LSB 版面模組
+
+版面（每個通道的位元數與使用的通道）的預設值與解析，只做字串與整數處理，不依賴 NumPy，
+路由與嵌入服務在啟動時匯入也不會載入影像處理相關的套件。
+"""
+from typing import Optional, Sequence, Tuple
+
+# 通道代號與 BGR 索引
+CHANNELS = "bgr"
+DEFAULT_BITS = 2
+DEFAULT_CHANNELS = "bgr"
+
+
+def parse_channels(channels: str) -> Tuple[int, ...]:
+    """
+    將通道代號（例如 "bgr"、"b"）轉換為排序後的 BGR 索引
+
+    Args:
+        channels: b、g、r 的任意組合
+
+    Returns:
+        Tuple[int, ...]: 通道索引
+
+    Raises:
+        ValueError: 沒有通道或含不支援的代號
+    """
+    channels = channels.lower()
+    if not channels or any(c not in CHANNELS for c in channels):
+        raise ValueError(f"不支援的通道: {channels!r}（使用 b、g、r 的組合）")
+    return tuple(sorted({CHANNELS.index(c) for c in channels}))
+
+
+def layout_byte(bits: int, channels: Sequence[int]) -> int:
+    """標頭中的版面位元組"""
+    mask = 0
+    for channel in channels:
+        mask |= 1 << channel
+    return mask | (bits - 1) << 3
+
+
+def parse_layout(value: int) -> Optional[Tuple[int, Tuple[int, ...]]]:
+    """
+    解析版面位元組
+
+    Returns:
+        Optional[Tuple[int, Tuple[int, ...]]]: (每個通道的位元數, 通道索引)，不合法時返回 None
+    """
+    if value >> 4:
+        return None
+    channels = tuple(c for c in range(3) if value >> c & 1)
+    if not channels:
+        return None
+    return (value >> 3 & 1) + 1, channels
@@ -0,0 +1,169 @@
+"""
+多位元平面 LSB 浮水印模組
+
+標準 LSB 每個像素只在藍色通道寫入 1 個位元，長文字與高冗餘度會改動畫面的大片區域。
+此版面在選定的通道中各寫入最低 1～2 個位元，每個像素最多可存放 6 個位元，
+同樣的內容只會改動少數相鄰像素，每幀讀寫的記憶體也隨之減少。
+寫入以位元平面運算進行：位元預先組成每個通道的符號陣列，每個通道只做一次遮罩與 OR。
+
+畫面最前方的 HEADER_PIXELS 個像素以標準 LSB（藍色通道 1 位元）寫入標頭，
+記錄版面（位元數、通道）、重複次數、文字長度與檢查碼，解碼端不需事先知道版面。
+資料緊接在標頭之後；重複時整段資料依序寫入多次，局部損毀只會影響其中一份，以多數決還原。
+
+標頭格式：魔術碼 | 版面（第 0～2 位元為 B、G、R 通道遮罩，第 3 位元為位元數減一）| 重複次數 | 文字長度（16 位元）| 檢查碼（CRC32 低 16 位元）
+"""
+import zlib
+import numpy as np
+from typing import Optional, Tuple
+
+# 版面的預設值與解析不依賴 NumPy，放在 bitplane_layout，這裡一併提供
+from .bitplane_layout import (
+    CHANNELS, DEFAULT_BITS, DEFAULT_CHANNELS, layout_byte, parse_channels, parse_layout
+)
+
+BITPLANE_MAGIC = 0xB9
+HEADER_SIZE = 7
+HEADER_PIXELS = HEADER_SIZE * 8
+BITPLANE_REPEAT = 3  # 冗餘時整段資料的重複次數
+MAX_TEXT_BYTES = 0xFFFF
+
+
+def _symbols(bits: np.ndarray, per_sample: int) -> np.ndarray:
+    """將位元串每 per_sample 個組成一個符號（高位在前）"""
+    if per_sample == 1:
+        return bits
+    bits = np.concatenate([bits, np.zeros(-len(bits) % 2, dtype=np.uint8)])
+    return bits[0::2] << 1 | bits[1::2]
+
+
+def _pixels_needed(symbol_count: int, channel_count: int) -> int:
+    return -(-symbol_count // channel_count)
+
+
+class BitplanePayload:
+    """預先計算標頭與各通道符號的多位元平面 LSB 編碼器"""
+
+    def __init__(self, text: str, shape: Tuple[int, int], bits: int = DEFAULT_BITS,
+                 channels: str = DEFAULT_CHANNELS, repeat: int = 1):
+        """
+        編碼文字並建立各通道的符號陣列
+
+        Args:
+            text: 浮水印文字（以 UTF-8 編碼）
+            shape: 影像的 (高, 寬)
+            bits: 每個通道寫入的最低位元數（1 或 2）
+            channels: 使用的通道（b、g、r 的組合）
+            repeat: 整段資料的重複次數
+        """
+        if bits not in (1, 2):
+            raise ValueError(f"每個通道只能寫入 1 或 2 個位元: {bits}")
+        self.text = text
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.bits = bits
+        self.channels = parse_channels(channels)
+        self.repeat = max(1, int(repeat))
+
+        data = text.encode("utf-8")[:MAX_TEXT_BYTES]
+        header = bytes([BITPLANE_MAGIC, layout_byte(bits, self.channels), self.repeat]) \
+            + len(data).to_bytes(2, "big") + (zlib.crc32(data) & 0xFFFF).to_bytes(2, "big")
+        self._header_bits = np.unpackbits(np.frombuffer(header, dtype=np.uint8))
+
+        # 每份資料補齊到整數個像素，重複的資料從新的像素開始
+        symbols = _symbols(np.unpackbits(np.frombuffer(data, dtype=np.uint8)), bits)
+        copy_pixels = _pixels_needed(len(symbols), len(self.channels))
+        padded = np.zeros(copy_pixels * len(self.channels), dtype=np.uint8)
+        padded[:len(symbols)] = symbols
+        self.pixels = copy_pixels * self.repeat
+        # (像素數, 通道數) 的符號表，每一欄對應一個通道
+        self._symbols = np.ascontiguousarray(np.tile(padded.reshape(copy_pixels, len(self.channels)),
+                                                     (self.repeat, 1)))
+        self._clear = np.uint8(0xFF ^ ((1 << bits) - 1))
+
+    @property
+    def writes(self) -> int:
+        """每次嵌入寫入的位置（像素 × 通道）數，包含標頭"""
+        return HEADER_PIXELS + self.pixels * len(self.channels)
+
+    @property
+    def touched_pixels(self) -> int:
+        """每次嵌入可能改動的像素數，包含標頭"""
+        return HEADER_PIXELS + self.pixels
+
+    def fits(self) -> bool:
+        """影像是否足以容納標頭與所有資料"""
+        return self.touched_pixels <= self.shape[0] * self.shape[1]
+
+    def embed(self, frame: np.ndarray) -> np.ndarray:
+        """
+        嵌入浮水印（就地修改）
+
+        Args:
+            frame: BGR 影像，記憶體不連續時會先複製
+
+        Returns:
+            np.ndarray: 嵌入後的影像
+        """
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)
+        pixels = frame.reshape(-1, frame.shape[2])
+        header = pixels[:HEADER_PIXELS, 0]
+        header &= 0xFE
+        header |= self._header_bits
+
+        body = pixels[HEADER_PIXELS:HEADER_PIXELS + self.pixels]
+        if self.channels == (0, 1, 2) and pixels.shape[1] == 3:
+            # 三個通道都使用時整段連續，一次寫入
+            body &= self._clear
+            body |= self._symbols
+        else:
+            for column, channel in enumerate(self.channels):
+                plane = body[:, channel]
+                plane &= self._clear
+                plane |= self._symbols[:, column]
+        return frame
+
+
+def read_bitplane_text(frame: np.ndarray) -> Optional[str]:
+    """
+    讀取多位元平面 LSB 浮水印，版面由標頭決定
+
+    Args:
+        frame: BGR 影像
+
+    Returns:
+        Optional[str]: 浮水印文字，標頭不符或檢查碼錯誤時返回 None
+    """
+    pixels = frame.reshape(-1, frame.shape[2]) if frame.ndim == 3 else None
+    if pixels is None or len(pixels) < HEADER_PIXELS:
+        return None
+    header = np.packbits(pixels[:HEADER_PIXELS, 0] & 1).tobytes()
+    if header[0] != BITPLANE_MAGIC:
+        return None
+    layout = parse_layout(header[1])
+    repeat = header[2]
+    length = int.from_bytes(header[3:5], "big")
+    if layout is None or repeat == 0 or length == 0:
+        return None
+    bits, channels = layout
+
+    symbol_count = -(-length * 8 // bits)
+    copy_pixels = _pixels_needed(symbol_count, len(channels))
+    available = (len(pixels) - HEADER_PIXELS) // copy_pixels
+    if available == 0:
+        return None
+    copies = min(repeat, available)
+    body = pixels[HEADER_PIXELS:HEADER_PIXELS + copy_pixels * copies][:, channels] & ((1 << bits) - 1)
+    # 每份資料攤平成符號串，再拆回位元
+    symbols = body.reshape(copies, -1)[:, :symbol_count]
+    if bits == 2:
+        planes = np.stack([symbols >> 1 & 1, symbols & 1], axis=-1).reshape(copies, -1)
+    else:
+        planes = symbols
+    votes = planes[:, :length * 8].sum(axis=0)
+    data = np.packbits((votes * 2 > copies).astype(np.uint8)).tobytes()
+    if zlib.crc32(data) & 0xFFFF != int.from_bytes(header[5:7], "big"):
+        return None
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
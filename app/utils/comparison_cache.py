@@ -0,0 +1,182 @@
+"""
+比較圖快取模組
+
+截圖比較的結果（原圖、浮水印、差異圖並排的對比圖）保留在記憶體中，以 id 取用。
+預覽依觀看端的可視區域縮小後編碼為 JPEG 或 WebP，預覽與完整解析度的編碼結果都會快取，
+重複檢視不需要讀取磁碟或重新編碼。超過項目數或位元組上限時淘汰最久未使用的比較圖。
+"""
+import secrets
+import threading
+import time
+import cv2
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# 格式：(副檔名, 品質參數, MIME 類型)，PNG 為無損
+FORMATS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY, "image/jpeg"),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY, "image/webp"),
+    "png": (".png", None, "image/png"),
+}
+DEFAULT_PREVIEW_QUALITY = 80
+DEFAULT_VIEWPORT = (1280, 720)
+# 可視區域大小以此為單位向上取整，視窗微調大小時沿用同一份預覽
+VIEWPORT_STEP = 64
+MAX_VIEWPORT = 4096
+# 每張比較圖最多保留的編碼結果數
+MAX_ENCODINGS = 4
+
+
+def fit_size(width: int, height: int, viewport: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    計算在可視區域內完整顯示且不放大的尺寸
+
+    Args:
+        width: 原始寬度
+        height: 原始高度
+        viewport: 可視區域 (寬, 高)
+
+    Returns:
+        Tuple[int, int]: 縮放後的 (寬, 高)
+    """
+    view_w, view_h = (min(MAX_VIEWPORT, max(VIEWPORT_STEP, -(-int(v) // VIEWPORT_STEP) * VIEWPORT_STEP))
+                      for v in viewport)
+    scale = min(1.0, view_w / width, view_h / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class ComparisonCache:
+    """以 LRU 淘汰的比較圖記憶體快取（執行緒安全）"""
+
+    def __init__(self, max_entries: int = 8, max_bytes: int = 512 * 1024 * 1024):
+        """
+        初始化快取
+
+        Args:
+            max_entries: 最多保留的比較圖數
+            max_bytes: 比較圖與編碼結果合計的位元組上限
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _size(self, entry: Dict) -> int:
+        return entry["image"].nbytes + sum(len(data) for data in entry["encodings"].values())
+
+    def _evict(self):
+        """淘汰最久未使用的比較圖，直到符合上限（至少保留最新一張）"""
+        total = sum(self._size(entry) for entry in self._entries.values())
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or total > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            total -= self._size(entry)
+
+    def put(self, image: np.ndarray, path: Optional[str] = None) -> str:
+        """
+        加入比較圖
+
+        Args:
+            image: BGR 比較圖（之後不可再修改）
+            path: 對應的檔案路徑
+
+        Returns:
+            str: 比較圖 id
+        """
+        comparison_id = secrets.token_hex(8)
+        with self._lock:
+            self._entries[comparison_id] = {
+                "image": image,
+                "path": path,
+                "created": time.time(),
+                "encodings": OrderedDict(),
+            }
+            self._evict()
+        return comparison_id
+
+    def get(self, comparison_id: str) -> Optional[np.ndarray]:
+        """
+        取得完整解析度的比較圖
+
+        Args:
+            comparison_id: 比較圖 id
+
+        Returns:
+            Optional[np.ndarray]: BGR 影像，已淘汰或不存在時返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(comparison_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(comparison_id)
+            return entry["image"]
+
+    def encode(self, comparison_id: str, fmt: str = "jpeg", quality: int = DEFAULT_PREVIEW_QUALITY,
+               viewport: Optional[Tuple[int, int]] = None) -> Optional[Tuple[bytes, str, Tuple[int, int]]]:
+        """
+        取得編碼後的比較圖，同樣的參數第二次起直接由快取返回
+
+        Args:
+            comparison_id: 比較圖 id
+            fmt: jpeg、webp 或 png
+            quality: JPEG／WebP 品質
+            viewport: 可視區域 (寬, 高)，None 表示完整解析度
+
+        Returns:
+            Optional[Tuple[bytes, str, Tuple[int, int]]]: (影像資料, MIME 類型, (寬, 高))，
+            比較圖不存在或格式不支援時返回 None
+        """
+        if fmt not in FORMATS:
+            return None
+        extension, quality_flag, mime = FORMATS[fmt]
+        with self._lock:
+            entry = self._entries.get(comparison_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(comparison_id)
+            image = entry["image"]
+            height, width = image.shape[:2]
+            size = fit_size(width, height, viewport) if viewport else (width, height)
+            key = (fmt, quality if quality_flag is not None else None, size)
+            cached = entry["encodings"].get(key)
+            if cached is not None:
+                entry["encodings"].move_to_end(key)
+                self.hits += 1
+                return cached, mime, size
+            self.misses += 1
+
+        # 編碼不持有鎖，其他比較圖的讀取不必等待
+        resized = image if size == (width, height) else cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        params = [quality_flag, int(quality)] if quality_flag is not None else []
+        ok, encoded = cv2.imencode(extension, resized, params)
+        if not ok:
+            return None
+        data = encoded.tobytes()
+
+        with self._lock:
+            entry = self._entries.get(comparison_id)
+            if entry is not None:
+                entry["encodings"][key] = data
+                while len(entry["encodings"]) > MAX_ENCODINGS:
+                    entry["encodings"].popitem(last=False)
+                self._evict()
+        return data, mime, size
+
+    def status(self) -> Dict:
+        """
+        取得快取狀態
+
+        Returns:
+            Dict: 項目數、佔用位元組數與命中次數
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(self._size(entry) for entry in self._entries.values()),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,155 @@
+"""
+CPU 預算調節模組
+
+依量測到的每幀浮水印耗時與行程（含工作池子行程）的 CPU 使用率，
+即時調整處理頻率（每 N 幀嵌入一次），讓整體 CPU 使用維持在目標比例內，
+同時在有餘裕時盡量縮小 N，讓更多影格帶有浮水印。
+
+CPU 比例以整台機器的總運算能力計算（所有核心合計 100%）。
+"""
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+DEFAULT_TARGET_PERCENT = 50.0
+# CPU 低於目標的此比例以下才縮小間隔，避免在目標附近來回調整
+HYSTERESIS = 0.15
+# 每幀浮水印耗時的指數移動平均權重
+COST_SMOOTHING = 0.2
+
+
+class CpuGovernor:
+    """自動調整處理頻率的 CPU 預算調節器"""
+
+    def __init__(self, target_percent: float = DEFAULT_TARGET_PERCENT,
+                 min_interval: int = 1, max_interval: int = 30):
+        """
+        初始化調節器
+
+        Args:
+            target_percent: 目標 CPU 比例（0-100，所有核心合計）
+            min_interval: 最小處理間隔
+            max_interval: 最大處理間隔
+        """
+        self.target = target_percent
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cores = os.cpu_count() or 1
+        self.cost: Optional[float] = None  # 每幀浮水印耗時（秒）
+        self.cpu: Optional[float] = None
+        self.sequence = 0  # 每次更新加一，觀看端用來判斷是否有新狀態
+        self.decisions: Deque[Dict] = deque(maxlen=20)
+        self.last: Optional[Dict] = None  # 最近一次的狀態與決策
+        self._process = None
+        self._last_cpu_time = None
+        self._last_wall = None
+
+    def set_target(self, target_percent: float):
+        """
+        設定目標 CPU 比例
+
+        Args:
+            target_percent: 目標 CPU 比例（5-100）
+        """
+        self.target = max(5.0, min(100.0, float(target_percent)))
+
+    def observe(self, seconds: float):
+        """
+        記錄一幀的浮水印耗時
+
+        Args:
+            seconds: 嵌入浮水印花費的秒數
+        """
+        if self.cost is None:
+            self.cost = seconds
+        else:
+            self.cost += COST_SMOOTHING * (seconds - self.cost)
+
+    def _measure(self) -> Optional[float]:
+        """量測自上次呼叫以來行程與子行程的 CPU 比例（第一次呼叫返回 None）"""
+        import psutil
+        if self._process is None:
+            self._process = psutil.Process()
+        cpu_time = 0.0
+        for process in [self._process] + self._process.children(recursive=True):
+            try:
+                times = process.cpu_times()
+                cpu_time += times.user + times.system
+            except psutil.Error:
+                continue
+        now = time.monotonic()
+        previous, previous_wall = self._last_cpu_time, self._last_wall
+        self._last_cpu_time, self._last_wall = cpu_time, now
+        if previous is None or now <= previous_wall:
+            return None
+        # 子行程結束時累計時間會變少，此時略過這次量測
+        if cpu_time < previous:
+            return None
+        return (cpu_time - previous) / (now - previous_wall) / self.cores * 100
+
+    def update(self, interval: int, fps: float) -> Optional[Dict]:
+        """
+        量測 CPU 並決定新的處理間隔
+
+        Args:
+            interval: 目前的處理間隔
+            fps: 目前的擷取幀率
+
+        Returns:
+            Optional[Dict]: 狀態與決策，資料不足時返回 None
+        """
+        cpu = self._measure()
+        if cpu is None:
+            return None
+        self.cpu = cpu
+        if self.cost is None or fps <= 0:
+            return None
+
+        # 浮水印本身佔用的比例，其餘視為擷取與編碼的基本負載
+        per_frame = self.cost * fps / self.cores * 100
+        baseline = max(0.0, cpu - per_frame / interval)
+        budget = self.target - baseline
+        desired = self.max_interval if budget <= 0 else math.ceil(per_frame / budget)
+        desired = max(self.min_interval, min(self.max_interval, desired))
+
+        new_interval = interval
+        reason = "hold"
+        if desired > interval and cpu > self.target:
+            new_interval, reason = desired, "over_budget"
+        elif desired < interval and cpu < self.target * (1 - HYSTERESIS):
+            # 縮小間隔時逐步調整，避免一次跳太多造成尖峰
+            new_interval, reason = max(desired, interval - max(1, interval // 2)), "headroom"
+
+        self.sequence += 1
+        decision = {
+            "time": time.time(),
+            "cpu": round(cpu, 1),
+            "target": self.target,
+            "cost_ms": round(self.cost * 1000, 2),
+            "fps": round(fps, 1),
+            "previous": interval,
+            "interval": new_interval,
+            "reason": reason,
+        }
+        if new_interval != interval:
+            self.decisions.append(decision)
+        self.last = decision
+        return decision
+
+    def status(self) -> Dict:
+        """
+        取得調節器狀態
+
+        Returns:
+            Dict: 目標、量測值與最近的調整紀錄
+        """
+        return {
+            "target": self.target,
+            "cpu": round(self.cpu, 1) if self.cpu is not None else None,
+            "cost_ms": round(self.cost * 1000, 2) if self.cost is not None else None,
+            "sequence": self.sequence,
+            "last": self.last,
+            "decisions": list(self.decisions),
+        }
@@ -0,0 +1,120 @@
+"""
+頻率域（區塊 DCT）浮水印模組
+
+將浮水印位元寫入亮度通道 8×8 區塊的中頻係數：以一對係數的差值正負代表位元，
+並將整段位元序列循環鋪滿所有區塊。中頻係數在 JPEG 與 mp4v 量化後仍大致保留，
+解碼時把同一位元的所有區塊差值加總（軟決策），因此可以承受壓縮造成的誤差。
+
+提取由 app.core.decoder.extract_dct 負責（只依賴 NumPy，解碼端不需要 OpenCV）。
+
+所有區塊一次以矩陣乘法批次轉換，不逐區塊呼叫 cv2.dct。由於只使用一對係數，
+嵌入時只需把每個區塊投影到「係數 A 基底 − 係數 B 基底」這個 8×8 核上，
+再把修正量乘上同一個核加回影像，不必做完整的正反轉換。
+亮度的修正量等量加到 B、G、R 三個通道，色度保持不變，也省去色彩空間來回轉換。
+
+位元序列格式：長度（8 位元）| 資料 × 長度 | 檢查碼（16 位元），不足 PERIOD_BITS 以 0 補齊
+"""
+import zlib
+import numpy as np
+from functools import lru_cache
+from typing import Tuple
+
+BLOCK = 8
+MAX_PAYLOAD_BYTES = 64
+PERIOD_BITS = (MAX_PAYLOAD_BYTES + 3) * 8
+
+# 用來承載位元的中頻係數對
+COEFF_A = (2, 3)
+COEFF_B = (3, 2)
+
+# 係數差值的最小幅度，越大越耐壓縮但越容易看出
+DEFAULT_STRENGTH = 24.0
+
+
+def _dct_matrix(n: int = BLOCK) -> np.ndarray:
+    """建立正交 DCT-II 轉換矩陣"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    matrix[0, :] = np.sqrt(1.0 / n)
+    return matrix.astype(np.float32)
+
+
+DCT = _dct_matrix()
+
+# 係數 A 與係數 B 的空間基底相減；區塊與此核的內積即為兩係數的差值
+KERNEL = (np.outer(DCT[COEFF_A[0]], DCT[COEFF_A[1]])
+          - np.outer(DCT[COEFF_B[0]], DCT[COEFF_B[1]])).reshape(-1).astype(np.float32)
+
+
+@lru_cache(maxsize=8)
+def _payload_bits(text: str) -> np.ndarray:
+    """
+    將浮水印文字轉為固定長度的位元序列
+
+    Args:
+        text: 浮水印文字
+
+    Returns:
+        np.ndarray: 長度為 PERIOD_BITS 的 ±1 序列
+    """
+    data = bytes(ord(c) & 0xFF for c in text)[:MAX_PAYLOAD_BYTES]
+    body = bytes([len(data)]) + data
+    framed = body + (zlib.crc32(body) & 0xFFFF).to_bytes(2, 'big')
+    bits = np.zeros(PERIOD_BITS, dtype=np.float32)
+    unpacked = np.unpackbits(np.frombuffer(framed, dtype=np.uint8))
+    bits[:len(unpacked)] = unpacked
+    signs = bits * 2 - 1
+    signs.flags.writeable = False
+    return signs
+
+
+def _to_blocks(plane: np.ndarray) -> Tuple[np.ndarray, int, int]:
+    """
+    將影像平面切成 (N, 8, 8) 區塊（捨棄不足 8 像素的邊緣）
+
+    Returns:
+        Tuple[np.ndarray, int, int]: (區塊陣列, 區塊列數, 區塊行數)
+    """
+    rows, cols = plane.shape[0] // BLOCK, plane.shape[1] // BLOCK
+    cropped = plane[:rows * BLOCK, :cols * BLOCK]
+    blocks = cropped.reshape(rows, BLOCK, cols, BLOCK).swapaxes(1, 2).reshape(-1, BLOCK, BLOCK)
+    return blocks, rows, cols
+
+
+def _from_blocks(blocks: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """將 (N, 64) 或 (N, 8, 8) 區塊組回影像平面"""
+    return blocks.reshape(rows, cols, BLOCK, BLOCK).swapaxes(1, 2).reshape(rows * BLOCK, cols * BLOCK)
+
+
+def embed_dct(frame: np.ndarray, text: str, strength: float = DEFAULT_STRENGTH) -> np.ndarray:
+    """
+    嵌入區塊 DCT 浮水印
+
+    Args:
+        frame: BGR 影像
+        text: 浮水印文字（最多 MAX_PAYLOAD_BYTES 個字元）
+        strength: 係數差值的最小幅度
+
+    Returns:
+        np.ndarray: 嵌入浮水印後的新影像
+    """
+    import cv2
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    blocks, rows, cols = _to_blocks(gray)
+    result = frame.copy()
+    if len(blocks) == 0:
+        return result
+
+    diff = blocks.reshape(len(blocks), -1).astype(np.float32) @ KERNEL
+    signs = np.resize(_payload_bits(text), len(blocks))
+
+    # 將係數差值推到 ±strength 之外，已符合的區塊修正量為 0
+    # 加上 t × KERNEL 會讓差值增加 2t（KERNEL 的平方和為 2）
+    correction = signs * np.maximum(strength - signs * diff, 0) * 0.5
+    delta = _from_blocks(correction[:, None] * KERNEL[None, :], rows, cols)
+    delta = np.rint(delta).astype(np.int16)
+
+    region = result[:rows * BLOCK, :cols * BLOCK]
+    region[...] = cv2.add(region, cv2.merge([delta, delta, delta]), dtype=cv2.CV_8U)
+    return result
@@ -0,0 +1,147 @@
+"""
+動態鑑識浮水印模組
+
+每一幀嵌入「裝置名稱 + 影格計數 + 擷取時間」，外流的畫面可追溯到來源裝置與時間點。
+固定部分（魔術碼、裝置名稱）的位元與嵌入位置在設定改變時預先計算成模板，
+每一幀只重新編碼計數、時間與檢查碼這 11 個位元組，再一次寫入所有位置，
+因此每幀的嵌入成本固定，與裝置名稱長度無關。
+
+位元組格式：魔術碼 | 裝置名稱長度 | 裝置名稱 | 計數（32 位元）| 時間（48 位元毫秒）| 檢查碼
+標準版面依序寫入藍色通道最低位元（與標準 LSB 相同），冗餘版面使用 lsb_layout 的排列，每個位元重複 REDUNDANCY 次。
+"""
+import struct
+import zlib
+import numpy as np
+from typing import Dict, Optional, Tuple
+from .lsb_layout import REDUNDANCY, redundancy_positions
+
+DYNAMIC_MAGIC = 0xD7
+MAX_DEVICE_BYTES = 64
+FIXED_HEADER_SIZE = 2   # 魔術碼、裝置名稱長度
+DYNAMIC_SIZE = 4 + 6 + 1  # 計數、時間、檢查碼
+MAX_PAYLOAD_BYTES = FIXED_HEADER_SIZE + MAX_DEVICE_BYTES + DYNAMIC_SIZE
+
+
+def _device_bytes(device: str) -> bytes:
+    """裝置名稱的 UTF-8 編碼，超過長度上限時截斷（不切開多位元組字元）"""
+    return device.encode("utf-8")[:MAX_DEVICE_BYTES].decode("utf-8", "ignore").encode("utf-8")
+
+
+class DynamicPayload:
+    """預先計算固定部分的動態浮水印編碼器"""
+
+    def __init__(self, device: str, shape: Tuple[int, int], redundant: bool = False):
+        """
+        建立位元模板與嵌入位置
+
+        Args:
+            device: 裝置名稱
+            shape: 影像的 (高, 寬)
+            redundant: 是否使用冗餘版面
+        """
+        self.device = device
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.redundant = redundant
+        self.repeat = REDUNDANCY if redundant else 1
+
+        device_bytes = _device_bytes(device)
+        fixed = bytes([DYNAMIC_MAGIC, len(device_bytes)]) + device_bytes
+        self._fixed_crc = zlib.crc32(fixed)
+        bits = np.unpackbits(np.frombuffer(fixed + bytes(DYNAMIC_SIZE), dtype=np.uint8))
+        # 完整的位元模板，每幀只覆寫尾端動態欄位對應的區段
+        self._values = np.repeat(bits, self.repeat)
+        self._dynamic = slice(len(fixed) * 8 * self.repeat, len(self._values))
+
+        if redundant:
+            self._positions = redundancy_positions(self.shape, len(self._values))[:len(self._values)]
+        else:
+            self._positions = None
+
+    def embed(self, frame: np.ndarray, counter: int, timestamp: float) -> np.ndarray:
+        """
+        嵌入目前影格的內容（就地修改）
+
+        Args:
+            frame: BGR 影像，記憶體不連續時會先複製
+            counter: 影格計數
+            timestamp: 擷取時間（Unix 時間，秒）
+
+        Returns:
+            np.ndarray: 嵌入後的影像
+        """
+        variable = struct.pack(">I", counter & 0xFFFFFFFF) + int(timestamp * 1000).to_bytes(6, "big")
+        checksum = zlib.crc32(variable, self._fixed_crc) & 0xFF
+        bits = np.unpackbits(np.frombuffer(variable + bytes([checksum]), dtype=np.uint8))
+        self._values[self._dynamic] = np.repeat(bits, self.repeat) if self.repeat > 1 else bits
+
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)
+        flat = frame.reshape(-1)
+        if self._positions is None:
+            blue = flat[0:len(self._values) * 3:3]
+            blue &= 0xFE
+            blue |= self._values
+        else:
+            flat[self._positions] = (flat[self._positions] & 0xFE) | self._values
+        return frame
+
+
+def _parse(raw: bytes) -> Optional[Dict]:
+    """驗證並解析完整內容的位元組"""
+    if len(raw) < FIXED_HEADER_SIZE or raw[0] != DYNAMIC_MAGIC:
+        return None
+    length = raw[1]
+    end = FIXED_HEADER_SIZE + length + DYNAMIC_SIZE
+    if length > MAX_DEVICE_BYTES or len(raw) < end:
+        return None
+    if zlib.crc32(raw[:end - 1]) & 0xFF != raw[end - 1]:
+        return None
+    device = raw[FIXED_HEADER_SIZE:FIXED_HEADER_SIZE + length].decode("utf-8", "replace")
+    counter = struct.unpack_from(">I", raw, FIXED_HEADER_SIZE + length)[0]
+    millis = int.from_bytes(raw[FIXED_HEADER_SIZE + length + 4:end - 1], "big")
+    return {"device": device, "counter": counter, "timestamp": millis / 1000}
+
+
+def read_payload(frame: np.ndarray) -> Optional[Dict]:
+    """
+    讀取標準版面的動態浮水印
+
+    Args:
+        frame: BGR 影像
+
+    Returns:
+        Optional[Dict]: 包含 device、counter、timestamp，格式或檢查碼錯誤則返回 None
+    """
+    blue = frame[:, :, 0].reshape(-1)[:MAX_PAYLOAD_BYTES * 8]
+    return _parse(np.packbits(blue & 1).tobytes())
+
+
+def read_payload_redundant(frame: np.ndarray) -> Optional[Dict]:
+    """
+    讀取冗餘版面的動態浮水印，每個位元以多數決還原
+
+    Args:
+        frame: BGR 影像
+
+    Returns:
+        Optional[Dict]: 包含 device、counter、timestamp，格式或檢查碼錯誤則返回 None
+    """
+    count = MAX_PAYLOAD_BYTES * 8 * REDUNDANCY
+    positions = redundancy_positions(frame.shape[:2], count)[:count]
+    positions = positions[positions < frame.size]
+    usable = len(positions) // REDUNDANCY * REDUNDANCY
+    votes = (frame.reshape(-1)[positions[:usable]] & 1).reshape(-1, REDUNDANCY).sum(axis=1)
+    return _parse(np.packbits((votes * 2 > REDUNDANCY).astype(np.uint8)).tobytes())
+
+
+def format_payload(payload: Dict) -> str:
+    """
+    將解出的內容轉為單行文字，格式為「裝置#計數@時間」
+
+    Args:
+        payload: read_payload 返回的內容
+
+    Returns:
+        str: 文字表示
+    """
+    return f"{payload['device']}#{payload['counter']}@{payload['timestamp']:.3f}"
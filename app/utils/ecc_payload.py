@@ -0,0 +1,211 @@
+"""
+錯誤更正浮水印模組
+
+以 Reed-Solomon 碼取代逐位元重複：文字先切成數個等長區塊各自加上同位位元組，
+區塊之間以位元組交錯排列，連續損毀會分散到不同區塊。最前方是一個獨立編碼的小標頭，
+記錄區塊數、區塊長度、同位位元組數與文字長度，解碼端不需事先知道這些參數。
+
+標準版面依序寫入藍色通道最低位元（與標準 LSB 相同），每個位元寫一次；
+分散版面使用 lsb_layout 的排列，每個位元只重複 ECC_REPEAT 次，
+長文字寫入的像素數約為冗餘模式（重複 REDUNDANCY 次）的三分之一，卻能修正成段的錯誤。
+同位位元組數隨區塊長度增減（MIN_NSYM 至 DEFAULT_NSYM），短文字不會被固定的同位位元組放大；
+標頭仍佔 14 個位元組，極短的 ASCII 文字逐位元重複反而寫入較少，見 prefers_repetition。
+
+解碼時可傳入原始影像大小：裁切後超出範圍的位置視為抹除（erasure），
+Reed-Solomon 修正抹除的能力是未知錯誤的兩倍。
+"""
+import numpy as np
+from functools import lru_cache
+from typing import Optional, Tuple
+from .lsb_layout import REDUNDANCY, redundancy_positions
+from .reed_solomon import FIELD_SIZE, rs_decode, rs_encode
+
+ECC_MAGIC = 0xEC
+HEADER_SIZE = 6    # 魔術碼、區塊數、區塊長度、同位位元組數、文字長度（16 位元）
+HEADER_NSYM = 8    # 標頭的同位位元組數，可修正 4 個位元組錯誤
+DEFAULT_NSYM = 32  # 每個資料區塊的同位位元組數上限，可修正 16 個位元組錯誤
+MIN_NSYM = 8       # 每個資料區塊的同位位元組數下限，可修正 4 個位元組錯誤
+ECC_REPEAT = 3     # 分散版面每個位元的重複次數
+MAX_TEXT_BYTES = 4096
+
+
+def parity_size(block_len: int) -> int:
+    """
+    每個資料區塊的同位位元組數：與區塊長度相同（碼率 1/2），限制在 MIN_NSYM 與 DEFAULT_NSYM 之間
+
+    Args:
+        block_len: 區塊的資料位元組數
+
+    Returns:
+        int: 同位位元組數
+    """
+    return min(DEFAULT_NSYM, max(MIN_NSYM, block_len))
+
+
+def encode_text(text: str, nsym: Optional[int] = None) -> np.ndarray:
+    """
+    將文字編碼為含標頭的 Reed-Solomon 位元組串流
+
+    Args:
+        text: 浮水印文字（以 UTF-8 編碼）
+        nsym: 每個資料區塊的同位位元組數，None 表示依區塊長度決定（parity_size）
+
+    Returns:
+        np.ndarray: 標頭碼字與交錯後的資料碼字（uint8）
+    """
+    data = text.encode("utf-8")[:MAX_TEXT_BYTES]
+    capacity = FIELD_SIZE - (nsym or DEFAULT_NSYM)
+    blocks = max(1, -(-len(data) // capacity))
+    block_len = max(1, -(-len(data) // blocks))
+    nsym = nsym or parity_size(block_len)
+    header = np.frombuffer(bytes([ECC_MAGIC, blocks, block_len, nsym]) + len(data).to_bytes(2, "big"),
+                           dtype=np.uint8)
+    padded = np.zeros(blocks * block_len, dtype=np.uint8)
+    padded[:len(data)] = np.frombuffer(data, dtype=np.uint8)
+    codewords = rs_encode(padded.reshape(blocks, block_len), nsym)
+    # 依欄交錯：每個區塊的第 i 個位元組相鄰
+    return np.concatenate([rs_encode(header, HEADER_NSYM)[0], codewords.T.reshape(-1)])
+
+
+@lru_cache(maxsize=32)
+def prefers_repetition(text: str) -> bool:
+    """
+    分散版面是否改用冗餘 LSB（逐位元重複 REDUNDANCY 次）
+
+    標頭與同位位元組使極短文字的錯誤更正編碼比逐位元重複寫入更多位置，此時改用冗餘 LSB；
+    冗餘 LSB 每個字元固定 8 位元，只適用於 ASCII 文字。
+
+    Args:
+        text: 浮水印文字
+
+    Returns:
+        bool: 逐位元重複的寫入位置數是否不多於錯誤更正編碼
+    """
+    if not text.isascii():
+        return False
+    return (len(text) + 1) * 8 * REDUNDANCY <= len(encode_text(text)) * 8 * ECC_REPEAT
+
+
+def _layout(shape: Tuple[int, int], redundant: bool, count: int) -> np.ndarray:
+    """前 count 個位元的寫入位置（攤平後的 (行, 列, 通道) 索引）"""
+    if redundant:
+        return redundancy_positions(shape, count)[:count]
+    return np.arange(count, dtype=np.int64) * 3
+
+
+class EccPayload:
+    """預先計算位元與位置的錯誤更正浮水印編碼器"""
+
+    def __init__(self, text: str, shape: Tuple[int, int], redundant: bool = False,
+                 nsym: Optional[int] = None):
+        """
+        編碼文字並建立嵌入位置
+
+        Args:
+            text: 浮水印文字
+            shape: 影像的 (高, 寬)
+            redundant: 是否使用分散版面
+            nsym: 每個資料區塊的同位位元組數，None 表示依區塊長度決定
+        """
+        self.text = text
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.redundant = redundant
+        self.repeat = ECC_REPEAT if redundant else 1
+        bits = np.unpackbits(encode_text(text, nsym))
+        self._values = np.repeat(bits, self.repeat) if self.repeat > 1 else bits
+        self._positions = _layout(self.shape, redundant, len(self._values))
+
+    @property
+    def writes(self) -> int:
+        """每次嵌入寫入的位置數"""
+        return len(self._values)
+
+    def fits(self) -> bool:
+        """影像是否足以容納整段編碼"""
+        return len(self._positions) == len(self._values) and self._positions[-1] < self.shape[0] * self.shape[1] * 3
+
+    def embed(self, frame: np.ndarray) -> np.ndarray:
+        """
+        嵌入浮水印（就地修改）
+
+        Args:
+            frame: BGR 影像，記憶體不連續時會先複製
+
+        Returns:
+            np.ndarray: 嵌入後的影像
+        """
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)
+        flat = frame.reshape(-1)
+        if self.redundant:
+            flat[self._positions] = (flat[self._positions] & 0xFE) | self._values
+        else:
+            blue = flat[0:len(self._values) * 3:3]
+            blue &= 0xFE
+            blue |= self._values
+        return frame
+
+
+def _read_bytes(frame: np.ndarray, shape: Tuple[int, int], positions: np.ndarray,
+                repeat: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    讀取位置上的位元並以多數決還原位元組
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (位元組, 是否抹除)；所有副本都在影像範圍外的位元使其位元組視為抹除
+    """
+    height, width = frame.shape[:2]
+    pixel, channel = np.divmod(positions, 3)
+    row, col = np.divmod(pixel, shape[1])
+    available = (row < height) & (col < width)
+    values = np.zeros(len(positions), dtype=np.uint8)
+    values[available] = frame[row[available], col[available], channel[available]] & 1
+    ones = values.reshape(-1, repeat).sum(axis=1)
+    present = available.reshape(-1, repeat).sum(axis=1)
+    data = np.packbits((ones * 2 > present).astype(np.uint8))
+    erased = (present == 0).reshape(-1, 8).any(axis=1)
+    return data, erased
+
+
+def read_ecc_text(frame: np.ndarray, redundant: bool = False,
+                  shape: Optional[Tuple[int, int]] = None) -> Optional[str]:
+    """
+    讀取錯誤更正浮水印
+
+    Args:
+        frame: BGR 影像
+        redundant: 是否為分散版面
+        shape: 嵌入時的影像 (高, 寬)；影像被裁切時提供，缺少的位置視為抹除
+
+    Returns:
+        Optional[str]: 浮水印文字，標頭或任一區塊無法修正時返回 None
+    """
+    shape = (int(shape[0]), int(shape[1])) if shape else frame.shape[:2]
+    repeat = ECC_REPEAT if redundant else 1
+    capacity = shape[0] * shape[1] * (3 if redundant else 1)
+
+    header_len = HEADER_SIZE + HEADER_NSYM
+    if header_len * 8 * repeat > capacity:
+        return None
+    raw, erased = _read_bytes(frame, shape, _layout(shape, redundant, header_len * 8 * repeat), repeat)
+    header, ok = rs_decode(raw, HEADER_NSYM, [np.flatnonzero(erased)])
+    header = header[0]
+    if not ok[0] or header[0] != ECC_MAGIC:
+        return None
+    blocks, block_len, nsym = int(header[1]), int(header[2]), int(header[3])
+    length = int(header[4]) << 8 | int(header[5])
+    n = block_len + nsym
+    if blocks == 0 or block_len == 0 or n > FIELD_SIZE or length > blocks * block_len:
+        return None
+
+    total = (header_len + blocks * n) * 8 * repeat
+    if total > capacity:
+        return None
+    positions = _layout(shape, redundant, total)[header_len * 8 * repeat:]
+    raw, erased = _read_bytes(frame, shape, positions, repeat)
+    codewords = raw.reshape(n, blocks).T
+    erasures = [np.flatnonzero(column) for column in erased.reshape(n, blocks).T]
+    data, ok = rs_decode(codewords, nsym, erasures)
+    if not ok.all():
+        return None
+    return data.reshape(-1)[:length].tobytes().decode("utf-8", "replace")
@@ -0,0 +1,199 @@
+"""
+影像浮水印嵌入服務模組
+
+供其他系統（例如匯出的報表、渲染後的儀表板）直接送出影像嵌入浮水印，不需要先顯示在螢幕上。
+嵌入在工作行程中進行，每個工作行程各有一個不擷取畫面的 ScreenCapture，
+因此支援的模式與螢幕串流完全相同。批次處理時最多同時處理 max_in_flight 張影像，
+結果依送出順序取回，上傳與回應都以串流方式進行，整批影像不會同時留在記憶體中。
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from .bitplane_layout import DEFAULT_BITS, DEFAULT_CHANNELS, parse_channels
+
+EMBED_WORKERS_ENV = "LSB_EMBED_WORKERS"
+MAX_IMAGE_BYTES = 64 * 1024 * 1024
+
+# 模式名稱與 ScreenCapture.set_watermark 參數，名稱與 frame_index.MODES 相同。
+# 時間分散模式把文字分散到連續影格，單張影像只帶一個區塊，因此不提供。
+EMBED_MODES = {
+    "lsb": {},
+    "lsb_redundant": {"redundancy": True},
+    "visible": {"visible": True},
+    "visible_redundant": {"visible": True, "redundancy": True},
+    "dct": {"dct": True},
+    "dynamic": {"dynamic": True},
+    "dynamic_redundant": {"dynamic": True, "redundancy": True},
+    "ecc": {"ecc": True},
+    "ecc_redundant": {"ecc": True, "redundancy": True},
+    "bitplane": {"bitplane": True},
+    "bitplane_redundant": {"bitplane": True, "redundancy": True},
+    "visible_lsb": {"hybrid": True},
+    "visible_lsb_redundant": {"hybrid": True, "redundancy": True},
+}
+
+# 輸出格式：(副檔名, 編碼參數, MIME 類型)；WebP 品質 101 為無損
+OUTPUT_FORMATS = {
+    "png": (".png", (), "image/png"),
+    "bmp": (".bmp", (), "image/bmp"),
+    "webp": (".webp", (101,), "image/webp"),
+    "jpeg": (".jpg", (95,), "image/jpeg"),
+}
+# 有損格式會破壞最低位元，只允許可見浮水印與頻率域浮水印
+LOSSY_FORMATS = {"jpeg"}
+LOSSY_SAFE_MODES = {"visible", "visible_redundant", "dct"}
+
+# 工作行程內的浮水印處理器
+_worker_renderer = None
+
+
+def check_options(mode: str, fmt: str, bits: int = DEFAULT_BITS, channels: str = DEFAULT_CHANNELS):
+    """
+    檢查模式、輸出格式與多位元平面版面
+
+    Args:
+        mode: 浮水印模式名稱
+        fmt: 輸出格式
+        bits: 多位元平面模式每個通道的位元數
+        channels: 多位元平面模式使用的通道
+
+    Raises:
+        ValueError: 不支援的模式、格式、版面，或以有損格式輸出最低位元浮水印
+    """
+    if mode not in EMBED_MODES:
+        raise ValueError(f"不支援的浮水印模式: {mode}（可用: {', '.join(EMBED_MODES)}）")
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"不支援的輸出格式: {fmt}（可用: {', '.join(OUTPUT_FORMATS)}）")
+    if fmt in LOSSY_FORMATS and mode not in LOSSY_SAFE_MODES:
+        raise ValueError(f"{fmt} 為有損格式，會破壞 {mode} 浮水印，請改用 png、bmp 或 webp")
+    if bits not in (1, 2):
+        raise ValueError(f"每個通道只能寫入 1 或 2 個位元: {bits}")
+    parse_channels(channels)
+
+
+def embed_image(data: bytes, options: Dict) -> Tuple[bytes, str]:
+    """
+    解碼影像、嵌入浮水印並重新編碼（於工作行程中執行）
+
+    Args:
+        data: 影像檔內容（OpenCV 可解碼的任何格式）
+        options: text、mode、format，動態浮水印使用的 device 與 counter，以及多位元平面版面的 bits 與 channels
+
+    Returns:
+        Tuple[bytes, str]: (編碼後的影像, 實際套用的浮水印模式)
+    """
+    global _worker_renderer
+    import cv2
+    import numpy as np
+    from .screen_capture import ScreenCapture
+
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("無法解碼影像")
+    if _worker_renderer is None:
+        # 工作行程不擷取畫面，不會開啟螢幕擷取資源
+        _worker_renderer = ScreenCapture()
+    renderer = _worker_renderer
+    # 處理器在請求之間重複使用，每次都重設所有會影響嵌入結果的設定，不沿用上一個請求的值
+    renderer.set_watermark(options["text"], **EMBED_MODES[options["mode"]])
+    renderer.set_bitplane_layout(options.get("bits", DEFAULT_BITS), options.get("channels", DEFAULT_CHANNELS))
+    renderer.set_device_name(options.get("device") or "")  # 空字串為伺服器主機名稱
+    renderer.target_regions = None
+    renderer.temporal_sequence = 0
+    renderer.payload_counter = options.get("counter", 0)
+    renderer.payload_timestamp = time.time()
+    watermarked = renderer.apply_watermark(image)
+
+    extension, quality, _ = OUTPUT_FORMATS[options["format"]]
+    params = []
+    if quality:
+        params = [cv2.IMWRITE_WEBP_QUALITY if extension == ".webp" else cv2.IMWRITE_JPEG_QUALITY, quality[0]]
+    ok, encoded = cv2.imencode(extension, watermarked, params)
+    if not ok:
+        raise ValueError(f"無法編碼為 {options['format']}")
+    return encoded.tobytes(), renderer._watermark_mode_label()
+
+
+class EmbedService:
+    """以行程池嵌入浮水印的服務"""
+
+    def __init__(self, workers: Optional[int] = None, max_in_flight: Optional[int] = None):
+        """
+        初始化服務，工作行程在第一次嵌入時才建立
+
+        Args:
+            workers: 工作行程數，預設為 LSB_EMBED_WORKERS 或 CPU 核心數
+            max_in_flight: 批次處理時最多同時處理的影像數，預設為工作行程數的兩倍
+        """
+        self.workers = workers or int(os.environ.get(EMBED_WORKERS_ENV) or 0) or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.workers * 2
+        self._executor = None
+
+    def _submit(self, data: bytes, options: Dict) -> "asyncio.Future":
+        if self._executor is None:
+            # 以 spawn 建立工作行程，避免 fork 時複製到其他執行緒正持有的鎖（見 frame_workers）
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return asyncio.get_running_loop().run_in_executor(self._executor, embed_image, data, options)
+
+    async def embed(self, data: bytes, options: Dict) -> Tuple[bytes, str]:
+        """
+        嵌入單張影像
+
+        Args:
+            data: 影像檔內容
+            options: text、mode、format、device（見 embed_image）
+
+        Returns:
+            Tuple[bytes, str]: (編碼後的影像, 實際套用的浮水印模式)
+        """
+        return await self._submit(data, options)
+
+    async def embed_stream(self, images: AsyncIterator[Tuple[str, Optional[bytes]]],
+                           options: Dict) -> AsyncIterator[Tuple[str, Optional[bytes], str]]:
+        """
+        依序嵌入一連串影像，邊讀取邊處理，結果依輸入順序產生
+
+        處理中的影像達到 max_in_flight 時先等待最舊的結果，上傳端因此會被限速。
+        單張影像失敗不會中止整批處理。
+
+        Args:
+            images: 非同步產生的 (檔名, 影像檔內容)，內容為 None 表示檔案超過 MAX_IMAGE_BYTES
+            options: text、mode、format、device；動態浮水印的影格計數為影像在批次中的序號
+
+        Yields:
+            Tuple[str, Optional[bytes], str]: (檔名, 編碼後的影像, 浮水印模式)，失敗時為 (檔名, None, 錯誤訊息)
+        """
+        pending = deque()
+        index = 0
+        async for name, data in images:
+            if data is None:
+                future = asyncio.get_running_loop().create_future()
+                future.set_exception(ValueError(f"影像超過 {MAX_IMAGE_BYTES // (1024 * 1024)} MB"))
+            else:
+                future = self._submit(data, dict(options, counter=index))
+            pending.append((name, future))
+            index += 1
+            while pending and (len(pending) >= self.max_in_flight or pending[0][1].done()):
+                yield await self._result(*pending.popleft())
+        while pending:
+            yield await self._result(*pending.popleft())
+
+    async def _result(self, name: str, future: "asyncio.Future") -> Tuple[str, Optional[bytes], str]:
+        try:
+            data, mode = await future
+            return name, data, mode
+        except Exception as e:
+            print(f"嵌入浮水印失敗 {name}: {str(e)}")
+            return name, None, str(e)
+
+    def close(self):
+        """關閉工作行程"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
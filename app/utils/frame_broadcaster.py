@@ -0,0 +1,103 @@
+"""
+畫面廣播模組
+
+由單一背景任務擷取並編碼畫面，最新的 JPEG 存放在共用緩衝區，
+WebSocket 與 MJPEG 等所有觀看端都讀取同一份資料。觀看端再多也只編碼一次，
+較慢的觀看端直接跳到最新一幀，不會拖慢其他觀看端或擷取本身。
+"""
+import asyncio
+import time
+from typing import Callable, Optional, Tuple
+from .metrics import FRAMES_DROPPED
+
+
+class FrameBroadcaster:
+    """共用編碼緩衝區的畫面廣播器"""
+
+    def __init__(self, producer: Callable[[], Tuple[bool, bytes]], fps: float = 30.0):
+        """
+        初始化廣播器
+
+        Args:
+            producer: 擷取並編碼一幀的函式，返回 (是否成功, JPEG 資料)
+            fps: 擷取的目標幀率
+        """
+        self.producer = producer
+        self.fps = fps
+        self.latest = b''
+        self.sequence = 0  # 每產生一幀加一
+        self.subscribers = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self):
+        """加入一個觀看端，第一個觀看端加入時啟動背景擷取"""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        self.subscribers += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._produce())
+
+    def unsubscribe(self):
+        """移除一個觀看端，沒有觀看端時停止背景擷取"""
+        self.subscribers = max(0, self.subscribers - 1)
+        if self.subscribers == 0 and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _produce(self):
+        """背景擷取迴圈，依目標幀率更新共用緩衝區"""
+        period = 1.0 / self.fps
+        next_due = time.perf_counter()
+        while True:
+            try:
+                success, frame_data = self.producer()
+                if success:
+                    async with self._condition:
+                        self.latest = frame_data
+                        self.sequence += 1
+                        self._condition.notify_all()
+                else:
+                    FRAMES_DROPPED.inc(reason="capture")
+            except Exception as e:
+                print(f"擷取畫面錯誤: {str(e)}")
+
+            # 依排程時間計算等待，處理耗時不會累積成幀率下降
+            next_due = max(next_due + period, time.perf_counter())
+            await asyncio.sleep(next_due - time.perf_counter())
+
+    async def wait_frame(self, after: int) -> Tuple[int, bytes]:
+        """
+        等待比指定序號更新的一幀
+
+        Args:
+            after: 觀看端上一次取得的序號
+
+        Returns:
+            Tuple[int, bytes]: (序號, JPEG 資料)
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.sequence > after)
+            return self.sequence, self.latest
+
+
+class FrameRateLimiter:
+    """單一觀看端的幀率上限"""
+
+    def __init__(self, max_fps: Optional[float] = None):
+        """
+        Args:
+            max_fps: 幀率上限，None 或 0 表示不限制（跟隨擷取幀率）
+        """
+        self.interval = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        """送出下一幀前等待到允許的時間"""
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
@@ -0,0 +1,316 @@
+"""
+錄影索引模組
+
+錄影時為每一個寫入的影格在旁邊的 .idx 檔記錄一筆固定長度的紀錄：
+擷取時間、是否嵌入浮水印、浮水印模式、內容識別碼（CRC32）與影格在 MP4 檔中的位元組位移。
+索引檔是「檔頭 + 結構化紀錄陣列」，可直接以 np.memmap 開啟，
+鑑識工具與介面不需解碼影片即可找到嵌有浮水印的影格並直接跳轉。
+
+檔頭（32 位元組）：魔術碼 | 版本 | 檔頭長度 | 紀錄長度 | 影格率 | 實際擷取幀率
+錄影以固定影格率輸出，擷取較慢時重複、較快時捨棄影格，每 N 個擷取影格嵌入一次的浮水印在影片中
+相隔 N × 影格率 / 擷取幀率 幀；擷取幀率在錄影結束時寫入（版本 1 的檔案此欄為 0，視為未知）。
+"""
+import os
+import struct
+import zlib
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+INDEX_MAGIC = b"LSBFRIDX"
+INDEX_VERSION = 2
+INDEX_SUFFIX = ".idx"
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u2"),
+    ("header_size", "<u2"),
+    ("record_size", "<u2"),
+    ("reserved0", "<u2"),
+    ("fps", "<f8"),
+    ("capture_fps", "<f8"),  # 實際擷取幀率，錄影結束時寫入，0 表示未知
+])
+
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),    # 擷取時間（Unix 時間，秒）
+    ("offset", "<i8"),       # 影格資料在 MP4 檔中的位元組位移，無法取得時為 -1
+    ("frame", "<u4"),        # 影格在錄影檔中的編號
+    ("payload_id", "<u4"),   # 浮水印文字的 CRC32，未嵌入時為 0
+    ("watermarked", "u1"),   # 是否嵌入浮水印
+    ("mode", "u1"),          # 浮水印模式代碼，見 MODES
+    ("reserved", "V6"),
+])
+
+# 浮水印模式代碼，與 ScreenCapture._watermark_mode_label 的名稱對應
+MODES = ("none", "lsb", "lsb_redundant", "visible", "visible_redundant", "temporal", "dct",
+         "dynamic", "dynamic_redundant", "ecc", "ecc_redundant", "bitplane", "bitplane_redundant",
+         "visible_lsb", "visible_lsb_redundant")
+MODE_CODES = {name: code for code, name in enumerate(MODES)}
+
+
+def index_path_for(video_path: str) -> str:
+    """
+    取得錄影檔對應的索引檔路徑
+
+    Args:
+        video_path: 錄影檔路徑
+
+    Returns:
+        str: 索引檔路徑
+    """
+    return os.path.splitext(video_path)[0] + INDEX_SUFFIX
+
+
+def payload_id(text: str) -> int:
+    """
+    計算浮水印文字的識別碼
+
+    Args:
+        text: 浮水印文字
+
+    Returns:
+        int: CRC32，空字串為 0
+    """
+    return zlib.crc32(text.encode("utf-8")) if text else 0
+
+
+class FrameIndexWriter:
+    """逐格追加紀錄的索引檔寫入器"""
+
+    def __init__(self, path: str, fps: float, flush_every: int = 64):
+        """
+        建立索引檔並寫入檔頭
+
+        Args:
+            path: 索引檔路徑
+            fps: 錄影檔影格率
+            flush_every: 累積多少筆紀錄後寫入檔案
+        """
+        self.path = path
+        self.count = 0
+        self.flush_every = flush_every
+        self._pending: List[Tuple] = []
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = INDEX_MAGIC
+        header["version"] = INDEX_VERSION
+        header["header_size"] = HEADER_DTYPE.itemsize
+        header["record_size"] = RECORD_DTYPE.itemsize
+        header["fps"] = fps
+        self._file = open(path, "wb")
+        self._file.write(header.tobytes())
+
+    def append(self, timestamp: float, watermarked: bool, mode: str, payload: int):
+        """
+        追加一筆影格紀錄（影格編號依寫入順序遞增）
+
+        Args:
+            timestamp: 擷取時間
+            watermarked: 是否嵌入浮水印
+            mode: 浮水印模式名稱
+            payload: 浮水印識別碼
+        """
+        code = MODE_CODES.get(mode, 0) if watermarked else 0
+        self._pending.append((timestamp, -1, self.count, payload if watermarked else 0,
+                              int(watermarked), code, b""))
+        self.count += 1
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """將暫存的紀錄寫入檔案"""
+        if self._pending:
+            self._file.write(np.array(self._pending, dtype=RECORD_DTYPE).tobytes())
+            self._pending = []
+        self._file.flush()
+
+    def close(self, video_path: Optional[str] = None, capture_fps: Optional[float] = None):
+        """
+        寫入剩餘紀錄並關閉檔案
+
+        Args:
+            video_path: 已完成的錄影檔，若提供則從 MP4 樣本表回填每個影格的位元組位移
+            capture_fps: 錄影期間的實際擷取幀率，若提供則寫入檔頭
+        """
+        self.flush()
+        if capture_fps:
+            self._file.seek(HEADER_DTYPE.fields["capture_fps"][1])
+            self._file.write(struct.pack("<d", capture_fps))
+        self._file.close()
+        if video_path and self.count:
+            offsets = mp4_sample_offsets(video_path)
+            if offsets is not None:
+                records = np.memmap(self.path, dtype=RECORD_DTYPE, mode="r+",
+                                    offset=HEADER_DTYPE.itemsize, shape=(self.count,))
+                usable = min(len(offsets), self.count)
+                records["offset"][:usable] = offsets[:usable]
+                records.flush()
+                del records
+
+
+def read_index(path: str) -> Tuple[Dict, np.ndarray]:
+    """
+    以記憶體映射方式開啟索引檔
+
+    Args:
+        path: 索引檔或錄影檔路徑
+
+    Returns:
+        Tuple[Dict, np.ndarray]: (檔頭資訊, 唯讀的紀錄陣列)；檔頭資訊的 capture_fps 未知時為 None
+    """
+    if not path.endswith(INDEX_SUFFIX):
+        path = index_path_for(path)
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) == 0 or header["magic"][0] != INDEX_MAGIC:
+        raise ValueError(f"不是有效的錄影索引檔: {path}")
+    header_size = int(header["header_size"][0])
+    if int(header["record_size"][0]) != RECORD_DTYPE.itemsize:
+        raise ValueError(f"不支援的索引紀錄長度: {path}")
+
+    count = (os.path.getsize(path) - header_size) // RECORD_DTYPE.itemsize
+    capture_fps = float(header["capture_fps"][0])
+    info = {"version": int(header["version"][0]), "fps": float(header["fps"][0]),
+            "capture_fps": capture_fps if capture_fps > 0 else None, "frames": count}
+    if count == 0:
+        return info, np.zeros(0, dtype=RECORD_DTYPE)
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=header_size, shape=(count,))
+    return info, records
+
+
+def watermarked_frames(records: np.ndarray, payload: Optional[int] = None) -> np.ndarray:
+    """
+    找出嵌有浮水印的影格編號
+
+    Args:
+        records: read_index 返回的紀錄陣列
+        payload: 若提供，只返回此識別碼的影格
+
+    Returns:
+        np.ndarray: 影格編號
+    """
+    mask = records["watermarked"] != 0
+    if payload is not None:
+        mask &= records["payload_id"] == payload
+    return records["frame"][mask]
+
+
+def _iter_boxes(data: bytes, start: int, end: int):
+    """依序列出 MP4 box 的 (類型, 內容起點, 內容終點)"""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _find_box(data: bytes, start: int, end: int, kind: bytes) -> Optional[Tuple[int, int]]:
+    for box, body, box_end in _iter_boxes(data, start, end):
+        if box == kind:
+            return body, box_end
+    return None
+
+
+def _read_moov(path: str) -> Optional[bytes]:
+    """只讀取 MP4 最上層的 moov box，略過體積龐大的 mdat"""
+    with open(path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        pos = 0
+        while pos + 8 <= file_size:
+            f.seek(pos)
+            size, kind = struct.unpack(">I4s", f.read(8))
+            header = 8
+            if size == 1:
+                size = struct.unpack(">Q", f.read(8))[0]
+                header = 16
+            elif size == 0:
+                size = file_size - pos
+            if size < header:
+                return None
+            if kind == b"moov":
+                f.seek(pos)
+                return f.read(size)
+            pos += size
+    return None
+
+
+def mp4_sample_offsets(path: str) -> Optional[np.ndarray]:
+    """
+    從 MP4 的樣本表（stsz、stsc、stco/co64）計算視訊軌每個樣本的位元組位移
+
+    只讀取 moov box，不讀取也不解碼影像資料。
+
+    Args:
+        path: MP4 檔路徑
+
+    Returns:
+        Optional[np.ndarray]: 依解碼順序的樣本位移，不是可解析的 MP4 時返回 None
+    """
+    try:
+        data = _read_moov(path)
+        if data is None:
+            return None
+        moov = _find_box(data, 0, len(data), b"moov")
+        for kind, body, box_end in _iter_boxes(data, *moov):
+            if kind != b"trak":
+                continue
+            mdia = _find_box(data, body, box_end, b"mdia")
+            hdlr = mdia and _find_box(data, *mdia, b"hdlr")
+            if not hdlr or data[hdlr[0] + 8:hdlr[0] + 12] != b"vide":
+                continue
+            minf = _find_box(data, *mdia, b"minf")
+            stbl = minf and _find_box(data, *minf, b"stbl")
+            if not stbl:
+                return None
+            return _sample_offsets(data, stbl)
+    except (OSError, struct.error, ValueError):
+        return None
+    return None
+
+
+def _sample_offsets(data: bytes, stbl: Tuple[int, int]) -> Optional[np.ndarray]:
+    """由樣本表計算每個樣本的位移"""
+    stsz = _find_box(data, *stbl, b"stsz")
+    stsc = _find_box(data, *stbl, b"stsc")
+    stco = _find_box(data, *stbl, b"stco")
+    co64 = _find_box(data, *stbl, b"co64")
+    if not stsz or not stsc or not (stco or co64):
+        return None
+
+    uniform, count = struct.unpack_from(">II", data, stsz[0] + 4)
+    if uniform:
+        sizes = np.full(count, uniform, dtype=np.int64)
+    else:
+        sizes = np.frombuffer(data, dtype=">u4", count=count, offset=stsz[0] + 12).astype(np.int64)
+
+    if co64:
+        chunks = struct.unpack_from(">I", data, co64[0] + 4)[0]
+        chunk_offsets = np.frombuffer(data, dtype=">u8", count=chunks, offset=co64[0] + 8).astype(np.int64)
+    else:
+        chunks = struct.unpack_from(">I", data, stco[0] + 4)[0]
+        chunk_offsets = np.frombuffer(data, dtype=">u4", count=chunks, offset=stco[0] + 8).astype(np.int64)
+
+    entries = struct.unpack_from(">I", data, stsc[0] + 4)[0]
+    table = np.frombuffer(data, dtype=">u4", count=entries * 3, offset=stsc[0] + 8).reshape(-1, 3)
+
+    # 展開每個 chunk 的樣本數（stsc 以「起始 chunk 編號、每 chunk 樣本數」分段描述）
+    per_chunk = np.zeros(chunks, dtype=np.int64)
+    for i, (first, samples, _) in enumerate(table):
+        last = table[i + 1][0] - 1 if i + 1 < entries else chunks
+        per_chunk[first - 1:last] = samples
+
+    offsets = np.empty(count, dtype=np.int64)
+    sample = 0
+    for chunk_offset, samples in zip(chunk_offsets, per_chunk):
+        samples = min(int(samples), count - sample)
+        if samples <= 0:
+            break
+        sizes_in_chunk = sizes[sample:sample + samples]
+        offsets[sample:sample + samples] = chunk_offset + np.concatenate(([0], np.cumsum(sizes_in_chunk)[:-1]))
+        sample += samples
+    return offsets[:sample]
@@ -0,0 +1,435 @@
+"""
+原始影格環形緩衝區模組
+
+將嵌入浮水印後的 BGR 影格發布到記憶體映射檔，本機的其他程式（畫面分享代理、DLP 掃描器等）
+可直接映射同一個檔案讀取原始像素，不需經過 JPEG 或 MP4 編解碼，也不需複製。
+
+檔案格式：檔頭（64 位元組）+ N 個槽位，每個槽位是槽位檔頭（64 位元組）+ 影格資料。
+檔頭記錄槽位容量與寫入索引（已發布的影格總數，最新一幀位於 (寫入索引 - 1) % N）；
+槽位檔頭記錄影格序號、擷取時間、形狀與是否嵌入浮水印。
+
+每個槽位以 seqlock 保護：寫入前把 lock 加一（奇數表示寫入中），寫完再加一。
+讀取端在讀取前後比對 lock，相同且為偶數才表示資料完整；寫入端從不等待讀取端，
+讀得太慢的讀取端只會發現槽位已被覆寫（序號不符）而略過，不會拖慢擷取。
+
+讀取範例：
+    reader = FrameRingReader("/dev/shm/lsb_frames.ring")
+    result = reader.read()            # (序號, 擷取時間, 影格副本)
+    sequence, timestamp, frame, lock = reader.view()
+    ...                               # 直接使用映射中的像素
+    if not reader.unchanged(sequence, lock): ...  # 處理期間被覆寫，結果作廢
+
+使用方式：
+    python -m app.utils.frame_ring /dev/shm/lsb_frames.ring
+"""
+import argparse
+import mmap
+import os
+import time
+import numpy as np
+from typing import Optional, Tuple
+
+# 啟動時啟用環形緩衝區的環境變數（檔案路徑與槽位數）
+FRAME_RING_ENV = "LSB_FRAME_RING"
+FRAME_RING_SLOTS_ENV = "LSB_FRAME_RING_SLOTS"
+
+RING_MAGIC = b"LSBRING1"
+RING_VERSION = 1
+DEFAULT_SLOTS = 4
+ALIGNMENT = 64
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u2"),
+    ("header_size", "<u2"),
+    ("slot_header_size", "<u2"),
+    ("closed", "u1"),          # 檔案已被新的環形緩衝區取代，讀取端應重新開啟
+    ("reserved0", "u1"),
+    ("slots", "<u4"),
+    ("height", "<u4"),         # 槽位容量（最大影格形狀）
+    ("width", "<u4"),
+    ("channels", "<u4"),
+    ("slot_stride", "<u8"),    # 相鄰槽位的位元組距離
+    ("write_index", "<u8"),    # 已發布的影格總數
+    ("reserved1", "V16"),
+])
+
+SLOT_DTYPE = np.dtype([
+    ("lock", "<u8"),           # seqlock，奇數表示寫入中
+    ("sequence", "<u8"),       # 影格序號（從 0 開始）
+    ("timestamp", "<f8"),      # 擷取時間（Unix 時間，秒）
+    ("height", "<u4"),
+    ("width", "<u4"),
+    ("channels", "<u4"),
+    ("watermarked", "u1"),
+    ("reserved", "V27"),
+])
+
+
+def _slot_stride(height: int, width: int, channels: int) -> int:
+    """槽位大小，以 64 位元組對齊"""
+    size = SLOT_DTYPE.itemsize + height * width * channels
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _map_views(buffer, header) -> Tuple[np.ndarray, np.ndarray]:
+    """建立所有槽位檔頭與影格資料的視圖（不複製）"""
+    slots, stride = int(header["slots"]), int(header["slot_stride"])
+    height, width, channels = int(header["height"]), int(header["width"]), int(header["channels"])
+    meta = np.ndarray((slots,), dtype=SLOT_DTYPE, buffer=buffer,
+                      offset=HEADER_DTYPE.itemsize, strides=(stride,))
+    data = np.ndarray((slots, height * width * channels), dtype=np.uint8, buffer=buffer,
+                      offset=HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize, strides=(stride, 1))
+    return meta, data
+
+
+class FrameRingWriter:
+    """發布影格到記憶體映射環形緩衝區（單一寫入端）"""
+
+    def __init__(self, path: str, shape: Tuple[int, int, int], slots: int = DEFAULT_SLOTS):
+        """
+        建立（或覆蓋）環形緩衝區檔案
+
+        Args:
+            path: 檔案路徑，Linux 上建議放在 /dev/shm 以避免寫入磁碟
+            shape: 槽位容量（最大影格形狀 (高, 寬, 通道)）
+            slots: 槽位數
+        """
+        self.path = path
+        self.slots = max(2, int(slots))
+        self.shape = tuple(int(v) for v in shape)
+        self.published = 0
+        self._mmap = None
+        self._open()
+
+    def _open(self):
+        """以暫存檔建立新的環形緩衝區後原子地取代舊檔案"""
+        height, width, channels = self.shape
+        stride = _slot_stride(height, width, channels)
+        size = HEADER_DTYPE.itemsize + stride * self.slots
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.truncate(size)
+        with open(temp_path, "r+b") as f:
+            buffer = mmap.mmap(f.fileno(), size)
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=buffer)
+        header["magic"] = RING_MAGIC
+        header["version"] = RING_VERSION
+        header["header_size"] = HEADER_DTYPE.itemsize
+        header["slot_header_size"] = SLOT_DTYPE.itemsize
+        header["slots"] = self.slots
+        header["height"], header["width"], header["channels"] = height, width, channels
+        header["slot_stride"] = stride
+        header["write_index"] = self.published
+
+        # 先標記舊檔案已關閉，讀取端看到後會重新開啟新檔案
+        self._close_mapping(mark_closed=True)
+        os.replace(temp_path, self.path)
+        self._mmap = buffer
+        self._header = header
+        self._meta, self._data = _map_views(buffer, header)
+
+    def _close_mapping(self, mark_closed: bool):
+        """釋放目前的映射"""
+        if self._mmap is None:
+            return
+        if mark_closed:
+            self._header["closed"] = 1
+        self._header = self._meta = self._data = None
+        self._mmap.close()
+        self._mmap = None
+
+    def publish(self, frame: np.ndarray, timestamp: float, watermarked: bool = False) -> int:
+        """
+        發布一幀（寫入端從不等待讀取端）
+
+        Args:
+            frame: BGR 影格
+            timestamp: 擷取時間（Unix 時間，秒）
+            watermarked: 這一幀是否嵌入浮水印
+
+        Returns:
+            int: 影格序號
+        """
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        if height * width * channels > self._data.shape[1]:
+            # 解析度變大時重建檔案，讀取端依 closed 旗標重新開啟
+            self.shape = (height, width, channels)
+            self._open()
+
+        sequence = self.published
+        slot = sequence % self.slots
+        meta = self._meta[slot]
+        lock = int(meta["lock"])
+        meta["lock"] = lock + 1
+        target = self._data[slot, :height * width * channels].reshape(frame.shape)
+        np.copyto(target, frame)
+        meta["sequence"] = sequence
+        meta["timestamp"] = timestamp
+        meta["height"], meta["width"], meta["channels"] = height, width, channels
+        meta["watermarked"] = watermarked
+        meta["lock"] = lock + 2
+        self.published = sequence + 1
+        self._header["write_index"] = self.published
+        return sequence
+
+    def status(self) -> dict:
+        """
+        取得環形緩衝區狀態
+
+        Returns:
+            dict: 路徑、槽位數、容量與已發布的影格數
+        """
+        return {
+            "path": self.path,
+            "slots": self.slots,
+            "shape": list(self.shape),
+            "published": self.published,
+        }
+
+    def close(self, unlink: bool = False):
+        """
+        關閉環形緩衝區
+
+        Args:
+            unlink: 是否一併刪除檔案
+        """
+        self._close_mapping(mark_closed=True)
+        if unlink:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class FrameRingReader:
+    """讀取記憶體映射環形緩衝區（可有多個讀取端，互不影響）"""
+
+    def __init__(self, path: str, retries: int = 3):
+        """
+        開啟環形緩衝區檔案；檔案尚不存在時先不映射，寫入端建立檔案後自動連接
+
+        Args:
+            path: 檔案路徑
+            retries: 讀取時遇到寫入中的槽位的重試次數
+        """
+        self.path = path
+        self.retries = retries
+        self.lapped = 0  # 因讀取太慢而被覆寫、無法取得的影格數
+        self._mmap = None
+        self._header = self._meta = self._data = None
+        self.slots = 0
+        self._open()
+
+    def _open(self) -> bool:
+        """
+        映射檔案並驗證檔頭
+
+        Returns:
+            bool: 是否成功映射；檔案不存在（寫入端已停用並刪除檔案）或長度不足時返回 False
+
+        Raises:
+            ValueError: 檔案不是環形緩衝區
+        """
+        self.close()
+        try:
+            with open(self.path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # ValueError：空檔案無法映射
+            return False
+        if len(buffer) < HEADER_DTYPE.itemsize:
+            buffer.close()
+            return False
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=buffer)
+        if header["magic"] != RING_MAGIC or header["version"] != RING_VERSION:
+            del header
+            buffer.close()
+            raise ValueError(f"不是有效的影格環形緩衝區: {self.path}")
+        if len(buffer) < HEADER_DTYPE.itemsize + int(header["slot_stride"]) * int(header["slots"]):
+            del header
+            buffer.close()
+            return False
+        self._mmap = buffer
+        self._header = header
+        self._meta, self._data = _map_views(buffer, header)
+        self.slots = int(header["slots"])
+        return True
+
+    def _refresh(self) -> bool:
+        """
+        寫入端已換成新檔案或尚未連接時重新開啟
+
+        Returns:
+            bool: 目前是否已映射到有效的環形緩衝區
+        """
+        if self._header is None or self._header["closed"]:
+            return self._open()
+        return True
+
+    @property
+    def attached(self) -> bool:
+        """是否已映射到寫入端目前使用的檔案"""
+        return self._refresh()
+
+    @property
+    def write_index(self) -> int:
+        """已發布的影格總數，沒有可用的環形緩衝區時為 0"""
+        if not self._refresh():
+            return 0
+        return int(self._header["write_index"])
+
+    def _resolve(self, sequence: Optional[int]) -> Optional[int]:
+        """取得要讀取的序號，尚未發布或已被覆寫時返回 None"""
+        written = self.write_index
+        if written == 0:
+            return None
+        if sequence is None:
+            return written - 1
+        if sequence >= written:
+            return None
+        if sequence < written - self.slots:
+            self.lapped += 1
+            return None
+        return sequence
+
+    def view(self, sequence: Optional[int] = None) -> Optional[Tuple[int, float, np.ndarray, int]]:
+        """
+        取得映射中影格的唯讀視圖（不複製）
+
+        寫入端可能在使用期間覆寫同一槽位，使用完畢後以 unchanged() 確認結果是否有效。
+
+        Args:
+            sequence: 影格序號，預設為最新一幀
+
+        Returns:
+            Optional[Tuple[int, float, np.ndarray, int]]: (序號, 擷取時間, 影格視圖, lock 值)，
+            無法取得完整影格時返回 None
+        """
+        for _ in range(self.retries + 1):
+            target = self._resolve(sequence)
+            if target is None:
+                return None
+            meta = self._meta[target % self.slots]
+            lock = int(meta["lock"])
+            if lock % 2 == 1:
+                time.sleep(0)
+                continue
+            if int(meta["sequence"]) != target:
+                # 最新一幀的寫入索引已更新，但槽位已被更新的影格覆寫
+                if sequence is not None:
+                    self.lapped += 1
+                    return None
+                continue
+            shape = (int(meta["height"]), int(meta["width"]), int(meta["channels"]))
+            timestamp = float(meta["timestamp"])
+            frame = self._data[target % self.slots, :shape[0] * shape[1] * shape[2]].reshape(shape)
+            if int(meta["lock"]) == lock:
+                return target, timestamp, frame, lock
+        return None
+
+    def unchanged(self, sequence: int, lock: int) -> bool:
+        """
+        確認 view() 取得的影格在使用期間沒有被覆寫
+
+        Args:
+            sequence: view() 返回的序號
+            lock: view() 返回的 lock 值
+
+        Returns:
+            bool: 影格是否仍然完整
+        """
+        if self._meta is None:
+            return False
+        return int(self._meta[sequence % self.slots]["lock"]) == lock
+
+    def read(self, sequence: Optional[int] = None) -> Optional[Tuple[int, float, np.ndarray]]:
+        """
+        讀取一幀的副本
+
+        Args:
+            sequence: 影格序號，預設為最新一幀
+
+        Returns:
+            Optional[Tuple[int, float, np.ndarray]]: (序號, 擷取時間, 影格)，無法取得完整影格時返回 None
+        """
+        for _ in range(self.retries + 1):
+            viewed = self.view(sequence)
+            if viewed is None:
+                return None
+            target, timestamp, frame, lock = viewed
+            copied = frame.copy()
+            if self.unchanged(target, lock):
+                return target, timestamp, copied
+        return None
+
+    def wait(self, after: int, timeout: float = 1.0, poll: float = 0.002) -> bool:
+        """
+        等待序號大於 after 的影格發布
+
+        Args:
+            after: 已處理的最後一個序號（-1 表示尚未讀取）
+            timeout: 最長等待秒數
+            poll: 輪詢間隔（秒）
+
+        Returns:
+            bool: 是否有新的影格
+        """
+        deadline = time.monotonic() + timeout
+        while self.write_index <= after + 1:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+        return True
+
+    def close(self):
+        """關閉映射"""
+        if self._mmap is not None:
+            self._header = self._meta = self._data = None
+            try:
+                self._mmap.close()
+            except BufferError:
+                # 呼叫端仍持有 view() 取得的影格視圖，映射在視圖釋放後才會關閉
+                pass
+            self._mmap = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="讀取影格環形緩衝區並顯示接收狀況")
+    parser.add_argument("path", help="環形緩衝區檔案路徑")
+    parser.add_argument("--duration", type=float, default=10.0, help="讀取秒數")
+    args = parser.parse_args()
+
+    reader = FrameRingReader(args.path)
+    last = reader.write_index - 1
+    received = skipped = 0
+    latencies = []
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        if not reader.wait(last, timeout=0.5):
+            # 寫入端重新建立環形緩衝區時序號從 0 開始
+            last = min(last, reader.write_index - 1)
+            continue
+        # 依序讀取，落後超過槽位數時跳到最新一幀
+        result = reader.read(last + 1) or reader.read()
+        if result is None:
+            continue
+        sequence, timestamp, frame = result
+        skipped += sequence - last - 1
+        received += 1
+        latencies.append(time.time() - timestamp)
+        last = sequence
+    reader.close()
+
+    print(f"收到影格: {received}  幀率: {received / args.duration:.1f} fps  落後略過: {skipped}")
+    if latencies:
+        print(f"擷取到讀取延遲: 平均 {np.mean(latencies) * 1000:.1f} ms, "
+              f"p95 {np.percentile(latencies, 95) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
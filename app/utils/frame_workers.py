@@ -0,0 +1,232 @@
+"""
+多行程浮水印工作池模組
+
+擷取畫面的行程將影格寫入 multiprocessing.shared_memory 槽位，
+由工作行程就地嵌入浮水印並編碼為 JPEG，結果依提交順序取回，
+讓浮水印與編碼不再受限於單一直譯器的 GIL。
+冗餘模式的位置排列由擷取行程打亂一次後放入共享記憶體，工作行程直接載入，不必各自重新打亂。
+"""
+import cv2
+import multiprocessing
+import numpy as np
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Deque, Dict, List, Optional, Tuple
+
+# 工作行程內的共享記憶體與浮水印處理器
+_worker_buffers: List[shared_memory.SharedMemory] = []
+_worker_frames: List[np.ndarray] = []
+_worker_renderer = None
+_worker_shape: Optional[Tuple[int, int]] = None
+_worker_positions: Optional[Tuple[str, int]] = None
+
+
+def _load_positions(positions: Optional[Tuple[str, int]]):
+    """
+    載入擷取行程放入共享記憶體的冗餘位置排列，已載入相同區塊時不做事
+
+    Args:
+        positions: (共享記憶體名稱, 位置數)，沒有分享排列時為 None
+    """
+    global _worker_positions
+    if positions is None or positions == _worker_positions:
+        return
+    from .lsb_layout import preload_positions
+
+    shm = shared_memory.SharedMemory(name=positions[0])
+    try:
+        # preload_positions 會複製一份，之後即可關閉區塊
+        preload_positions(_worker_shape, np.ndarray((positions[1],), dtype=np.int64, buffer=shm.buf))
+    finally:
+        shm.close()
+    _worker_positions = positions
+
+
+def _init_worker(names: List[str], shape: Tuple[int, int, int], positions: Optional[Tuple[str, int]] = None):
+    """
+    工作行程初始化：連接所有共享記憶體槽位、載入冗餘位置排列並建立浮水印處理器
+
+    Args:
+        names: 共享記憶體名稱列表
+        shape: 影格形狀 (高, 寬, 3)
+        positions: 冗餘位置排列的 (共享記憶體名稱, 位置數)，目前模式不需要時為 None
+    """
+    global _worker_renderer, _worker_shape
+    from .screen_capture import ScreenCapture
+
+    for name in names:
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_buffers.append(shm)
+        _worker_frames.append(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+    _worker_shape = (shape[0], shape[1])
+    _load_positions(positions)
+    # 工作行程不擷取畫面，不會開啟螢幕擷取資源
+    _worker_renderer = ScreenCapture()
+
+
+def _process_slot(slot: int, settings: Dict, watermark: bool, jpeg_quality: int,
+                  positions: Optional[Tuple[str, int]] = None) -> Tuple[int, bytes, Tuple[Optional[float], float]]:
+    """
+    就地處理單一槽位的影格（於工作行程中執行）
+
+    Args:
+        slot: 槽位索引
+        settings: 浮水印設定快照
+        watermark: 這一幀是否需要嵌入浮水印
+        jpeg_quality: JPEG 品質
+        positions: 冗餘位置排列的 (共享記憶體名稱, 位置數)，工作行程啟動後才切換到冗餘模式時由此載入
+
+    Returns:
+        Tuple[int, bytes, Tuple[Optional[float], float]]: (槽位索引, JPEG 資料, (浮水印耗時, 編碼耗時))
+    """
+    frame = _worker_frames[slot]
+    start = time.perf_counter()
+    watermark_seconds = None
+    if watermark:
+        _load_positions(positions)
+        for key, value in settings.items():
+            setattr(_worker_renderer, key, value)
+        result = _worker_renderer.apply_watermark(frame)
+        if result is not frame:
+            np.copyto(frame, result)
+        watermark_seconds = time.perf_counter() - start
+
+    encode_start = time.perf_counter()
+    ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    return slot, jpeg.tobytes() if ret else b'', (watermark_seconds, time.perf_counter() - encode_start)
+
+
+class SharedFramePool:
+    """以共享記憶體槽位傳遞影格的浮水印工作池"""
+
+    def __init__(self, shape: Tuple[int, int, int], workers: Optional[int] = None,
+                 slots: Optional[int] = None, jpeg_quality: int = 85,
+                 positions: Optional[np.ndarray] = None):
+        """
+        初始化工作池
+
+        Args:
+            shape: 影格形狀 (高, 寬, 3)
+            workers: 工作行程數，預設為 CPU 核心數
+            slots: 共享記憶體槽位數（即最多同時處理的影格數），預設為工作行程數的兩倍
+            jpeg_quality: JPEG 品質
+            positions: 主行程已算好的冗餘位置排列，工作行程啟動時載入
+        """
+        self.shape = tuple(shape)
+        self.workers = workers or os.cpu_count() or 1
+        self.slots = slots or self.workers * 2
+        self.jpeg_quality = jpeg_quality
+
+        nbytes = int(np.prod(self.shape))
+        self._buffers = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(self.slots)]
+        self._frames = [np.ndarray(self.shape, dtype=np.uint8, buffer=shm.buf) for shm in self._buffers]
+        self._free: Deque[int] = deque(range(self.slots))
+        self._pending: Deque[Tuple[int, bool, Future]] = deque()
+        # 排列變長時建立新區塊，舊區塊可能仍被處理中的影格引用，關閉工作池時才一併釋放
+        self._position_buffers: List[shared_memory.SharedMemory] = []
+        self._positions: Optional[Tuple[str, int]] = None
+        if positions is not None:
+            self.share_positions(positions)
+        # 以 spawn 建立工作行程：擷取行程已有背景執行緒（指標取樣、暖機等），
+        # fork 時若有鎖正被持有，子行程第一次使用該鎖就會死結；工作行程各自建立處理器，不需要繼承記憶體
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=([shm.name for shm in self._buffers], self.shape, self._positions)
+        )
+
+    @property
+    def shared_positions(self) -> int:
+        """已分享給工作行程的冗餘位置數"""
+        return self._positions[1] if self._positions is not None else 0
+
+    def share_positions(self, positions: np.ndarray):
+        """
+        將冗餘位置排列放入共享記憶體，工作行程處理下一個需要浮水印的影格前載入
+
+        已分享的排列不短於此排列時不做事。
+
+        Args:
+            positions: redundancy_positions 返回的排列前段
+        """
+        if len(positions) <= self.shared_positions:
+            return
+        shm = shared_memory.SharedMemory(create=True, size=max(1, positions.nbytes))
+        np.ndarray(positions.shape, dtype=np.int64, buffer=shm.buf)[:] = positions
+        self._position_buffers.append(shm)
+        self._positions = (shm.name, len(positions))
+
+    @property
+    def in_flight(self) -> int:
+        """處理中的影格數"""
+        return len(self._pending)
+
+    def acquire_slot(self) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        取得一個空閒槽位，供擷取端直接寫入影格
+
+        Returns:
+            Optional[Tuple[int, np.ndarray]]: (槽位索引, 槽位影格)，沒有空閒槽位則返回 None
+        """
+        if not self._free:
+            return None
+        slot = self._free.popleft()
+        return slot, self._frames[slot]
+
+    def submit(self, slot: int, settings: Dict, watermark: bool):
+        """
+        提交已寫入影格的槽位
+
+        Args:
+            slot: 槽位索引
+            settings: 浮水印設定快照
+            watermark: 這一幀是否需要嵌入浮水印
+        """
+        future = self._executor.submit(_process_slot, slot, settings, watermark, self.jpeg_quality, self._positions)
+        self._pending.append((slot, watermark, future))
+
+    def next_result(self, block: bool = True) -> Optional[Tuple[np.ndarray, bytes, Tuple, int]]:
+        """
+        依提交順序取回最舊的結果
+
+        取回後槽位仍保留給呼叫端（例如寫入錄影），使用完畢需呼叫 release_slot。
+
+        Args:
+            block: 最舊的結果尚未完成時是否等待
+
+        Returns:
+            Optional[Tuple[np.ndarray, bytes, Tuple, int]]: (已嵌入浮水印的影格, JPEG 資料, (浮水印耗時, 編碼耗時), 槽位索引)
+        """
+        if not self._pending:
+            return None
+        slot, watermark, future = self._pending[0]
+        if not block and not future.done():
+            return None
+        self._pending.popleft()
+        _, jpeg, timings = future.result()
+        return self._frames[slot], jpeg, timings, slot
+
+    def release_slot(self, slot: int):
+        """
+        歸還槽位
+
+        Args:
+            slot: 槽位索引
+        """
+        self._free.append(slot)
+
+    def close(self):
+        """關閉工作池並釋放共享記憶體"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._pending.clear()
+        self._frames = []
+        for shm in self._buffers + self._position_buffers:
+            shm.close()
+            shm.unlink()
+        self._buffers = []
+        self._position_buffers = []
+        self._positions = None
@@ -0,0 +1,229 @@
+"""
+記憶體預算模組
+
+在重量級操作（冗餘浮水印建立位置表、截圖比較、開始錄影）之前先估計所需記憶體，
+若「目前行程用量 + 估計用量」超過預算，或超過系統剩餘記憶體，就拒絕或降級該操作，
+避免一次點擊就讓工作站開始使用虛擬記憶體。
+
+預算預設由環境變數 LSB_MEMORY_BUDGET_MB 設定，執行中可透過 /api/memory 調整。
+另提供選用的 tracemalloc 分析模式，記錄每種操作配置最多記憶體的程式位置
+（只涵蓋 Python 與 NumPy 的配置，OpenCV 內部的配置不會被追蹤）。
+"""
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from .metrics import MEMORY_GUARD_DECISIONS
+
+MEMORY_BUDGET_ENV = "LSB_MEMORY_BUDGET_MB"
+DEFAULT_BUDGET_MB = 2048
+# 系統剩餘記憶體最多使用的比例
+AVAILABLE_FRACTION = 0.8
+
+MB = 1024 * 1024
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    """操作所需記憶體超過預算"""
+
+
+class MemoryGuard:
+    """重量級操作的記憶體預算檢查與分析"""
+
+    def __init__(self, budget_mb: Optional[float] = None, top: int = 10):
+        """
+        初始化記憶體預算
+
+        Args:
+            budget_mb: 行程記憶體預算（MB），None 表示讀取環境變數或使用預設值
+            top: 分析報告保留的配置位置數
+        """
+        if budget_mb is None:
+            budget_mb = float(os.environ.get(MEMORY_BUDGET_ENV, DEFAULT_BUDGET_MB))
+        self.budget = int(budget_mb * MB)
+        self.top = top
+        self.profiling = False
+        self.decisions: Deque[Dict] = deque(maxlen=50)
+        self.reports: Dict[str, Dict] = {}
+        self._downgraded: Set[Tuple[str, Hashable]] = set()  # 已降級的 (操作, 鍵)，預算改變前不再檢查
+        self._lock = threading.Lock()
+
+    def set_budget(self, budget_mb: float):
+        """
+        設定行程記憶體預算
+
+        Args:
+            budget_mb: 預算（MB）
+        """
+        self.budget = int(max(1.0, budget_mb) * MB)
+        with self._lock:
+            self._downgraded.clear()
+
+    def _usage(self) -> Dict[str, Optional[int]]:
+        """取得目前行程常駐記憶體與系統剩餘記憶體（psutil 不可用時為 None）"""
+        try:
+            import psutil
+            return {"rss": psutil.Process().memory_info().rss, "available": psutil.virtual_memory().available}
+        except Exception:
+            return {"rss": None, "available": None}
+
+    def headroom(self) -> int:
+        """
+        取得目前還能配置的位元組數
+
+        Returns:
+            int: 預算與系統剩餘記憶體兩者限制下的剩餘空間
+        """
+        usage = self._usage()
+        room = self.budget - (usage["rss"] or 0)
+        if usage["available"] is not None:
+            room = min(room, int(usage["available"] * AVAILABLE_FRACTION))
+        return max(0, room)
+
+    def _record(self, operation: str, required: int, action: str):
+        MEMORY_GUARD_DECISIONS.inc(operation=operation, action=action)
+        with self._lock:
+            self.decisions.append({
+                "time": time.time(),
+                "operation": operation,
+                "required_mb": round(required / MB, 1),
+                "action": action,
+            })
+        if action != "allowed":
+            print(f"記憶體預算不足，{operation} 已{'拒絕' if action == 'refused' else '降級'}"
+                  f"（需要 {required / MB:.0f} MB）")
+
+    def allow(self, operation: str, required: int, fallback: bool = False,
+              key: Optional[Hashable] = None) -> bool:
+        """
+        檢查操作是否能在預算內完成
+
+        Args:
+            operation: 操作名稱
+            required: 估計需要的位元組數
+            fallback: 呼叫端在不允許時會改用較輕量的作法（記錄為降級而非拒絕）
+            key: 降級時記住的鍵（例如影像大小）；同一操作與鍵已降級時直接返回 False，
+                不再讀取記憶體用量、記錄決策或輸出訊息，直到 set_budget 改變預算
+
+        Returns:
+            bool: 是否允許
+        """
+        if key is not None and (operation, key) in self._downgraded:
+            return False
+        allowed = required <= self.headroom()
+        self._record(operation, required, "allowed" if allowed else ("downgraded" if fallback else "refused"))
+        if not allowed and fallback and key is not None:
+            with self._lock:
+                self._downgraded.add((operation, key))
+        return allowed
+
+    def require(self, operation: str, required: int):
+        """
+        檢查操作是否能在預算內完成，否則拋出 MemoryBudgetExceeded
+
+        Args:
+            operation: 操作名稱
+            required: 估計需要的位元組數
+        """
+        if not self.allow(operation, required):
+            raise MemoryBudgetExceeded(
+                f"{operation} 需要約 {required / MB:.0f} MB，超過記憶體預算（剩餘 {self.headroom() / MB:.0f} MB）"
+            )
+
+    def fit(self, operation: str, item_bytes: int, wanted: int, minimum: int = 1) -> int:
+        """
+        計算預算內最多能配置多少個相同大小的項目，用於縮小緩衝區
+
+        Args:
+            operation: 操作名稱
+            item_bytes: 每個項目的位元組數
+            wanted: 希望配置的項目數
+            minimum: 最少需要的項目數
+
+        Returns:
+            int: 可配置的項目數，連 minimum 都放不下時返回 0
+        """
+        count = min(wanted, self.headroom() // max(1, item_bytes))
+        if count >= wanted:
+            action = "allowed"
+        elif count >= minimum:
+            action = "downgraded"
+        else:
+            action, count = "refused", 0
+        self._record(operation, wanted * item_bytes, action)
+        return int(count)
+
+    def set_profiling(self, enabled: bool):
+        """
+        開啟或關閉 tracemalloc 分析模式
+
+        Args:
+            enabled: 是否開啟
+        """
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.profiling = enabled
+
+    @contextmanager
+    def operation(self, name: str):
+        """
+        包住一次重量級操作；分析模式下記錄峰值與配置最多的程式位置
+
+        Args:
+            name: 操作名稱
+        """
+        if not self.profiling or not tracemalloc.is_tracing():
+            yield
+            return
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            stats = after.compare_to(before, "lineno")
+            stats.sort(key=lambda stat: abs(stat.size_diff), reverse=True)
+            sites: List[Dict] = [{
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff,
+            } for stat in stats[:self.top]]
+            with self._lock:
+                self.reports[name] = {
+                    "time": time.time(),
+                    "elapsed": round(time.perf_counter() - started, 4),
+                    "peak_mb": round((peak - base) / MB, 2),
+                    "top": sites,
+                }
+
+    def status(self) -> Dict:
+        """
+        取得預算設定、目前用量、最近的決策與分析報告
+
+        Returns:
+            Dict: 狀態資訊
+        """
+        usage = self._usage()
+        with self._lock:
+            return {
+                "budget_mb": round(self.budget / MB, 1),
+                "rss_mb": round(usage["rss"] / MB, 1) if usage["rss"] is not None else None,
+                "available_mb": round(usage["available"] / MB, 1) if usage["available"] is not None else None,
+                "headroom_mb": round(self.headroom() / MB, 1),
+                "profiling": self.profiling,
+                "decisions": list(self.decisions),
+                "downgraded": [{"operation": operation, "key": repr(key)} for operation, key in self._downgraded],
+                "reports": dict(self.reports),
+            }
+
+
+memory_guard = MemoryGuard()
@@ -0,0 +1,272 @@
+"""
+效能指標模組
+
+提供 Prometheus 文字格式的計數器、量測值與直方圖，
+並以背景執行緒定期取樣行程的 CPU 與記憶體使用量，
+讓熱路徑只需累加計數，不必在每次請求時呼叫 psutil。
+psutil 在取樣器第一次啟動時才載入，匯入本模組不會拖慢啟動。
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """組合 Prometheus 標籤字串"""
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    """指標基底類別"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames and self.kind in ("counter", "gauge"):
+            self._values[()] = 0
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def remove(self, **labels):
+        """移除指定標籤組合（例如已斷線的用戶端）"""
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: Tuple[str, ...], value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    """只增不減的計數器"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """可任意設定的量測值"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """以固定區間統計分布的直方圖"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, key: Tuple[str, ...], value) -> List[str]:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            bucket_labels = _format_labels(self.labelnames, key, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指標登錄表"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        輸出 Prometheus 文字格式
+
+        Returns:
+            str: 所有指標的文字內容
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+FRAMES_CAPTURED = registry.counter("lsb_frames_captured_total", "Frames grabbed from the screen")
+FRAMES_WATERMARKED = registry.counter("lsb_frames_watermarked_total", "Frames with a watermark embedded", ("mode",))
+FRAMES_ENCODED = registry.counter("lsb_frames_encoded_total", "Frames encoded to JPEG")
+FRAMES_SENT = registry.counter("lsb_frames_sent_total", "Frames sent to stream clients", ("client",))
+FRAMES_DROPPED = registry.counter("lsb_frames_dropped_total", "Frames dropped before reaching a consumer", ("reason",))
+BYTES_SENT = registry.counter("lsb_bytes_sent_total", "Bytes sent to stream clients", ("client",))
+
+CAPTURE_SECONDS = registry.histogram("lsb_capture_seconds", "Screen grab and color conversion time")
+WATERMARK_SECONDS = registry.histogram("lsb_watermark_seconds", "Watermark embedding time", ("mode",))
+ENCODE_SECONDS = registry.histogram("lsb_encode_seconds", "JPEG encoding time")
+
+RECORDER_QUEUE_DEPTH = registry.gauge("lsb_recorder_queue_depth", "Frames waiting to be written by the recorder")
+FRAME_INTERVAL = registry.gauge("lsb_frame_interval", "Watermark every N-th frame (set by hand or by the CPU governor)")
+CAPTURE_FPS = registry.gauge("lsb_capture_fps", "Captured frames per second over the last sampling period")
+PROCESS_CPU = registry.gauge("lsb_process_cpu_percent", "Process CPU usage in percent")
+PROCESS_MEMORY = registry.gauge("lsb_process_resident_memory_bytes", "Process resident memory size")
+RECORDING_FRAMES = registry.counter(
+    "lsb_recording_frames_total", "Captured frames placed on the constant-rate recording timeline", ("action",)
+)
+RECORDING_DRIFT = registry.gauge(
+    "lsb_recording_drift_seconds", "Capture time minus output time of the latest recorded frame"
+)
+RING_FRAMES_PUBLISHED = registry.counter(
+    "lsb_ring_frames_published_total", "Raw frames published to the memory-mapped ring buffer"
+)
+EMBED_IMAGES = registry.counter(
+    "lsb_embed_images_total", "Images submitted to the HTTP embedding endpoint", ("mode", "status")
+)
+WARMUP_SECONDS = registry.histogram(
+    "lsb_warmup_seconds", "Background warm-up time before new watermark settings take effect"
+)
+MEMORY_GUARD_DECISIONS = registry.counter(
+    "lsb_memory_guard_decisions_total", "Memory budget decisions for heavy operations", ("operation", "action")
+)
+
+
+class ResourceSampler:
+    """背景資源取樣器"""
+
+    def __init__(self, interval: float = 1.0):
+        """
+        初始化取樣器
+
+        Args:
+            interval: 取樣間隔（秒）
+        """
+        self.interval = interval
+        self._process = None
+        self._sources: List[Callable[[], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_frames = 0.0
+        self._last_time = 0.0
+        self.snapshot = {"fps": 0.0, "cpu_usage": 0.0, "memory_usage": 0.0}
+
+    def add_source(self, callback: Callable[[], None]):
+        """
+        註冊在每次取樣時呼叫的回呼，用來更新其他量測值（例如錄影佇列深度）
+
+        Args:
+            callback: 無參數的回呼函式
+        """
+        self._sources.append(callback)
+
+    def sample(self):
+        """取樣一次並更新量測值"""
+        if self._process is None:
+            import psutil
+            self._process = psutil.Process()
+        now = time.monotonic()
+        frames = FRAMES_CAPTURED.get()
+        fps = 0.0
+        if self._last_time:
+            fps = (frames - self._last_frames) / max(now - self._last_time, 1e-6)
+        self._last_frames, self._last_time = frames, now
+
+        cpu = self._process.cpu_percent()
+        memory = self._process.memory_info().rss
+        CAPTURE_FPS.set(round(fps, 2))
+        PROCESS_CPU.set(cpu)
+        PROCESS_MEMORY.set(memory)
+        for callback in self._sources:
+            try:
+                callback()
+            except Exception as e:
+                print(f"指標取樣失敗: {str(e)}")
+
+        self.snapshot = {
+            "fps": round(fps, 1),
+            "cpu_usage": cpu,
+            "memory_usage": round(memory / 1024 / 1024, 1),  # MB
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        """啟動背景取樣執行緒（已在執行時不做任何事）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止背景取樣執行緒"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+
+sampler = ResourceSampler()
@@ -0,0 +1,226 @@
+"""
+錄影寫入模組
+
+以背景執行緒將影格寫入 VideoWriter，擷取迴圈只需把影格放入佇列，
+佇列已滿時直接丟棄該幀，避免編碼拖慢畫面串流。VideoWriter 也在寫入執行緒中開啟，開始錄影不需等待編碼器建立。
+每個實際寫入的影格同時在索引檔（見 frame_index）追加一筆紀錄。
+
+擷取幀率會隨負載變動，而影片以固定影格率播放。FramePacer 依每幀的單調時鐘擷取時間
+把影格放到固定影格率的輸出時間軸上：擷取太慢時重複寫入上一幀（同一個陣列，不複製），
+同一個輸出槽位收到多幀時只保留最新一幀，錄影因此維持實際經過的時間。
+"""
+import cv2
+import numpy as np
+import queue
+import threading
+import time
+from typing import Optional, Tuple
+
+from .frame_index import FrameIndexWriter, index_path_for
+from .metrics import FRAMES_DROPPED, RECORDING_DRIFT, RECORDING_FRAMES
+
+# 影格紀錄：(擷取時間, 是否嵌入浮水印, 浮水印模式, 浮水印識別碼)
+FrameMeta = Tuple[float, bool, str, int]
+
+
+class FramePacer:
+    """將擷取時間對應到固定影格率輸出時間軸的排程器"""
+
+    def __init__(self, fps: float):
+        """
+        初始化排程器
+
+        Args:
+            fps: 輸出影格率
+        """
+        self.fps = fps
+        self.period = 1.0 / fps
+        self.start: Optional[float] = None  # 第一幀的擷取時間（單調時鐘）
+        self.next_slot = 0  # 下一個尚未寫入的輸出槽位
+        self.captured = 0
+        self.written = 0
+        self.duplicated = 0
+        self.dropped = 0
+        self.drift = 0.0  # 最近一幀的擷取時間與其輸出時間的差距（秒，正值表示影片落後）
+        self.max_drift = 0.0
+        self.last_timestamp: Optional[float] = None
+
+    def _slot(self, timestamp: float) -> int:
+        """擷取時間對應的輸出槽位"""
+        return max(0, round((timestamp - self.start) / self.period))
+
+    def place(self, timestamp: float) -> int:
+        """
+        新的一幀到達時，決定上一幀（待寫入的影格）要寫入幾次
+
+        上一幀佔用從 next_slot 到新影格槽位之前的所有槽位；
+        兩者落在同一槽位時返回 0，表示上一幀被新影格取代而捨棄。
+
+        Args:
+            timestamp: 新影格的擷取時間（time.monotonic()）
+
+        Returns:
+            int: 上一幀的寫入次數
+        """
+        self.captured += 1
+        if self.start is None:
+            self.start = timestamp
+            self.last_timestamp = timestamp
+            return 0
+        slot = max(self._slot(timestamp), self.next_slot)
+        count = slot - self.next_slot
+        self._account(count)
+        self.next_slot = slot
+        self.last_timestamp = timestamp
+        self.drift = (timestamp - self.start) - slot * self.period
+        self.max_drift = max(self.max_drift, abs(self.drift))
+        return count
+
+    def finish(self, timestamp: float) -> int:
+        """
+        錄影結束時，決定最後一幀要寫入幾次（填滿到結束時間，至少一次）
+
+        Args:
+            timestamp: 結束時間（time.monotonic()）
+
+        Returns:
+            int: 最後一幀的寫入次數，沒有任何影格時為 0
+        """
+        if self.start is None:
+            return 0
+        count = max(1, self._slot(timestamp) - self.next_slot)
+        self._account(count)
+        self.next_slot += count
+        return count
+
+    def _account(self, count: int):
+        """更新寫入、重複與捨棄的統計"""
+        if count == 0:
+            self.dropped += 1
+            RECORDING_FRAMES.inc(action="dropped")
+            return
+        self.written += count
+        RECORDING_FRAMES.inc(count, action="written")
+        if count > 1:
+            self.duplicated += count - 1
+            RECORDING_FRAMES.inc(count - 1, action="duplicated")
+
+    def stats(self) -> dict:
+        """
+        取得排程統計
+
+        Returns:
+            dict: 輸出影格率、實際擷取幀率、寫入／重複／捨棄數與時間偏移
+        """
+        elapsed = (self.last_timestamp - self.start) if self.start is not None else 0.0
+        return {
+            "fps": self.fps,
+            "capture_fps": round((self.captured - 1) / elapsed, 2) if elapsed > 0 else None,
+            "captured": self.captured,
+            "written": self.written,
+            "duplicated": self.duplicated,
+            "dropped": self.dropped,
+            "duration": round(self.written * self.period, 3),
+            "drift_ms": round(self.drift * 1000, 2),
+            "max_drift_ms": round(self.max_drift * 1000, 2),
+        }
+
+
+class VideoRecorder:
+    """背景錄影寫入器"""
+
+    def __init__(self, path: str, fps: float, size: Tuple[int, int], max_queue: int = 60,
+                 write_index: bool = True):
+        """
+        初始化並開啟錄影檔
+
+        Args:
+            path: 輸出檔案路徑
+            fps: 影片影格率
+            size: 影片大小 (寬, 高)
+            max_queue: 佇列中最多等待寫入的影格數
+            write_index: 是否同時寫入索引檔
+        """
+        self.path = path
+        self.pacer = FramePacer(fps)
+        self.size = size
+        self._pending: Optional[Tuple[np.ndarray, Optional[FrameMeta]]] = None
+        self._writer = None  # 由寫入執行緒開啟，建立編碼器不佔用擷取迴圈的時間
+        self.index = FrameIndexWriter(index_path_for(path), fps) if write_index else None
+        self._queue: "queue.Queue[Optional[Tuple[np.ndarray, Optional[FrameMeta], float]]]" = queue.Queue(maxsize=max_queue)
+        self._stop_time: Optional[float] = None
+        self._lag = 0.0  # 最近一幀從擷取到寫入執行緒處理的延遲（秒）
+        self._thread = threading.Thread(target=self._run, name="video-recorder", daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """等待寫入的影格數"""
+        return self._queue.qsize()
+
+    def write(self, frame: np.ndarray, meta: Optional[FrameMeta] = None,
+              timestamp: Optional[float] = None) -> bool:
+        """
+        將影格放入寫入佇列，呼叫端之後不可再修改此影格
+
+        Args:
+            frame: BGR 影格
+            meta: 索引紀錄 (擷取時間, 是否嵌入浮水印, 浮水印模式, 浮水印識別碼)
+            timestamp: 擷取時間（time.monotonic()），預設為放入佇列的時間
+
+        Returns:
+            bool: 是否成功放入佇列
+        """
+        try:
+            self._queue.put_nowait((frame, meta, time.monotonic() if timestamp is None else timestamp))
+            return True
+        except queue.Full:
+            FRAMES_DROPPED.inc(reason="recorder")
+            return False
+
+    def _emit(self, count: int):
+        """將待寫入的影格寫入 count 次（重複寫入同一個陣列）"""
+        frame, meta = self._pending
+        record = meta or (time.time(), False, "none", 0)
+        for _ in range(count):
+            self._writer.write(frame)
+            if self.index is not None:
+                self.index.append(*record)
+
+    def _run(self):
+        self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*'mp4v'), self.pacer.fps, self.size)
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, meta, timestamp = item
+            self._lag = time.monotonic() - timestamp
+            count = self.pacer.place(timestamp)
+            if self._pending is not None and count:
+                self._emit(count)
+            elif self._pending is not None:
+                FRAMES_DROPPED.inc(reason="pacing")
+            self._pending = (frame, meta)
+            RECORDING_DRIFT.set(self.pacer.drift)
+        if self._pending is not None:
+            self._emit(self.pacer.finish(self._stop_time or time.monotonic()))
+            self._pending = None
+
+    def stats(self) -> dict:
+        """
+        取得錄影排程統計
+
+        Returns:
+            dict: FramePacer.stats 的內容，另含寫入執行緒的處理延遲
+        """
+        return dict(self.pacer.stats(), lag_ms=round(self._lag * 1000, 2))
+
+    def release(self):
+        """寫完佇列中剩餘的影格（最後一幀填滿到呼叫時間）並關閉錄影檔與索引檔"""
+        self._stop_time = time.monotonic()
+        self._queue.put(None)
+        self._thread.join()
+        self._writer.release()
+        if self.index is not None:
+            # 影片寫完後 moov 才完整，此時回填每個影格的位元組位移
+            self.index.close(self.path, self.pacer.stats()["capture_fps"])
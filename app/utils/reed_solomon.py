@@ -0,0 +1,246 @@
+"""
+Reed-Solomon 編解碼模組
+
+GF(256)（本原多項式 0x11d、生成元 2）上的系統式 Reed-Solomon 碼，只依賴 NumPy。
+編碼以預先計算的同位矩陣一次處理多個區塊，伴隨式也以矩陣運算批次計算；
+只有伴隨式不為零的區塊才進入 Berlekamp-Massey、Chien 搜尋與 Forney 演算法，
+並支援已知位置的抹除（erasure），每個區塊最多可修正 2·錯誤數 + 抹除數 ≤ nsym。
+
+碼長不足 255 時視為縮短碼（前方補零不傳送），同一組同位矩陣可用於任意資料長度。
+"""
+import numpy as np
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+PRIMITIVE_POLY = 0x11D
+FIELD_SIZE = 255
+
+
+def _build_tables() -> Tuple[np.ndarray, np.ndarray]:
+    """建立 GF(256) 的指數表與對數表（指數表重複一次，省去取餘數）"""
+    exp = np.zeros(FIELD_SIZE * 2, dtype=np.uint8)
+    log = np.zeros(FIELD_SIZE + 1, dtype=np.int32)
+    value = 1
+    for power in range(FIELD_SIZE):
+        exp[power] = value
+        log[value] = power
+        value <<= 1
+        if value & 0x100:
+            value ^= PRIMITIVE_POLY
+    exp[FIELD_SIZE:] = exp[:FIELD_SIZE]
+    return exp, log
+
+
+EXP, LOG = _build_tables()
+_EXP = EXP.tolist()
+_LOG = LOG.tolist()
+
+
+def gf_mul(a, b) -> np.ndarray:
+    """
+    GF(256) 逐元素乘法（支援 NumPy 廣播）
+
+    Args:
+        a: uint8 陣列或純量
+        b: uint8 陣列或純量
+
+    Returns:
+        np.ndarray: 乘積
+    """
+    a = np.asarray(a, dtype=np.uint8)
+    b = np.asarray(b, dtype=np.uint8)
+    product = EXP[LOG[a] + LOG[b]]
+    return np.where((a == 0) | (b == 0), np.uint8(0), product)
+
+
+def _mul(a: int, b: int) -> int:
+    return 0 if a == 0 or b == 0 else _EXP[_LOG[a] + _LOG[b]]
+
+
+def _div(a: int, b: int) -> int:
+    return 0 if a == 0 else _EXP[(_LOG[a] - _LOG[b]) % FIELD_SIZE]
+
+
+def _poly_eval(coeffs: Sequence[int], points: np.ndarray) -> np.ndarray:
+    """以 Horner 法在多個點上計算多項式（係數由低次到高次）"""
+    acc = np.zeros(points.shape, dtype=np.uint8)
+    for coeff in reversed(coeffs):
+        acc = gf_mul(acc, points) ^ np.uint8(coeff)
+    return acc
+
+
+@lru_cache(maxsize=8)
+def generator_poly(nsym: int) -> Tuple[int, ...]:
+    """
+    產生多項式 g(x) = Π (x - α^i)，i = 0..nsym-1
+
+    Returns:
+        Tuple[int, ...]: 由高次到低次的係數（首項為 1）
+    """
+    poly = [1]
+    for i in range(nsym):
+        root = _EXP[i]
+        poly = [a ^ _mul(b, root) for a, b in zip(poly + [0], [0] + poly)]
+    return tuple(poly)
+
+
+@lru_cache(maxsize=8)
+def _parity_matrix(nsym: int) -> np.ndarray:
+    """
+    計算同位矩陣：第 i 列為完整長度訊息中只有第 i 個位元組為 1 時的同位位元組
+
+    縮短碼的訊息前方補零，因此長度為 k 的訊息使用最後 k 列。
+    """
+    kmax = FIELD_SIZE - nsym
+    feedback = generator_poly(nsym)[1:]
+    rows = np.zeros((kmax, nsym), dtype=np.uint8)
+    # 最後一個訊息位元組對應 x^nsym mod g(x)，往前每一列再乘上 x
+    remainder = list(feedback)
+    rows[kmax - 1] = remainder
+    for i in range(kmax - 2, -1, -1):
+        top = remainder[0]
+        remainder = remainder[1:] + [0]
+        if top:
+            remainder = [r ^ _mul(top, g) for r, g in zip(remainder, feedback)]
+        rows[i] = remainder
+    rows.flags.writeable = False
+    return rows
+
+
+def rs_encode(messages: np.ndarray, nsym: int) -> np.ndarray:
+    """
+    批次編碼多個等長的訊息區塊
+
+    Args:
+        messages: (區塊數, k) 的 uint8 陣列，k ≤ 255 - nsym
+        nsym: 同位位元組數
+
+    Returns:
+        np.ndarray: (區塊數, k + nsym) 的碼字，前 k 個位元組即原訊息
+    """
+    messages = np.atleast_2d(np.asarray(messages, dtype=np.uint8))
+    k = messages.shape[1]
+    if k + nsym > FIELD_SIZE:
+        raise ValueError("區塊長度超過 255 個位元組")
+    rows = _parity_matrix(nsym)[FIELD_SIZE - nsym - k:]
+    parity = np.bitwise_xor.reduce(gf_mul(messages[:, :, None], rows[None]), axis=1)
+    return np.concatenate([messages, parity], axis=1)
+
+
+@lru_cache(maxsize=16)
+def _syndrome_matrix(n: int, nsym: int) -> np.ndarray:
+    """V[i, j] = α^(j·(n-1-i))，伴隨式 S_j = Σ r_i·V[i, j]"""
+    powers = (np.arange(nsym)[None, :] * (n - 1 - np.arange(n))[:, None]) % FIELD_SIZE
+    matrix = EXP[powers]
+    matrix.flags.writeable = False
+    return matrix
+
+
+def syndromes(codewords: np.ndarray, nsym: int) -> np.ndarray:
+    """
+    批次計算伴隨式
+
+    Args:
+        codewords: (區塊數, n) 的 uint8 陣列
+        nsym: 同位位元組數
+
+    Returns:
+        np.ndarray: (區塊數, nsym)，全為 0 表示沒有錯誤
+    """
+    matrix = _syndrome_matrix(codewords.shape[1], nsym)
+    return np.bitwise_xor.reduce(gf_mul(codewords[:, :, None], matrix[None]), axis=1)
+
+
+def _correct_block(codeword: np.ndarray, synd: List[int], nsym: int,
+                   erasures: Sequence[int] = ()) -> Optional[np.ndarray]:
+    """
+    修正單一區塊（錯誤與抹除），無法修正時返回 None
+
+    Args:
+        codeword: 長度 n 的碼字
+        synd: 伴隨式 S_0..S_{nsym-1}
+        nsym: 同位位元組數
+        erasures: 已知損毀的位置
+    """
+    n = len(codeword)
+    rho = len(erasures)
+    if rho > nsym:
+        return None
+
+    # 抹除定位多項式 Γ(x) = Π (1 + X·x)，係數由低次到高次
+    gamma = [1]
+    for position in erasures:
+        locator = _EXP[(n - 1 - position) % FIELD_SIZE]
+        gamma = [a ^ _mul(b, locator) for a, b in zip(gamma + [0], [0] + gamma)]
+
+    # 以抹除定位多項式為起點的 Berlekamp-Massey 演算法
+    lam, prev, length = list(gamma), list(gamma), rho
+    for k in range(rho, nsym):
+        delta = 0
+        for i in range(min(len(lam), k + 1)):
+            delta ^= _mul(lam[i], synd[k - i])
+        prev = [0] + prev
+        if delta:
+            updated = [a ^ _mul(delta, b) for a, b in
+                       zip(lam + [0] * (len(prev) - len(lam)), prev + [0] * (len(lam) - len(prev)))]
+            if 2 * length <= k + rho:
+                prev = [_div(c, delta) for c in lam]
+                length = k + 1 + rho - length
+            lam = updated
+    while len(lam) > 1 and lam[-1] == 0:
+        lam.pop()
+    degree = len(lam) - 1
+    if degree != length or 2 * (length - rho) + rho > nsym:
+        return None
+
+    # Chien 搜尋：所有位置一次計算 Λ(X^-1)
+    inverse = EXP[(np.arange(n) - (n - 1)) % FIELD_SIZE]
+    positions = np.flatnonzero(_poly_eval(lam, inverse) == 0)
+    if len(positions) != degree:
+        return None
+
+    # Forney 演算法：e = X·Ω(X^-1) / Λ'(X^-1)，Ω(x) = S(x)·Λ(x) mod x^nsym
+    omega = [0] * nsym
+    for i, s in enumerate(synd):
+        if s:
+            for j, l in enumerate(lam[:nsym - i]):
+                omega[i + j] ^= _mul(s, l)
+    derivative = [lam[i] if i % 2 == 1 else 0 for i in range(1, len(lam))]
+    x_inv = inverse[positions]
+    numerator = gf_mul(EXP[(n - 1 - positions) % FIELD_SIZE], _poly_eval(omega, x_inv))
+    denominator = _poly_eval(derivative, x_inv)
+    if np.any(denominator == 0):
+        return None
+    magnitude = EXP[(LOG[numerator] - LOG[denominator]) % FIELD_SIZE]
+    magnitude[numerator == 0] = 0
+
+    corrected = codeword.copy()
+    corrected[positions] ^= magnitude
+    return corrected
+
+
+def rs_decode(codewords: np.ndarray, nsym: int,
+              erasures: Optional[Sequence[Sequence[int]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    批次解碼多個等長的碼字區塊
+
+    Args:
+        codewords: (區塊數, n) 的 uint8 陣列
+        nsym: 同位位元組數
+        erasures: 每個區塊已知損毀的位置列表，None 表示沒有
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (修正後的訊息 (區塊數, n - nsym), 每個區塊是否解碼成功)
+    """
+    codewords = np.atleast_2d(np.asarray(codewords, dtype=np.uint8))
+    synd = syndromes(codewords, nsym)
+    ok = ~synd.any(axis=1)
+    result = codewords.copy()
+    for block in np.flatnonzero(~ok):
+        block_erasures = erasures[block] if erasures is not None else ()
+        corrected = _correct_block(codewords[block], synd[block].tolist(), nsym, block_erasures)
+        if corrected is None or syndromes(corrected[None], nsym).any():
+            continue
+        result[block] = corrected
+        ok[block] = True
+    return result[:, :codewords.shape[1] - nsym], ok
@@ -3,35 +3,154 @@
 """
 import cv2
 import numpy as np
-import mss
-from typing import Tuple, Optional, List
+from typing import Callable, Tuple, Optional, List
 from datetime import datetime
 import os
 import glob
+import platform
+import threading
+import time
+from collections import OrderedDict, deque
+from .bitplane_payload import BITPLANE_REPEAT, DEFAULT_BITS, DEFAULT_CHANNELS, parse_channels
+from .comparison_cache import ComparisonCache
+from .frame_index import payload_id
+from .frame_ring import DEFAULT_SLOTS, FRAME_RING_ENV, FRAME_RING_SLOTS_ENV
+from .lsb_layout import (DEFAULT_POSITION_COUNT, REDUNDANCY, REDUNDANCY_SEED, position_build_bytes, positions_cached,
+                         redundancy_positions)
+from .memory_guard import MemoryBudgetExceeded, memory_guard
+from .metrics import (
+    FRAMES_CAPTURED, FRAMES_WATERMARKED, FRAMES_ENCODED,
+    CAPTURE_SECONDS, WATERMARK_SECONDS, ENCODE_SECONDS,
+    CAPTURE_FPS, FRAME_INTERVAL, RING_FRAMES_PUBLISHED, WARMUP_SECONDS
+)
+
+# 暖機完成後一次切換的浮水印設定與對應的快取
+WARM_SETTINGS = (
+    "watermark_text", "watermark_visible", "use_redundancy", "use_temporal", "use_dct", "use_dynamic",
+    "device_name", "use_ecc", "use_bitplane", "bitplane_bits", "bitplane_channels", "use_hybrid",
+)
+
+
+def _empty_caches() -> dict:
+    """暖機切換的快取及其初始值（與 ScreenCapture.__init__ 相同）"""
+    return {
+        "_overlay_cache": OrderedDict(),
+        "_temporal_cache": (None, []),
+        "_dynamic_payload": None,
+        "_ecc_payload": None,
+        "_bitplane_payload": None,
+        "_hybrid_plan": None,
+    }
+
+
+WARM_CACHES = tuple(_empty_caches())
 
 class ScreenCapture:
     """螢幕擷取工具類別"""
     
+    VISIBLE_ALPHA = 0.35  # 可見浮水印的不透明度
+    
     def __init__(self):
         """初始化螢幕擷取工具"""
-        self.sct = mss.mss()
-        self.monitor = self.sct.monitors[1]  # 預設使用主螢幕
+        self._sct = None  # 第一次擷取時才建立，工作行程不會開啟螢幕擷取資源
+        self._monitor = None
         self.watermark_text = ""
         self.watermark_visible = False
         self.is_processing = False
         self.frame_interval = 5
         self.frame_count = 0
+        self.governor = None  # CPU 預算調節器，啟用時自動調整 frame_interval
         self.use_redundancy = False  # 是否使用冗餘浮水印
+        self.use_dct = False  # 是否使用頻率域（區塊 DCT）浮水印
+        
+        # 時間分散浮水印相關
+        self.use_temporal = False  # 是否將浮水印分散嵌入連續影格
+        self.temporal_sequence = 0  # 下一幀要嵌入的區塊序號
+        self._temporal_cache = (None, [])  # (浮水印文字, 區塊位元陣列)
+        
+        # 動態鑑識浮水印相關（裝置名稱 + 影格計數 + 擷取時間）
+        self.use_dynamic = False
+        self.device_name = platform.node() or "unknown"
+        self.payload_counter = 0  # 下一個嵌入動態浮水印的影格計數
+        self.payload_timestamp = 0.0  # 目前影格的擷取時間
+        self._dynamic_payload = None  # ((裝置名稱, 高, 寬, 冗餘), 預先計算的編碼器)
+        
+        # Reed-Solomon 錯誤更正浮水印相關
+        self.use_ecc = False
+        self._ecc_payload = None  # ((浮水印文字, 高, 寬, 分散), 預先計算的編碼器)
+        
+        # 多位元平面 LSB 相關（選定通道各寫入最低 1～2 個位元）
+        self.use_bitplane = False
+        self.bitplane_bits = DEFAULT_BITS
+        self.bitplane_channels = DEFAULT_CHANNELS
+        self._bitplane_payload = None  # ((浮水印文字, 高, 寬, 位元數, 通道, 重複次數), 預先計算的編碼器)
+        
+        # 可見加不可見浮水印相關（置中可見浮水印與 LSB 在同一次走訪中寫入）
+        self.use_hybrid = False
+        self._hybrid_plan = None  # ((浮水印文字, 高, 寬, 冗餘), 合併的寫入表)
+        
+        # 置中可見浮水印的疊加層快取，依 (文字, 寬, 高) 區分
+        self._overlay_cache = OrderedDict()
+        
+        # 目標視窗相關
+        self.target_windows: List[str] = []
+        self.window_tracker = None
+        self.target_regions = None  # 要處理的區域列表，None 表示整個畫面
         
         # 錄影相關
         self.is_recording = False
-        self.video_writer = None
+        self.recorder = None
         self.fps = 30.0
         self.output_dir = "recorded_video"
         self.screenshot_dir = "screen_shot"
+        
+        # 比較圖保留在記憶體中，預覽與完整解析度都以 id 取用
+        self.comparison_cache = ComparisonCache()
+        self.last_comparison_id = None
         self.current_recording_path = None
+        
+        # 原始影格環形緩衝區（供本機其他程式以記憶體映射讀取），第一次發布時才建立
+        self.frame_ring = None
+        self._frame_ring_config = None  # 建立 frame_ring 時的 (路徑, 槽位數)
+        self.frame_ring_path = os.environ.get(FRAME_RING_ENV) or None
+        self.frame_ring_slots = int(os.environ.get(FRAME_RING_SLOTS_ENV) or DEFAULT_SLOTS)
+        
+        # 多行程工作池相關
+        self.use_workers = False
+        self.worker_count = None
+        self.worker_pool = None
+        self._pool_meta = deque()  # 已提交到工作池的 (影格索引紀錄, 單調時鐘擷取時間)，與提交順序一致
+        
+        # 暖機相關：新設定先在背景建立快取，擷取端在兩幀之間一次切換
+        self.frame_shape = None  # 最近擷取的畫面 (高, 寬)
+        self.warm_up_status = {"state": "idle"}
+        self._warm_up_lock = threading.Condition()
+        self._warm_up_generation = 0
+        self._warm_up_thread = None  # 常駐的暖機執行緒，第一次暖機時建立
+        self._warm_up_renderer = None  # 暖機執行緒重複使用的處理器
+        self._warm_up_pending = None  # 等待暖機的 (世代, 設定, 是否偵測解析度)，新的請求直接取代
+        self._warm_up_busy = False
+        self._latest_settings = None  # 最新一次暖機的設定（尚未切換時，後續設定以此為基礎）
+        self._staged = None  # 已完成暖機、等待切換的 (設定, 快取)
+    
+    @property
+    def sct(self):
+        """螢幕擷取物件（延遲建立，可由 LSB_CAPTURE_SOURCE 改用合成畫面）"""
+        if self._sct is None:
+            from .synthetic_capture import open_capture
+            self._sct = open_capture()
+        return self._sct
     
-    def set_watermark(self, text: str, visible: bool = False, redundancy: bool = False):
+    @property
+    def monitor(self):
+        """擷取的螢幕範圍，預設使用主螢幕"""
+        if self._monitor is None:
+            self._monitor = self.sct.monitors[1]
+        return self._monitor
+    
+    def set_watermark(self, text: str, visible: bool = False, redundancy: bool = False,
+                      temporal: bool = False, dct: bool = False, dynamic: bool = False,
+                      ecc: bool = False, bitplane: bool = False, hybrid: bool = False):
         """
         設定浮水印
         
@@ -39,10 +158,204 @@ class ScreenCapture:
             text: 浮水印文字
             visible: 是否為可見浮水印
             redundancy: 是否使用冗餘浮水印（僅對不可見浮水印有效）
+            temporal: 是否將浮水印分散嵌入連續影格（僅對不可見浮水印有效，優先於冗餘）
+            dct: 是否使用可承受 JPEG 壓縮的頻率域浮水印（與可見、LSB 並列的第三種模式）
+            dynamic: 是否改為每幀嵌入裝置名稱、影格計數與擷取時間（僅對 LSB 與冗餘 LSB 有效）
+            ecc: 是否以 Reed-Solomon 錯誤更正碼編碼（僅對 LSB 與冗餘 LSB 有效，冗餘時每個位元只重複 ECC_REPEAT 次）
+            bitplane: 是否使用多位元平面版面（僅對 LSB 與冗餘 LSB 有效，冗餘時整段資料重複 BITPLANE_REPEAT 次）
+            hybrid: 是否同時嵌入置中可見浮水印與 LSB（冗餘時 LSB 使用冗餘版面；優先於時間分散、動態、錯誤更正與多位元平面）
         """
         self.watermark_text = text
         self.watermark_visible = visible
         self.use_redundancy = redundancy
+        self.use_temporal = temporal
+        self.use_dct = dct and not visible
+        self.use_dynamic = dynamic
+        self.use_ecc = ecc
+        self.use_bitplane = bitplane
+        self.use_hybrid = hybrid and not visible and not dct
+    
+    def set_bitplane_layout(self, bits: int, channels: str):
+        """
+        設定多位元平面版面
+        
+        Args:
+            bits: 每個通道寫入的最低位元數（1 或 2）
+            channels: 使用的通道（b、g、r 的組合）
+        """
+        parse_channels(channels)
+        self.bitplane_bits = 2 if int(bits) >= 2 else 1
+        self.bitplane_channels = channels.lower()
+    
+    def stage_settings(self) -> "WatermarkSettings":
+        """
+        建立設定暫存物件，以 set_watermark、set_bitplane_layout、set_device_name 修改後交給 warm_up
+        
+        暫存物件只有 WARM_SETTINGS 的屬性，以最新一次暖機的設定（沒有時為目前設定）為基礎。
+        
+        Returns:
+            WatermarkSettings: 設定暫存物件
+        """
+        with self._warm_up_lock:
+            return WatermarkSettings(self._latest_settings or self)
+    
+    def warm_up(self, staging: Optional["WatermarkSettings"] = None, probe_shape: bool = False):
+        """
+        在背景執行緒為新設定建立目前解析度所需的所有快取與編碼器，完成後由擷取端在兩幀之間一次切換
+        
+        暖機期間的影格繼續使用舊設定。新的請求會取代尚未開始或尚未切換的請求，
+        正在進行的暖機在處理下一個影像大小前停止，結果捨棄；連續調整設定時只有最後一次會完成。
+        
+        Args:
+            staging: stage_settings 取得並修改過的設定，None 表示以目前設定暖機（例如啟動時）
+            probe_shape: 尚未擷取過畫面時，是否另外開啟一次螢幕擷取以取得解析度
+        """
+        staging = staging or self.stage_settings()
+        with self._warm_up_lock:
+            self._warm_up_generation += 1
+            generation = self._warm_up_generation
+            self._latest_settings = staging
+            self._staged = None
+            self._warm_up_pending = (generation, staging, probe_shape)
+            self.warm_up_status = {"state": "warming", "generation": generation}
+            if self._warm_up_thread is None:
+                self._warm_up_thread = threading.Thread(target=self._warm_up_loop, name="warm-up", daemon=True)
+                self._warm_up_thread.start()
+            self._warm_up_lock.notify_all()
+    
+    def _warm_shapes(self, probe_shape: bool) -> List[Tuple[int, int]]:
+        """需要暖機的影像大小：目標視窗模式為各視窗區域，否則為整個畫面"""
+        if self.target_regions is not None:
+            return [(y1 - y0, x1 - x0) for x0, y0, x1, y1 in self.target_regions]
+        shape = self.frame_shape
+        if shape is None and probe_shape:
+            # 另開一個擷取物件讀取解析度後立即關閉，不與擷取執行緒共用
+            from .synthetic_capture import open_capture
+            sct = open_capture()
+            try:
+                monitor = sct.monitors[1]
+                shape = (monitor["height"], monitor["width"])
+            finally:
+                sct.close()
+        return [shape] if shape else []
+    
+    def _superseded(self, generation: int) -> bool:
+        """暖機請求是否已被較新的請求取代"""
+        return generation != self._warm_up_generation
+    
+    def _prepare(self, shapes: List[Tuple[int, int]], superseded: Callable[[], bool]):
+        """
+        建立目前模式在各影像大小下所需的疊加層、位元模板、編碼器與冗餘位置排列等快取
+        
+        只建立快取，不執行嵌入，也不會輸出每幀嵌入時的訊息。模式判斷的順序與 _apply_watermark_region 相同。
+        
+        Args:
+            shapes: 影像的 (高, 寬) 列表
+            superseded: 是否已被較新的請求取代，是則停止
+        """
+        cv2.imencode('.jpg', np.zeros((16, 16, 3), dtype=np.uint8), [cv2.IMWRITE_JPEG_QUALITY, 85])
+        if not self.watermark_text and not self._is_dynamic():
+            return
+        for height, width in shapes:
+            if superseded():
+                return
+            if self.use_dct:
+                from . import dct_watermark  # noqa: F401  只需載入模組，DCT 沒有依影像大小的快取
+            elif self.use_hybrid:
+                self._hybrid_writes(height, width)
+            elif self._is_temporal():
+                self._temporal_chunks()
+            elif self.watermark_visible:
+                if not self.use_redundancy:
+                    self._visible_overlay(width, height)
+            elif self._is_dynamic():
+                self._dynamic_encoder(height, width)
+            elif self._is_ecc() and not self._ecc_repetition():
+                self._ecc_encoder(height, width)
+            elif self._is_bitplane():
+                self._bitplane_encoder(height, width)
+            elif self.use_redundancy:
+                count = (len(self.watermark_text) + 1) * 8 * REDUNDANCY
+                if height * width * 3 >= count:
+                    self._redundant_positions(height, width, count)
+    
+    def _warm_up_loop(self):
+        """常駐的暖機執行緒：每次取出最新的請求處理，處理期間到達的請求直接取代等待中的請求"""
+        while True:
+            with self._warm_up_lock:
+                while self._warm_up_pending is None:
+                    self._warm_up_lock.wait()
+                (generation, settings, probe_shape), self._warm_up_pending = self._warm_up_pending, None
+                self._warm_up_busy = True
+            try:
+                self._run_warm_up(settings, generation, probe_shape)
+            finally:
+                with self._warm_up_lock:
+                    self._warm_up_busy = False
+                    self._warm_up_lock.notify_all()
+    
+    def _run_warm_up(self, settings: "WatermarkSettings", generation: int, probe_shape: bool):
+        start = time.perf_counter()
+        if self._warm_up_renderer is None:
+            # 暖機用的處理器只建立一次，不會開啟螢幕擷取資源
+            self._warm_up_renderer = ScreenCapture()
+        renderer = self._warm_up_renderer
+        settings.apply_to(renderer)
+        shapes = []
+        try:
+            shapes = self._warm_shapes(probe_shape)
+            renderer._prepare(shapes, lambda: self._superseded(generation))
+        except Exception as e:
+            print(f"暖機失敗，直接套用新設定: {str(e)}")
+        elapsed = time.perf_counter() - start
+        with self._warm_up_lock:
+            if self._superseded(generation):
+                return
+            WARMUP_SECONDS.observe(elapsed)
+            # 快取交給擷取端，處理器換上新的空快取，之後的暖機不會與擷取端共用同一份
+            caches = {key: getattr(renderer, key) for key in WARM_CACHES}
+            for key, value in _empty_caches().items():
+                setattr(renderer, key, value)
+            self._staged = (settings, caches)
+            self.warm_up_status = {
+                "state": "ready",
+                "generation": generation,
+                "mode": renderer._watermark_mode_label(),
+                "shapes": [list(shape) for shape in shapes],
+                "elapsed_ms": round(elapsed * 1000, 1),
+            }
+    
+    def _apply_staged_settings(self, wait: bool = False):
+        """
+        切換到已完成暖機的設定（於擷取端、兩幀之間呼叫）
+        
+        Args:
+            wait: 暖機尚未完成時是否等待（截圖比較等需要立即套用新設定的操作）
+        """
+        with self._warm_up_lock:
+            if wait:
+                self._warm_up_lock.wait_for(
+                    lambda: self._warm_up_pending is None and not self._warm_up_busy, timeout=10
+                )
+            staged, self._staged = self._staged, None
+            if staged is None:
+                return
+            settings, caches = staged
+            if settings is self._latest_settings:
+                self._latest_settings = None
+            settings.apply_to(self)
+            for key, value in caches.items():
+                setattr(self, key, value)
+            self.warm_up_status = dict(self.warm_up_status, state="applied")
+    
+    def set_device_name(self, name: str):
+        """
+        設定動態浮水印中的裝置名稱
+        
+        Args:
+            name: 裝置名稱，空字串表示使用主機名稱
+        """
+        self.device_name = name.strip() or platform.node() or "unknown"
     
     def set_processing(self, enabled: bool):
         """
@@ -62,11 +375,314 @@ class ScreenCapture:
             interval: 每 N 幀處理一次
         """
         self.frame_interval = max(1, min(30, interval))
+        FRAME_INTERVAL.set(self.frame_interval)
+    
+    def set_cpu_governor(self, enabled: bool, target_percent: Optional[float] = None):
+        """
+        設定是否依 CPU 預算自動調整處理頻率
+        
+        Args:
+            enabled: 是否啟用調節器
+            target_percent: 目標 CPU 比例（所有核心合計 100%），None 表示沿用目前或預設值
+        """
+        if not enabled:
+            self.governor = None
+            return
+        if self.governor is None:
+            from .cpu_governor import CpuGovernor
+            self.governor = CpuGovernor()
+        if target_percent is not None:
+            self.governor.set_target(target_percent)
+    
+    def tune_interval(self) -> Optional[dict]:
+        """
+        由調節器依最近的 CPU 使用率調整處理頻率（由背景取樣器定期呼叫）
+        
+        時間分散模式每幀都嵌入，不受處理頻率影響，因此不調整。
+        
+        Returns:
+            Optional[dict]: 調節器這次的狀態與決策，未啟用或資料不足時返回 None
+        """
+        governor = self.governor
+        if governor is None or not self.is_processing or self._is_temporal():
+            return None
+        decision = governor.update(self.frame_interval, CAPTURE_FPS.get())
+        if decision and decision["interval"] != self.frame_interval:
+            self.set_frame_interval(decision["interval"])
+        return decision
+    
+    def set_frame_ring(self, path: Optional[str], slots: Optional[int] = None):
+        """
+        設定原始影格環形緩衝區
+        
+        實際的建立與關閉在擷取執行緒發布下一幀時進行，不會與正在寫入的影格衝突。
+        
+        Args:
+            path: 記憶體映射檔路徑，None 或空字串表示停用
+            slots: 槽位數，None 表示沿用目前設定
+        """
+        self.frame_ring_path = path or None
+        if slots:
+            self.frame_ring_slots = max(2, int(slots))
+    
+    def frame_ring_status(self) -> dict:
+        """
+        取得環形緩衝區狀態
+        
+        Returns:
+            dict: 是否啟用、設定的路徑與槽位數，建立後另含容量與已發布的影格數
+        """
+        status = {
+            "enabled": self.frame_ring_path is not None,
+            "path": self.frame_ring_path,
+            "slots": self.frame_ring_slots,
+        }
+        if self.frame_ring is not None and self._frame_ring_config == (self.frame_ring_path, self.frame_ring_slots):
+            status.update(self.frame_ring.status())
+        return status
+    
+    def _close_frame_ring(self):
+        """關閉並刪除環形緩衝區檔案"""
+        if self.frame_ring is not None:
+            self.frame_ring.close(unlink=True)
+            self.frame_ring = None
+            self._frame_ring_config = None
+    
+    def _publish_frame(self, frame: np.ndarray, captured_at: float, watermarked: bool):
+        """
+        將最終影格發布到環形緩衝區（未啟用時不做任何事）
+        
+        Args:
+            frame: 嵌入浮水印後的影格
+            captured_at: 擷取時間（Unix 時間）
+            watermarked: 這一幀是否嵌入浮水印
+        """
+        config = (self.frame_ring_path, self.frame_ring_slots)
+        if self.frame_ring is not None and self._frame_ring_config != config:
+            self._close_frame_ring()
+        if self.frame_ring_path is None:
+            return
+        try:
+            if self.frame_ring is None:
+                # 依記憶體預算決定槽位數，連最小槽位數都放不下時停用
+                slots = memory_guard.fit("frame_ring", frame.nbytes, self.frame_ring_slots, minimum=2)
+                if not slots:
+                    print("記憶體不足，停用影格環形緩衝區")
+                    self.frame_ring_path = None
+                    return
+                from .frame_ring import FrameRingWriter
+                self.frame_ring = FrameRingWriter(self.frame_ring_path, frame.shape, slots)
+                self._frame_ring_config = config
+                print(f"影格環形緩衝區: {self.frame_ring_path}（{slots} 個槽位）")
+            self.frame_ring.publish(frame, captured_at, watermarked)
+            RING_FRAMES_PUBLISHED.inc()
+        except Exception as e:
+            print(f"發布影格失敗，停用環形緩衝區: {str(e)}")
+            self._close_frame_ring()
+            self.frame_ring_path = None
+    
+    def set_target_windows(self, titles: List[str]):
+        """
+        設定只在指定視窗範圍內嵌入浮水印
+        
+        Args:
+            titles: 視窗標題列表（部分符合即可），空列表表示處理整個畫面
+        """
+        titles = [title.strip() for title in titles if title and title.strip()]
+        if titles == self.target_windows:
+            return
+        self.target_windows = titles
+        self.target_regions = None
+        if titles:
+            from .window_tracker import WindowTracker
+            self.window_tracker = WindowTracker(titles)
+        else:
+            self.window_tracker = None
+    
+    def _update_target_regions(self):
+        """依目標視窗目前的位置更新要處理的區域"""
+        if self.window_tracker is None:
+            self.target_regions = None
+            return
+        regions = self.window_tracker.regions(self.monitor)
+        self.target_regions = None if regions is None else list(regions)
+    
+    def set_worker_mode(self, enabled: bool, workers: Optional[int] = None):
+        """
+        設定是否使用多行程工作池進行浮水印與編碼
+        
+        Args:
+            enabled: 是否啟用工作池
+            workers: 工作行程數，None 表示使用 CPU 核心數
+        """
+        if workers != self.worker_count or not enabled:
+            self._close_worker_pool()
+        self.use_workers = enabled
+        self.worker_count = workers
+    
+    def _close_worker_pool(self):
+        """關閉工作池，尚未取回的影格會被捨棄"""
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+            self.worker_pool = None
+            self._pool_meta.clear()
+    
+    def _watermark_settings(self) -> dict:
+        """
+        取得浮水印設定快照，傳給工作行程使用
+        
+        Returns:
+            dict: 浮水印相關屬性
+        """
+        return {
+            "watermark_text": self.watermark_text,
+            "watermark_visible": self.watermark_visible,
+            "use_redundancy": self.use_redundancy,
+            "use_temporal": self.use_temporal,
+            "use_dct": self.use_dct,
+            "temporal_sequence": self.temporal_sequence,
+            "use_dynamic": self.use_dynamic,
+            "device_name": self.device_name,
+            "payload_counter": self.payload_counter,
+            "payload_timestamp": self.payload_timestamp,
+            "use_ecc": self.use_ecc,
+            "use_bitplane": self.use_bitplane,
+            "bitplane_bits": self.bitplane_bits,
+            "bitplane_channels": self.bitplane_channels,
+            "use_hybrid": self.use_hybrid,
+            "target_regions": self.target_regions,
+        }
+    
+    def _is_temporal(self) -> bool:
+        """是否處於時間分散浮水印模式"""
+        return self.use_temporal and not self.watermark_visible and not self.use_dct and not self.use_hybrid
+    
+    def _is_dynamic(self) -> bool:
+        """是否處於動態鑑識浮水印模式"""
+        return self.use_dynamic and not self.watermark_visible and not self.use_dct and not self.use_hybrid \
+            and not self._is_temporal()
+    
+    def _is_ecc(self) -> bool:
+        """是否處於錯誤更正浮水印模式"""
+        return self.use_ecc and not self.watermark_visible and not self.use_dct and not self.use_hybrid \
+            and not self._is_temporal() and not self._is_dynamic()
+    
+    def _ecc_repetition(self) -> bool:
+        """錯誤更正模式的分散版面是否改用冗餘 LSB（極短文字逐位元重複寫入的位置較少）"""
+        from .ecc_payload import prefers_repetition
+        return self.use_redundancy and prefers_repetition(self.watermark_text)
+    
+    def _is_bitplane(self) -> bool:
+        """是否處於多位元平面 LSB 模式"""
+        return self.use_bitplane and not self.watermark_visible and not self.use_dct and not self.use_hybrid \
+            and not self._is_temporal() and not self._is_dynamic() and not self._is_ecc()
+    
+    def _uses_redundant_layout(self) -> bool:
+        """是否使用冗餘位置排列（冗餘的 LSB、混合、動態與錯誤更正模式）"""
+        if not self.use_redundancy or self.use_dct or not (self.watermark_text or self._is_dynamic()):
+            return False
+        return self.use_hybrid or not (self.watermark_visible or self._is_temporal() or self._is_bitplane())
+    
+    def _pool_positions(self, shape: Tuple[int, int]) -> Optional[np.ndarray]:
+        """
+        取得要交給工作行程的冗餘位置排列
+        
+        每個工作行程各自打亂 4K 畫面要超過 10 秒，且同時佔用數倍記憶體；改由擷取行程打亂一次
+        （切換設定時通常已由暖機完成），再經共享記憶體交給工作行程。
+        
+        Args:
+            shape: 影像的 (高, 寬)
+        
+        Returns:
+            Optional[np.ndarray]: 排列前段，目前模式不使用冗餘版面或超過記憶體預算時返回 None
+        """
+        if not self._uses_redundant_layout():
+            return None
+        count = max(DEFAULT_POSITION_COUNT, (len(self.watermark_text) + 1) * 8 * REDUNDANCY)
+        return self._redundant_positions(shape[0], shape[1], min(count, shape[0] * shape[1] * 3))
+    
+    def _should_watermark(self) -> bool:
+        """
+        判斷目前這一幀是否需要嵌入浮水印
+        
+        時間分散模式每一幀都嵌入一個區塊，其餘模式依處理頻率每 N 幀嵌入一次。
+        
+        Returns:
+            bool: 是否需要嵌入
+        """
+        if not self.is_processing:
+            return False
+        return self._is_temporal() or self.frame_count % self.frame_interval == 0
+    
+    def _advance_frame(self, watermarked: bool):
+        """
+        更新幀計數與時間分散區塊序號
+        
+        Args:
+            watermarked: 這一幀是否已嵌入浮水印
+        """
+        self.frame_count = (self.frame_count + 1) % self.frame_interval
+        if watermarked and self._is_temporal():
+            self.temporal_sequence += 1
+        if watermarked and self._is_dynamic():
+            self.payload_counter += 1
+    
+    def _visible_overlay(self, width: int, height: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        取得置中可見浮水印的疊加層，文字或區域大小改變時才重新繪製
+        
+        cv2.putText 繪製的邊緣會與底色混合，結果對底色是線性的（底色 × 增益 + 偏移），
+        因此分別在全黑與全白底上繪製一次即可求出每個像素的增益與偏移。
+        疊加層只記錄文字與陰影覆蓋的像素，每幀只需混合這些像素，不必重新繪製文字。
+        
+        Args:
+            width: 區域寬度
+            height: 區域高度
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (覆蓋像素的攤平索引, 增益, 偏移)
+        """
+        key = (self.watermark_text, width, height)
+        overlay = self._overlay_cache.get(key)
+        if overlay is None:
+            # 設定文字參數
+            font = cv2.FONT_HERSHEY_SIMPLEX
+            font_scale = min(width, height) / 500.0  # 增大字體大小
+            thickness = max(2, int(font_scale * 3))  # 增加文字粗細
+            
+            # 取得文字大小並計算中心位置
+            text_size = cv2.getTextSize(self.watermark_text, font, font_scale, thickness)[0]
+            x = (width - text_size[0]) // 2
+            y = (height + text_size[1]) // 2
+            
+            layers = []
+            for background in (0, 255):
+                layer = np.full((height, width), background, dtype=np.uint8)
+                # 繪製文字陰影（加粗陰影）
+                cv2.putText(layer, self.watermark_text, (x+3, y+3), font, font_scale, 0, thickness+1)
+                # 繪製白色文字
+                cv2.putText(layer, self.watermark_text, (x, y), font, font_scale, 255, thickness)
+                layers.append(layer.reshape(-1).astype(np.float32))
+            
+            offset, white = layers
+            indices = np.flatnonzero((offset != 0) | (white != 255))
+            gain = (white[indices] - offset[indices]) / 255.0
+            # 混合後的像素 = 原像素 × (1 - alpha + alpha × 增益) + alpha × 偏移
+            alpha = self.VISIBLE_ALPHA
+            overlay = (indices, (1 - alpha + alpha * gain)[:, None], (alpha * offset[indices] + 0.5)[:, None])
+            self._overlay_cache[key] = overlay
+            while len(self._overlay_cache) > 8:
+                self._overlay_cache.popitem(last=False)
+        self._overlay_cache.move_to_end(key)
+        return overlay
     
     def add_visible_watermark(self, frame: np.ndarray) -> np.ndarray:
         """
         添加可見浮水印，只在畫面正中央顯示一個浮水印
         
+        文字只覆蓋畫面的一小部分，因此使用快取的疊加層只混合被覆蓋的像素，
+        結果與 cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0) 相同（誤差在 1 以內）。
+        
         Args:
             frame: 輸入影像
         
@@ -75,36 +691,13 @@ class ScreenCapture:
         """
         if not self.watermark_text:
             return frame
-            
-        height, width = frame.shape[:2]
-        # 創建浮水印層
-        overlay = frame.copy()
-        
-        # 設定文字參數
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = min(width, height) / 500.0  # 增大字體大小
-        thickness = max(2, int(font_scale * 3))  # 增加文字粗細
-        color = (255, 255, 255)  # 白色文字
-        
-        # 取得文字大小
-        text_size = cv2.getTextSize(self.watermark_text, font, font_scale, thickness)[0]
-        
-        # 計算中心位置
-        x = (width - text_size[0]) // 2
-        y = (height + text_size[1]) // 2
-        
-        # 繪製文字陰影（加粗陰影）
-        cv2.putText(overlay, self.watermark_text, 
-                  (x+3, y+3), font, font_scale, 
-                  (0,0,0), thickness+1)  # 增加陰影粗細
-        # 繪製文字
-        cv2.putText(overlay, self.watermark_text, 
-                  (x, y), font, font_scale, 
-                  color, thickness)
         
-        # 設定透明度
-        alpha = 0.35  # 稍微提高透明度
-        return cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0)
+        height, width = frame.shape[:2]
+        indices, gain, offset = self._visible_overlay(width, height)
+        watermarked = frame.copy()
+        pixels = watermarked.reshape(-1, 3)
+        pixels[indices] = np.clip(pixels[indices] * gain + offset, 0, 255).astype(np.uint8)
+        return watermarked
     
     def add_visible_watermark_redundancy(self, frame: np.ndarray) -> np.ndarray:
         """
@@ -166,6 +759,131 @@ class ScreenCapture:
         alpha = 0.35  # 稍微提高透明度
         return cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0)
     
+    def _redundant_positions(self, height: int, width: int, count: int) -> Optional[np.ndarray]:
+        """
+        取得冗餘版面前 count 個位置，第一次遇到此大小時打亂整個畫面的位置
+        
+        超過記憶體預算時返回 None，由呼叫端改用標準版面；降級結果依影像大小記在 memory_guard 中。
+        
+        Args:
+            height: 影像高度
+            width: 影像寬度
+            count: 需要的位置數
+        
+        Returns:
+            Optional[np.ndarray]: 攤平後 (行, 列, 通道) 的索引，超過記憶體預算時為 None
+        """
+        if not positions_cached((height, width), count):
+            if not memory_guard.allow("redundancy_embed", position_build_bytes((height, width)), fallback=True,
+                                      key=(height, width)):
+                return None
+            with memory_guard.operation("redundancy_positions"):
+                redundancy_positions((height, width), count)
+        return redundancy_positions((height, width), count)[:count]
+    
+    def _lsb_writes(self, height: int, width: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        計算 LSB 浮水印寫入的位置與位元，結果與 add_invisible_watermark（冗餘時為 add_invisible_watermark_redundancy）相同
+        
+        冗餘版面第一次遇到此大小且超過記憶體預算時改用標準版面。
+        
+        Args:
+            height: 影像高度
+            width: 影像寬度
+        
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray]]: (攤平後 (行, 列, 通道) 的索引, 位元)，
+            索引不重複；影像太小時返回 None
+        """
+        if self.use_redundancy:
+            watermark_bin = ''.join(format(ord(char), '08b') for char in self.watermark_text + '\0')
+            bits = np.frombuffer(watermark_bin.encode('ascii'), dtype=np.uint8) - ord('0')
+            count = len(bits) * REDUNDANCY
+            positions = self._redundant_positions(height, width, count) if height * width * 3 >= count else None
+            if positions is not None:
+                # 開頭的種子值與冗餘度寫在第一欄，與分散的位置重疊時以後寫入的標頭為準
+                header_bin = format(REDUNDANCY_SEED, '032b') + format(REDUNDANCY, '08b')
+                header = np.arange(len(header_bin))
+                positions = np.concatenate([positions, header // 3 * width * 3 + header % 3])
+                bits = np.concatenate([np.repeat(bits, REDUNDANCY)[:count],
+                                       np.frombuffer(header_bin.encode('ascii'), dtype=np.uint8) - ord('0')])
+                positions, last = np.unique(positions[::-1], return_index=True)
+                return positions, bits[::-1][last]
+        
+        binary_text = ''.join(format(ord(c), '08b') for c in self.watermark_text) + '0' * 8
+        if len(binary_text) > height * width:
+            return None
+        bits = np.frombuffer(binary_text.encode('ascii'), dtype=np.uint8) - ord('0')
+        return np.arange(len(bits)) * 3, bits
+    
+    def _hybrid_writes(self, height: int, width: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        取得可見加不可見浮水印的合併寫入表，文字、大小或版面改變時才重新計算
+        
+        寫入表涵蓋可見浮水印覆蓋的像素與 LSB 寫入的像素，每個像素有混合的增益與偏移，
+        以及每個通道清除最低位元的遮罩與寫入的位元。只有 LSB 的像素增益為 1、偏移為 0.5，
+        混合後保持原值；兩者重疊的像素先混合再寫入位元，LSB 不會被疊加層蓋掉。
+        
+        Args:
+            height: 影像高度
+            width: 影像寬度
+        
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+            (像素的攤平索引, 增益, 偏移, 遮罩, 位元)
+        """
+        key = (self.watermark_text, height, width, self.use_redundancy)
+        if self._hybrid_plan is None or self._hybrid_plan[0] != key:
+            indices, gain, offset = self._visible_overlay(width, height)
+            writes = self._lsb_writes(height, width)
+            if writes is None:
+                print("圖片太小，只嵌入可見浮水印")
+                writes = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8))
+            positions, bits = writes
+            pixels, channels = positions // 3, positions % 3
+            
+            union = np.union1d(indices, pixels)
+            plan_gain = np.ones((len(union), 1), dtype=gain.dtype)
+            plan_offset = np.full((len(union), 1), 0.5, dtype=offset.dtype)
+            slots = np.searchsorted(union, indices)
+            plan_gain[slots] = gain
+            plan_offset[slots] = offset
+            clear = np.full((len(union), 3), 0xFF, dtype=np.uint8)
+            values = np.zeros((len(union), 3), dtype=np.uint8)
+            slots = np.searchsorted(union, pixels)
+            clear[slots, channels] = 0xFE
+            values[slots, channels] = bits
+            self._hybrid_plan = (key, (union, plan_gain, plan_offset, clear, values))
+        return self._hybrid_plan[1]
+    
+    def add_hybrid_watermark(self, frame: np.ndarray, in_place: bool = False) -> np.ndarray:
+        """
+        同時添加置中可見浮水印與 LSB 浮水印，只走訪一次被寫入的像素
+        
+        依序呼叫 add_visible_watermark 與 add_invisible_watermark 需要複製兩次畫面並讀寫兩次；
+        這裡以合併的寫入表一次取出像素、混合、寫入最低位元後放回同一個輸出影像，
+        結果與依序呼叫兩者相同。
+        
+        Args:
+            frame: 輸入影像
+            in_place: 是否直接修改輸入影像（新擷取的影格不需要先複製）
+        
+        Returns:
+            添加浮水印後的影像
+        """
+        if not self.watermark_text:
+            return frame
+        
+        height, width = frame.shape[:2]
+        indices, gain, offset, clear, values = self._hybrid_writes(height, width)
+        watermarked = frame if in_place and frame.flags.c_contiguous else frame.copy()
+        pixels = watermarked.reshape(-1, 3)
+        blended = np.clip(pixels[indices] * gain + offset, 0, 255).astype(np.uint8)
+        blended &= clear
+        blended |= values
+        pixels[indices] = blended
+        return watermarked
+    
     def add_invisible_watermark(self, frame: np.ndarray) -> np.ndarray:
         """
         添加不可見浮水印（LSB）
@@ -191,21 +909,187 @@ class ScreenCapture:
         # 複製影像
         watermarked = frame.copy()
         
-        # 嵌入浮水印
-        idx = 0
-        for i in range(height):
-            for j in range(width):
-                if idx < len(binary_text):
-                    # 修改藍色通道的最低位
-                    pixel = watermarked[i, j].copy()
-                    pixel[0] = (pixel[0] & 0xFE) | int(binary_text[idx])
-                    watermarked[i, j] = pixel
-                    idx += 1
-                else:
-                    break
+        # 由左上角逐像素修改藍色通道的最低位
+        bits = np.frombuffer(binary_text.encode('ascii'), dtype=np.uint8) - ord('0')
+        blue = watermarked.reshape(-1)[0:len(bits) * 3:3]
+        blue &= 0xFE
+        blue |= bits
         
         return watermarked
     
+    def add_dct_watermark(self, frame: np.ndarray) -> np.ndarray:
+        """
+        添加頻率域浮水印（8×8 區塊 DCT 中頻係數），可承受 JPEG 與影片壓縮
+        
+        Args:
+            frame: 輸入影像
+        
+        Returns:
+            添加浮水印後的影像
+        """
+        if not self.watermark_text:
+            return frame
+        from .dct_watermark import embed_dct
+        return embed_dct(frame, self.watermark_text)
+    
+    def _temporal_chunks(self) -> List[np.ndarray]:
+        """
+        取得目前浮水印文字的時間分散區塊，文字改變時才重新產生
+        
+        Returns:
+            List[np.ndarray]: 區塊位元陣列列表
+        """
+        if self._temporal_cache[0] != self.watermark_text:
+            from .temporal_payload import build_chunks
+            self._temporal_cache = (self.watermark_text, build_chunks(self.watermark_text))
+        return self._temporal_cache[1]
+    
+    def add_temporal_watermark(self, frame: np.ndarray, in_place: bool = False) -> np.ndarray:
+        """
+        添加時間分散浮水印（LSB），只嵌入目前序號對應的區塊
+        
+        Args:
+            frame: 輸入影像
+            in_place: 是否直接修改輸入影像（新擷取的影格不需要先複製）
+        
+        Returns:
+            添加浮水印後的影像
+        """
+        if not self.watermark_text:
+            return frame
+        
+        chunks = self._temporal_chunks()
+        bits = chunks[self.temporal_sequence % len(chunks)]
+        if frame.shape[0] * frame.shape[1] < len(bits):
+            return frame
+        
+        from .temporal_payload import embed_chunk
+        return embed_chunk(frame if in_place else frame.copy(), bits)
+    
+    def _dynamic_encoder(self, height: int, width: int):
+        """
+        取得動態浮水印編碼器，裝置名稱、影像大小或版面改變時才重新建立
+        
+        Returns:
+            Optional[DynamicPayload]: 編碼器，影像太小時返回 None
+        """
+        key = (self.device_name, height, width, self.use_redundancy)
+        if self._dynamic_payload is None or self._dynamic_payload[0] != key:
+            from .dynamic_payload import MAX_PAYLOAD_BYTES, DynamicPayload
+            needed = MAX_PAYLOAD_BYTES * 8 * (REDUNDANCY if self.use_redundancy else 3)
+            if height * width * 3 < needed:
+                return None
+            redundant = self.use_redundancy
+            if redundant and not positions_cached((height, width), needed):
+                # 與冗餘模式相同，第一次遇到此大小時需要打亂位置，超過記憶體預算時改用標準版面
+                redundant = memory_guard.allow("redundancy_embed", position_build_bytes((height, width)), fallback=True,
+                                               key=(height, width))
+            self._dynamic_payload = (key, DynamicPayload(self.device_name, (height, width), redundant))
+        return self._dynamic_payload[1]
+    
+    def add_dynamic_watermark(self, frame: np.ndarray, in_place: bool = False) -> np.ndarray:
+        """
+        添加動態鑑識浮水印（LSB），內容為裝置名稱、目前影格計數與擷取時間
+        
+        編碼器依裝置名稱、影像大小與版面快取，每幀只重新編碼計數與時間欄位。
+        
+        Args:
+            frame: 輸入影像
+            in_place: 是否直接修改輸入影像（新擷取的影格不需要先複製）
+        
+        Returns:
+            添加浮水印後的影像
+        """
+        encoder = self._dynamic_encoder(*frame.shape[:2])
+        if encoder is None:
+            print("圖片太小，無法嵌入動態浮水印")
+            return frame
+        
+        timestamp = self.payload_timestamp or time.time()
+        return encoder.embed(frame if in_place else frame.copy(), self.payload_counter, timestamp)
+    
+    def _ecc_encoder(self, height: int, width: int):
+        """
+        取得錯誤更正浮水印編碼器，文字、影像大小或版面改變時才重新建立
+        
+        Returns:
+            EccPayload: 編碼器
+        """
+        key = (self.watermark_text, height, width, self.use_redundancy)
+        if self._ecc_payload is None or self._ecc_payload[0] != key:
+            from .ecc_payload import EccPayload
+            redundant = self.use_redundancy
+            if redundant and not positions_cached((height, width)):
+                # 分散版面第一次遇到此大小時需要打亂位置，超過記憶體預算時改用標準版面
+                redundant = memory_guard.allow("redundancy_embed", position_build_bytes((height, width)), fallback=True,
+                                               key=(height, width))
+            self._ecc_payload = (key, EccPayload(self.watermark_text, (height, width), redundant))
+        return self._ecc_payload[1]
+    
+    def add_ecc_watermark(self, frame: np.ndarray, in_place: bool = False) -> np.ndarray:
+        """
+        添加 Reed-Solomon 錯誤更正浮水印（LSB）
+        
+        編碼器依文字、影像大小與版面快取，每幀只需寫入預先算好的位元。
+        分散版面下極短的文字改用冗餘 LSB，寫入的位置較少。
+        
+        Args:
+            frame: 輸入影像
+            in_place: 是否直接修改輸入影像（新擷取的影格不需要先複製）
+        
+        Returns:
+            添加浮水印後的影像
+        """
+        if not self.watermark_text:
+            return frame
+        if self._ecc_repetition():
+            return self.add_invisible_watermark_redundancy(frame)
+        
+        encoder = self._ecc_encoder(*frame.shape[:2])
+        if not encoder.fits():
+            print("圖片太小，無法嵌入錯誤更正浮水印")
+            return frame
+        
+        return encoder.embed(frame if in_place else frame.copy())
+    
+    def _bitplane_encoder(self, height: int, width: int):
+        """
+        取得多位元平面浮水印編碼器，文字、影像大小或版面改變時才重新建立
+        
+        Returns:
+            BitplanePayload: 編碼器
+        """
+        repeat = BITPLANE_REPEAT if self.use_redundancy else 1
+        key = (self.watermark_text, height, width, self.bitplane_bits, self.bitplane_channels, repeat)
+        if self._bitplane_payload is None or self._bitplane_payload[0] != key:
+            from .bitplane_payload import BitplanePayload
+            self._bitplane_payload = (key, BitplanePayload(self.watermark_text, (height, width), self.bitplane_bits,
+                                                           self.bitplane_channels, repeat))
+        return self._bitplane_payload[1]
+    
+    def add_bitplane_watermark(self, frame: np.ndarray, in_place: bool = False) -> np.ndarray:
+        """
+        添加多位元平面 LSB 浮水印，版面記錄在畫面開頭的標頭中
+        
+        編碼器依文字、影像大小與版面快取，每幀每個通道只做一次位元平面寫入。
+        
+        Args:
+            frame: 輸入影像
+            in_place: 是否直接修改輸入影像（新擷取的影格不需要先複製）
+        
+        Returns:
+            添加浮水印後的影像
+        """
+        if not self.watermark_text:
+            return frame
+        
+        encoder = self._bitplane_encoder(*frame.shape[:2])
+        if not encoder.fits():
+            print("圖片太小，無法嵌入多位元平面浮水印")
+            return frame
+        
+        return encoder.embed(frame if in_place else frame.copy())
+    
     def add_invisible_watermark_redundancy(self, frame: np.ndarray) -> np.ndarray:
         """
         添加帶有冗餘的不可見浮水印（LSB），提高浮水印的魯棒性
@@ -229,37 +1113,21 @@ class ScreenCapture:
             print("圖片太小，無法嵌入完整的浮水印")
             return frame
         
+        # 固定種子的偽隨機位置排列，同一影像大小只計算一次
+        seed_value = REDUNDANCY_SEED
+        redundancy = REDUNDANCY  # 確保每一位浮水印信息至少有10個不同位置
+        bits = np.frombuffer(watermark_bin.encode('ascii'), dtype=np.uint8) - ord('0')
+        # 第一次遇到此大小時需要打亂整個畫面的位置，超過記憶體預算就降級為標準 LSB
+        positions = self._redundant_positions(height, width, len(bits) * redundancy)
+        if positions is None:
+            return self.add_invisible_watermark(frame)
+        
         # 複製影像
         watermarked = frame.copy()
-        
-        # 固定種子以確保提取時能復現相同的隨機序列
-        seed_value = 42
-        import random
-        random.seed(seed_value)
-        
-        # 創建圖像大小的偽隨機排列用於嵌入
-        positions = []
-        
-        # 建立像素位置列表 (行, 列, 通道)
-        for i in range(height):
-            for j in range(width):
-                for k in range(3):  # RGB通道
-                    positions.append((i, j, k))
-        
-        # 隨機化位置順序
-        random.shuffle(positions)
-        
-        # 確保每一位浮水印信息至少有10個不同位置
-        redundancy = 10
+        flat = watermarked.reshape(-1)
         
         # 嵌入浮水印（每個位元重複嵌入多次以提高魯棒性）
-        for watermark_idx in range(len(watermark_bin)):
-            bit = int(watermark_bin[watermark_idx])
-            # 將相同的位元嵌入多個不同位置以提高魯棒性
-            for r in range(redundancy):
-                if watermark_idx * redundancy + r < len(positions):
-                    i, j, k = positions[watermark_idx * redundancy + r]
-                    watermarked[i, j, k] = (watermarked[i, j, k] & 0xFE) | bit
+        flat[positions] = (flat[positions] & 0xFE) | np.repeat(bits, redundancy)[:len(positions)]
         
         # 在文件開頭存儲種子值和冗餘度（用於提取時恢復）
         # 存儲種子值（32位整數）
@@ -302,11 +1170,14 @@ class ScreenCapture:
             
             height, width = frame.shape[:2]
             
-            # 創建視頻寫入器
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            self.video_writer = cv2.VideoWriter(
-                output_path, fourcc, self.fps, (width, height)
-            )
+            # 依記憶體預算決定錄影佇列長度，連最小佇列都放不下時拒絕錄影
+            max_queue = memory_guard.fit("recording", frame.nbytes, 60, minimum=4)
+            if not max_queue:
+                return None
+            
+            # 創建背景錄影寫入器
+            from .recorder import VideoRecorder
+            self.recorder = VideoRecorder(output_path, self.fps, (width, height), max_queue=max_queue)
             
             self.is_recording = True
             self.current_recording_path = output_path  # 保存當前錄影路徑
@@ -331,9 +1202,13 @@ class ScreenCapture:
             self.is_recording = False
             recording_path = self.current_recording_path
             
-            if self.video_writer:
-                self.video_writer.release()
-                self.video_writer = None
+            if self.recorder:
+                self.recorder.release()
+                stats = self.recorder.stats()
+                self.recorder = None
+                print(f"錄影時間軸: {stats['fps']} fps，擷取 {stats['capture_fps']} fps，"
+                      f"寫入 {stats['written']} 幀（重複 {stats['duplicated']}、捨棄 {stats['dropped']}），"
+                      f"最大時間偏移 {stats['max_drift_ms']} ms")
             
             print("停止錄影")
             return recording_path
@@ -342,6 +1217,94 @@ class ScreenCapture:
             print(f"停止錄影失敗: {str(e)}")
             return None
     
+    def _watermark_mode_label(self) -> str:
+        """
+        取得目前浮水印模式的名稱，作為效能指標的標籤
+        
+        Returns:
+            str: 模式名稱
+        """
+        if self.use_dct:
+            return "dct"
+        if self._is_temporal():
+            return "temporal"
+        if self.watermark_visible:
+            mode = "visible"
+        elif self.use_hybrid:
+            mode = "visible_lsb"
+        elif self.use_dynamic:
+            mode = "dynamic"
+        elif self.use_ecc:
+            mode = "lsb" if self._ecc_repetition() else "ecc"
+        else:
+            mode = "bitplane" if self.use_bitplane else "lsb"
+        return f"{mode}_redundant" if self.use_redundancy else mode
+    
+    def _frame_meta(self, captured_at: float, watermarked: bool) -> Tuple[float, bool, str, int]:
+        """
+        建立錄影索引的影格紀錄
+        
+        Args:
+            captured_at: 擷取時間（Unix 時間）
+            watermarked: 這一幀是否嵌入浮水印
+        
+        Returns:
+            Tuple[float, bool, str, int]: (擷取時間, 是否嵌入浮水印, 浮水印模式, 浮水印識別碼)
+        """
+        if not watermarked:
+            return captured_at, False, "none", 0
+        text = self.device_name if self._is_dynamic() else self.watermark_text
+        return captured_at, True, self._watermark_mode_label(), payload_id(text)
+    
+    def apply_watermark(self, frame: np.ndarray) -> np.ndarray:
+        """
+        依目前設定嵌入浮水印，設定目標視窗時只處理視窗範圍
+        
+        Args:
+            frame: 新擷取的影像，時間分散模式與目標視窗模式會直接修改此影像
+        
+        Returns:
+            添加浮水印後的影像
+        """
+        if self.target_regions is None:
+            return self._apply_watermark_region(frame)
+        for x0, y0, x1, y1 in self.target_regions:
+            region = frame[y0:y1, x0:x1]
+            watermarked = self._apply_watermark_region(region)
+            if watermarked is not region:
+                region[...] = watermarked
+        return frame
+    
+    def _apply_watermark_region(self, frame: np.ndarray) -> np.ndarray:
+        """
+        對單一影像或區域嵌入目前模式的浮水印
+        
+        Args:
+            frame: 影像或視窗區域
+        
+        Returns:
+            添加浮水印後的影像
+        """
+        if self.use_dct:
+            return self.add_dct_watermark(frame)
+        if self.use_hybrid:
+            return self.add_hybrid_watermark(frame, in_place=True)
+        if self._is_temporal():
+            return self.add_temporal_watermark(frame, in_place=True)
+        if self.watermark_visible:
+            if self.use_redundancy:
+                return self.add_visible_watermark_redundancy(frame)
+            return self.add_visible_watermark(frame)
+        if self._is_dynamic():
+            return self.add_dynamic_watermark(frame, in_place=True)
+        if self._is_ecc():
+            return self.add_ecc_watermark(frame, in_place=True)
+        if self._is_bitplane():
+            return self.add_bitplane_watermark(frame, in_place=True)
+        if self.use_redundancy:
+            return self.add_invisible_watermark_redundancy(frame)
+        return self.add_invisible_watermark(frame)
+    
     def capture_screen(self) -> Optional[np.ndarray]:
         """
         擷取螢幕畫面
@@ -350,6 +1313,11 @@ class ScreenCapture:
             np.ndarray: 擷取的畫面，如果失敗則返回 None
         """
         try:
+            self._apply_staged_settings()
+            start = time.perf_counter()
+            captured_at = time.time()
+            captured_clock = time.monotonic()  # 錄影時間軸使用，不受系統時間調整影響
+            
             # 擷取螢幕畫面
             screenshot = self.sct.grab(self.monitor)
             
@@ -358,26 +1326,34 @@ class ScreenCapture:
             
             # 轉換色彩空間從 BGRA 到 BGR
             frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+            self.frame_shape = frame.shape[:2]
+            
+            captured = time.perf_counter()
+            FRAMES_CAPTURED.inc()
+            CAPTURE_SECONDS.observe(captured - start)
             
             # 如果正在處理且到達處理間隔
-            if self.is_processing and self.frame_count % self.frame_interval == 0:
-                if self.watermark_visible:
-                    if self.use_redundancy:
-                        frame = self.add_visible_watermark_redundancy(frame)
-                    else:
-                        frame = self.add_visible_watermark(frame)
-                else:
-                    if self.use_redundancy:
-                        frame = self.add_invisible_watermark_redundancy(frame)
-                    else:
-                        frame = self.add_invisible_watermark(frame)
+            watermark = self._should_watermark()
+            if watermark:
+                self.payload_timestamp = captured_at
+                self._update_target_regions()
+                frame = self.apply_watermark(frame)
+                mode = self._watermark_mode_label()
+                FRAMES_WATERMARKED.inc(mode=mode)
+                watermark_seconds = time.perf_counter() - captured
+                WATERMARK_SECONDS.observe(watermark_seconds, mode=mode)
+                if self.governor is not None:
+                    self.governor.observe(watermark_seconds)
             
             # 更新幀計數
-            self.frame_count = (self.frame_count + 1) % self.frame_interval
+            self._advance_frame(watermark)
+            
+            # 發布到環形緩衝區（寫入端不等待讀取端）
+            self._publish_frame(frame, captured_at, watermark)
             
-            # 如果正在錄影，寫入影格
-            if self.is_recording and self.video_writer:
-                self.video_writer.write(frame)
+            # 如果正在錄影，交給背景寫入器
+            if self.is_recording and self.recorder:
+                self.recorder.write(frame, self._frame_meta(captured_at, watermark), captured_clock)
             
             return frame
         except Exception as e:
@@ -391,17 +1367,115 @@ class ScreenCapture:
         Returns:
             Tuple[bool, bytes]: (是否成功, JPEG 資料)
         """
+        if self.use_workers:
+            return self._get_frame_jpeg_parallel()
+        
         frame = self.capture_screen()
         if frame is None:
             return False, b''
         
         # 將畫面編碼為 JPEG
+        start = time.perf_counter()
         ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
         if not ret:
             return False, b''
+        FRAMES_ENCODED.inc()
+        ENCODE_SECONDS.observe(time.perf_counter() - start)
         
         return True, jpeg.tobytes()
     
+    def _get_frame_jpeg_parallel(self) -> Tuple[bool, bytes]:
+        """
+        透過多行程工作池取得 JPEG 畫面
+        
+        擷取的影格直接轉換色彩空間寫入共享記憶體槽位，浮水印與編碼由工作行程就地完成。
+        每次呼叫提交一幀並依序取回最舊的結果，管線填滿前不會阻塞。
+        
+        Returns:
+            Tuple[bool, bytes]: (是否成功, JPEG 資料)
+        """
+        try:
+            self._apply_staged_settings()
+            captured_at = time.time()
+            captured_clock = time.monotonic()
+            screenshot = np.array(self.sct.grab(self.monitor))
+            shape = (screenshot.shape[0], screenshot.shape[1], 3)
+            self.frame_shape = shape[:2]
+            
+            # 螢幕解析度改變時重建工作池
+            if self.worker_pool is not None and self.worker_pool.shape != shape:
+                self._close_worker_pool()
+            if self.worker_pool is None:
+                from .frame_workers import SharedFramePool
+                self.worker_pool = SharedFramePool(shape, self.worker_count, positions=self._pool_positions(shape[:2]))
+            pool = self.worker_pool
+            
+            # 槽位全部使用中時，先等待最舊的結果
+            result = None
+            acquired = pool.acquire_slot()
+            if acquired is None:
+                result = self._finish_pool_result(pool, block=True)
+                acquired = pool.acquire_slot()
+            slot, slot_frame = acquired
+            cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR, dst=slot_frame)
+            FRAMES_CAPTURED.inc()
+            
+            watermark = self._should_watermark()
+            if watermark:
+                self.payload_timestamp = captured_at
+                self._update_target_regions()
+                positions = self._pool_positions(shape[:2])
+                if positions is not None:
+                    pool.share_positions(positions)
+            pool.submit(slot, self._watermark_settings(), watermark)
+            self._pool_meta.append((self._frame_meta(captured_at, watermark), captured_clock))
+            self._advance_frame(watermark)
+            
+            if result is None:
+                result = self._finish_pool_result(pool, block=pool.in_flight >= pool.slots)
+            if result is None:
+                return False, b''
+            return True, result
+        except Exception as e:
+            print(f"多行程處理失敗: {str(e)}")
+            return False, b''
+    
+    def _finish_pool_result(self, pool, block: bool) -> Optional[bytes]:
+        """
+        取回工作池中最舊的結果，寫入錄影後歸還槽位
+        
+        Args:
+            pool: 工作池
+            block: 是否等待結果完成
+        
+        Returns:
+            Optional[bytes]: JPEG 資料，尚未完成則返回 None
+        """
+        result = pool.next_result(block)
+        if result is None:
+            return None
+        frame, jpeg, timings, slot = result
+        meta, captured_clock = self._pool_meta.popleft() if self._pool_meta else (None, None)
+        try:
+            watermark_seconds, encode_seconds = timings
+            if watermark_seconds is not None:
+                mode = self._watermark_mode_label()
+                FRAMES_WATERMARKED.inc(mode=mode)
+                WATERMARK_SECONDS.observe(watermark_seconds, mode=mode)
+                if self.governor is not None:
+                    self.governor.observe(watermark_seconds)
+            if jpeg:
+                FRAMES_ENCODED.inc()
+                ENCODE_SECONDS.observe(encode_seconds)
+            if meta is not None:
+                self._publish_frame(frame, meta[0], meta[1])
+            # 槽位稍後會被重複使用，錄影需保留一份副本
+            if self.is_recording and self.recorder:
+                self.recorder.write(frame.copy(), meta, captured_clock)
+        finally:
+            pool.release_slot(slot)
+        return jpeg or None
+    
     def take_screenshot(self, base64_data: str = None) -> str:
         """
         擷取目前畫面並儲存為圖檔
@@ -523,14 +1597,14 @@ class ScreenCapture:
                 # 調整第二張圖片大小以匹配第一張
                 img2 = cv2.resize(img2, (img1.shape[1], img1.shape[0]))
             
+            # 差異圖、放大圖與三倍寬的對比圖
+            memory_guard.require("compare", img1.nbytes * 5)
+            
             # 計算差異
             difference = cv2.absdiff(img1, img2)
             
-            # 為了讓差異更容易看到，將差異值放大
-            # 先轉換為浮點數類型，再進行放大
-            difference_amplified = difference.astype(np.float32) * 1000
-            # 將超過255的值限制在255
-            difference_amplified = np.clip(difference_amplified, 0, 255).astype(np.uint8)
+            # 為了讓差異更容易看到，將差異值放大（飽和運算直接限制在255，不需要浮點數暫存陣列）
+            difference_amplified = cv2.convertScaleAbs(difference, alpha=1000)
             
             # 生成差異圖片的檔案名稱
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -566,10 +1640,13 @@ class ScreenCapture:
             # 保存對比圖
             comparison_path = os.path.join(self.screenshot_dir, f"comparison_{timestamp}.bmp")
             cv2.imwrite(comparison_path, comparison)
+            self.last_comparison_id = self.comparison_cache.put(comparison, comparison_path)
             
             print(f"截圖比較完成，差異圖片已儲存: {comparison_path}")
             return comparison_path
             
+        except MemoryBudgetExceeded:
+            raise
         except Exception as e:
             print(f"比較截圖失敗: {str(e)}")
             return None
@@ -592,13 +1669,20 @@ class ScreenCapture:
             difference_path = os.path.join(self.screenshot_dir, f"difference_{timestamp}.bmp")
             comparison_path = os.path.join(self.screenshot_dir, f"comparison_{timestamp}.bmp")
             
-            # 擷取畫面
+            # 擷取畫面（剛送出的設定若仍在暖機，先等待完成再套用）
             print("擷取螢幕畫面...")
+            self._apply_staged_settings(wait=True)
             frame = self.capture_screen()
             if frame is None:
                 print("無法擷取畫面")
                 return None
             
+            # 浮水印畫面、差異圖、放大圖與三倍寬的對比圖，冗餘模式第一次使用時還要建立位置排列
+            required = frame.nbytes * 6
+            if self.use_redundancy and not positions_cached(frame.shape[:2]):
+                required += position_build_bytes(frame.shape[:2])
+            memory_guard.require("compare", required)
+            
             # 儲存原始畫面（無浮水印）
             print(f"儲存原始截圖至: {screenshot_path}")
             cv2.imwrite(screenshot_path, frame)
@@ -615,6 +1699,24 @@ class ScreenCapture:
             if self.watermark_visible:
                 print("使用可見浮水印模式")
                 watermarked_frame = self.add_visible_watermark(frame)
+            elif self.use_dct:
+                print("使用頻率域浮水印模式（區塊DCT）")
+                watermarked_frame = self.add_dct_watermark(frame)
+            elif self.use_hybrid:
+                print("使用可見加不可見浮水印模式（置中文字與LSB同時嵌入）")
+                watermarked_frame = self.add_hybrid_watermark(frame)
+            elif self.use_temporal:
+                print("使用時間分散浮水印模式（LSB區塊）")
+                watermarked_frame = self.add_temporal_watermark(frame)
+            elif self._is_dynamic():
+                print("使用動態鑑識浮水印模式（裝置、計數與時間）")
+                watermarked_frame = self.add_dynamic_watermark(frame)
+            elif self._is_ecc():
+                print("使用錯誤更正浮水印模式（Reed-Solomon）")
+                watermarked_frame = self.add_ecc_watermark(frame)
+            elif self._is_bitplane():
+                print(f"使用多位元平面浮水印模式（{self.bitplane_channels.upper()} 通道各 {self.bitplane_bits} 位元）")
+                watermarked_frame = self.add_bitplane_watermark(frame)
             elif self.use_redundancy:
                 print("使用冗餘浮水印模式（LSB冗餘）")
                 watermarked_frame = self.add_invisible_watermark_redundancy(frame)
@@ -646,8 +1748,7 @@ class ScreenCapture:
             
             # 產生差異圖
             print("產生差異圖...")
-            difference_amplified = diff.astype(np.float32) * 1000
-            difference_amplified = np.clip(difference_amplified, 0, 255).astype(np.uint8)
+            difference_amplified = cv2.convertScaleAbs(diff, alpha=1000)
             cv2.imwrite(difference_path, difference_amplified)
             print(f"差異圖片已儲存至: {difference_path}")
             
@@ -665,8 +1766,11 @@ class ScreenCapture:
             cv2.putText(comparison, "Watermarked", (w + 10, 30), font, font_scale, font_color, font_thickness)
             cv2.putText(comparison, "Difference (x1000)", (w*2 + 10, 30), font, font_scale, font_color, font_thickness)
             cv2.imwrite(comparison_path, comparison)
+            self.last_comparison_id = self.comparison_cache.put(comparison, comparison_path)
             print(f"對比圖已儲存至: {comparison_path}")
             return comparison_path
+        except MemoryBudgetExceeded:
+            raise
         except Exception as e:
             print(f"截圖及比較失敗: {str(e)}")
             return None
@@ -685,17 +1789,12 @@ class ScreenCapture:
             if comparison_path is None:
                 return False, b'', ""
             
-            # 讀取比較圖像
-            comparison_img = cv2.imread(comparison_path)
-            if comparison_img is None:
+            # 比較圖已在記憶體快取中，直接編碼為 JPEG
+            encoded = self.comparison_cache.encode(self.last_comparison_id, "jpeg", 90)
+            if encoded is None:
                 return False, b'', ""
             
-            # 轉換為JPEG格式
-            ret, jpeg = cv2.imencode('.jpg', comparison_img, [cv2.IMWRITE_JPEG_QUALITY, 90])
-            if not ret:
-                return False, b'', ""
-            
-            return True, jpeg.tobytes(), comparison_path
+            return True, encoded[0], comparison_path
             
         except Exception as e:
             print(f"獲取比較圖像失敗: {str(e)}")
@@ -704,4 +1803,36 @@ class ScreenCapture:
     def __del__(self):
         """清理資源"""
         self.stop_recording()  # 確保錄影停止
-        self.sct.close() 
\ No newline at end of file
+        self._close_worker_pool()
+        self._close_frame_ring()
+        if self._sct is not None:
+            self._sct.close() 
+
+
+class WatermarkSettings:
+    """
+    暖機用的浮水印設定暫存物件
+    
+    只保存 WARM_SETTINGS 的屬性，設定方法直接沿用 ScreenCapture 的 set_watermark、
+    set_bitplane_layout 與 set_device_name，不需要建立完整的 ScreenCapture。
+    """
+    __slots__ = WARM_SETTINGS
+    
+    set_watermark = ScreenCapture.set_watermark
+    set_bitplane_layout = ScreenCapture.set_bitplane_layout
+    set_device_name = ScreenCapture.set_device_name
+    
+    def __init__(self, source):
+        """
+        複製設定
+        
+        Args:
+            source: ScreenCapture 或另一個 WatermarkSettings
+        """
+        for key in WARM_SETTINGS:
+            setattr(self, key, getattr(source, key))
+    
+    def apply_to(self, target):
+        """將設定寫入 ScreenCapture"""
+        for key in WARM_SETTINGS:
+            setattr(target, key, getattr(self, key))
@@ -0,0 +1,126 @@
+"""
+合成畫面來源模組
+
+在沒有桌面的環境（壓力測試、CI）中取代 mss 的螢幕擷取物件。
+以環境變數 LSB_CAPTURE_SOURCE=synthetic 啟用，解析度由 LSB_SYNTHETIC_SIZE（如 1920x1080）設定。
+
+每一幀都在左上角以黑白方塊寫入擷取時間（毫秒），方塊夠大，經過 JPEG 壓縮與浮水印處理後
+仍可由 read_timestamp 讀回，用來量測從擷取到觀看端收到畫面的延遲。
+"""
+import os
+import time
+import numpy as np
+from typing import Dict, List, Optional
+
+CAPTURE_SOURCE_ENV = "LSB_CAPTURE_SOURCE"
+SYNTHETIC_SIZE_ENV = "LSB_SYNTHETIC_SIZE"
+
+STAMP_BITS = 48
+STAMP_BLOCK = 16  # 每個位元方塊的邊長（像素）
+
+
+def open_capture():
+    """
+    依環境變數建立螢幕擷取物件
+
+    Returns:
+        mss 擷取物件，或設定為 synthetic 時的 SyntheticScreen
+    """
+    if os.environ.get(CAPTURE_SOURCE_ENV, "").lower() == "synthetic":
+        size = os.environ.get(SYNTHETIC_SIZE_ENV, "1920x1080").lower().split("x")
+        return SyntheticScreen(int(size[0]), int(size[1]))
+    import mss
+    return mss.mss()
+
+
+def stamp_timestamp(frame: np.ndarray, millis: int):
+    """
+    將時間戳以黑白方塊寫入影像左上角（就地修改）
+
+    Args:
+        frame: BGR 或 BGRA 影像
+        millis: 毫秒時間戳
+    """
+    for bit in range(STAMP_BITS):
+        value = 255 if (millis >> (STAMP_BITS - 1 - bit)) & 1 else 0
+        x = bit * STAMP_BLOCK
+        frame[:STAMP_BLOCK, x:x + STAMP_BLOCK, :3] = value
+
+
+def read_timestamp(frame: np.ndarray, scale: int = 1) -> Optional[int]:
+    """
+    讀回 stamp_timestamp 寫入的時間戳
+
+    Args:
+        frame: BGR 影像（可為 JPEG 解碼後的畫面）
+        scale: 影像相對原始畫面的縮小倍數（例如以 IMREAD_REDUCED_COLOR_4 解碼時為 4）
+
+    Returns:
+        Optional[int]: 毫秒時間戳，影像太小時返回 None
+    """
+    block = STAMP_BLOCK // scale
+    if block < 2 or frame.shape[0] < block or frame.shape[1] < STAMP_BITS * block:
+        return None
+    # 只取每個方塊中央，避開 JPEG 在方塊邊界的振鈴
+    margin = block // 4
+    rows = frame[margin:block - margin, :STAMP_BITS * block].astype(np.float32)
+    blocks = rows.reshape(rows.shape[0], STAMP_BITS, block, -1)[:, :, margin:block - margin]
+    bits = blocks.mean(axis=(0, 2, 3)) > 127
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+class SyntheticScreen:
+    """模擬 mss 介面的合成畫面來源"""
+
+    def __init__(self, width: int = 1920, height: int = 1080):
+        """
+        Args:
+            width: 畫面寬度
+            height: 畫面高度
+        """
+        self.width = width
+        self.height = height
+        monitor = {"left": 0, "top": 0, "width": width, "height": height}
+        self.monitors: List[Dict] = [dict(monitor), dict(monitor)]
+        self._frame_count = 0
+        self._base = self._build_base()
+
+    def _build_base(self) -> np.ndarray:
+        """產生類似桌面的靜態背景：淺色底、標題列與數個色塊視窗"""
+        rng = np.random.default_rng(0)
+        base = np.full((self.height, self.width, 4), 240, dtype=np.uint8)
+        base[:, :, 3] = 255
+        base[:max(1, self.height // 18), :, :3] = (60, 50, 50)
+        for _ in range(12):
+            x, y = int(rng.integers(0, max(1, self.width - 400))), int(rng.integers(60, max(61, self.height - 300)))
+            w, h = int(rng.integers(150, 600)), int(rng.integers(100, 400))
+            base[y:y + h, x:x + w, :3] = rng.integers(0, 256, 3, dtype=np.uint8)
+        # 加入細微雜訊，讓 JPEG 編碼成本接近真實畫面
+        base[:, :, :3] = np.clip(base[:, :, :3].astype(np.int16) + rng.integers(-6, 7, base[:, :, :3].shape), 0, 255)
+        return base
+
+    def grab(self, monitor: Dict) -> np.ndarray:
+        """
+        產生一幀 BGRA 影像
+
+        Args:
+            monitor: 擷取範圍（忽略，固定回傳整個合成畫面）
+
+        Returns:
+            np.ndarray: BGRA 影像
+        """
+        frame = self._base.copy()
+        # 移動的方塊模擬畫面內容變化
+        self._frame_count += 1
+        size = min(self.width, self.height) // 6
+        x = (self._frame_count * 8) % max(1, self.width - size)
+        y = self.height // 2
+        frame[y:y + size, x:x + size, :3] = (30, 144, 255)
+        stamp_timestamp(frame, int(time.time() * 1000))
+        return frame
+
+    def close(self):
+        """與 mss 介面相容，沒有需要釋放的資源"""
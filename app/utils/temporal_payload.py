@@ -0,0 +1,146 @@
+"""
+時間分散浮水印模組
+
+將含結束標記的浮水印內容切成多個小區塊，每個區塊附上序號、總數與檢查碼，
+每一幀只嵌入其中一個區塊。每幀的嵌入成本只有完整浮水印的一小部分，
+而解碼端從任意一段連續影格即可重建完整內容。
+
+區塊格式（皆為 8 位元）：魔術碼 | 序號 | 總區塊數 | 資料 × CHUNK_SIZE | 檢查碼
+"""
+import zlib
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+
+CHUNK_MAGIC = 0xA5
+CHUNK_SIZE = 4  # 每個區塊攜帶的資料位元組數
+HEADER_SIZE = 3  # 魔術碼、序號、總區塊數
+CHUNK_BITS = (HEADER_SIZE + CHUNK_SIZE + 1) * 8
+
+
+def build_chunks(text: str, chunk_size: int = CHUNK_SIZE) -> List[np.ndarray]:
+    """
+    將浮水印文字切成區塊並轉為位元陣列
+
+    Args:
+        text: 浮水印文字
+        chunk_size: 每個區塊的資料位元組數
+
+    Returns:
+        List[np.ndarray]: 每個區塊的位元陣列（0/1）
+    """
+    payload = bytes(ord(c) & 0xFF for c in text) + b'\0'
+    total = (len(payload) + chunk_size - 1) // chunk_size
+    if total > 255:
+        raise ValueError("浮水印文字過長，無法切分為時間分散區塊")
+
+    chunks = []
+    for seq in range(total):
+        data = payload[seq * chunk_size:(seq + 1) * chunk_size].ljust(chunk_size, b'\0')
+        body = bytes([CHUNK_MAGIC, seq, total]) + data
+        checksum = zlib.crc32(body) & 0xFF
+        chunks.append(np.unpackbits(np.frombuffer(body + bytes([checksum]), dtype=np.uint8)))
+    return chunks
+
+
+def embed_chunk(frame: np.ndarray, bits: np.ndarray) -> np.ndarray:
+    """
+    將區塊寫入藍色通道最低位元（由左上角開始，與標準 LSB 相同的位置）
+
+    Args:
+        frame: BGR 影像，記憶體連續時會被就地修改
+        bits: 區塊位元陣列
+
+    Returns:
+        np.ndarray: 嵌入區塊後的影像
+    """
+    if not frame.flags.c_contiguous:
+        frame = np.ascontiguousarray(frame)
+    blue = frame.reshape(-1)[0:len(bits) * 3:3]
+    blue &= 0xFE
+    blue |= bits
+    return frame
+
+
+def read_chunk(frame: np.ndarray, chunk_size: int = CHUNK_SIZE) -> Optional[Dict]:
+    """
+    從單一影格讀出區塊
+
+    Args:
+        frame: BGR 影像
+        chunk_size: 每個區塊的資料位元組數
+
+    Returns:
+        Optional[Dict]: 包含 seq、total、data 的區塊，格式或檢查碼錯誤則返回 None
+    """
+    nbits = (HEADER_SIZE + chunk_size + 1) * 8
+    flat = frame.reshape(-1)
+    if flat.size < nbits * 3:
+        return None
+    raw = np.packbits(flat[0:nbits * 3:3] & 1).tobytes()
+    body, checksum = raw[:-1], raw[-1]
+    if body[0] != CHUNK_MAGIC or zlib.crc32(body) & 0xFF != checksum:
+        return None
+    seq, total = body[1], body[2]
+    if total == 0 or seq >= total:
+        return None
+    return {"seq": seq, "total": total, "data": body[HEADER_SIZE:]}
+
+
+class TemporalDecoder:
+    """從連續影格重建時間分散浮水印"""
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.reset()
+
+    def reset(self):
+        """清除已收集的區塊"""
+        self.total = None
+        self.chunks: Dict[int, bytes] = {}
+
+    def feed(self, frame: np.ndarray) -> Optional[str]:
+        """
+        加入一個影格
+
+        Args:
+            frame: BGR 影像
+
+        Returns:
+            Optional[str]: 收齊所有區塊時返回浮水印文字，否則返回 None
+        """
+        chunk = read_chunk(frame, self.chunk_size)
+        if chunk is None:
+            return None
+        # 區塊總數或同序號的內容改變代表浮水印已更換，重新收集
+        previous = self.chunks.get(chunk["seq"])
+        if chunk["total"] != self.total or (previous is not None and previous != chunk["data"]):
+            self.reset()
+            self.total = chunk["total"]
+        self.chunks[chunk["seq"]] = chunk["data"]
+        if len(self.chunks) < self.total:
+            return None
+
+        payload = b''.join(self.chunks[seq] for seq in range(self.total))
+        end = payload.find(b'\0')
+        if end < 0:
+            return None
+        return payload[:end].decode('latin-1')
+
+
+def decode_frames(frames: Iterable[np.ndarray], chunk_size: int = CHUNK_SIZE) -> Optional[str]:
+    """
+    從一段連續影格中重建浮水印
+
+    Args:
+        frames: BGR 影像序列
+        chunk_size: 每個區塊的資料位元組數
+
+    Returns:
+        Optional[str]: 浮水印文字，影格不足以收齊所有區塊時返回 None
+    """
+    decoder = TemporalDecoder(chunk_size)
+    for frame in frames:
+        text = decoder.feed(frame)
+        if text is not None:
+            return text
+    return None
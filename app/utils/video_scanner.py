@@ -0,0 +1,309 @@
+"""
+錄影檔鑑識掃描模組
+
+將 recorded_video/ 下的錄影檔切分為多個區段，每個區段交由獨立行程解碼，
+並依處理頻率（frame_interval）只檢查可能嵌有浮水印的候選影格，
+最後彙整成帶有影格編號與時間戳的浮水印時間軸。
+錄影檔旁有索引檔（.idx）時，只檢查索引標記為已嵌入浮水印的影格。
+
+錄影以 mp4v 有損編碼，最低位元類的浮水印（lsb、redundant、dynamic、ecc、bitplane 等）不會保留下來，
+一般錄影中只有頻率域（dct）浮水印偵測得到；其他解碼器只適用於無損編碼或由截圖組成的影片。
+尚未鎖定相位時不逐格解碼，而是每隔幾個週期完整檢查一個週期（涵蓋所有相位），
+沒有浮水印的片段因此只解碼少數影格。冗餘版面的位置排列由主行程算好後傳給工作行程。
+
+處理頻率以擷取影格計算，錄影則以固定影格率輸出（擷取較慢時重複、較快時捨棄影格），
+浮水印在影片中相隔 interval × 影格率 / 擷取幀率 幀。擷取幀率取自參數或索引檔頭，
+即使不依索引挑選影格也會讀取；兩者都沒有時假設擷取幀率等於影格率。
+
+使用方式：
+    python -m app.utils.video_scanner recorded_video/recording_20250101_120000.mp4 --interval 5
+"""
+import cv2
+import numpy as np
+import os
+import json
+import math
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from ..core.decoder import EXTRACTORS
+from .frame_index import index_path_for, payload_id, read_index, watermarked_frames
+from .lsb_layout import positions_cached, preload_positions, redundancy_positions
+
+
+def _payload_source(mode: str, text: str) -> str:
+    """取得浮水印的來源識別：動態浮水印為裝置名稱，其餘為完整文字"""
+    return text.rsplit('#', 1)[0] if mode.startswith('dynamic') else text
+
+
+def _detect(frame: np.ndarray, modes: List[str], expected: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    以指定的解碼器檢查單一影格
+
+    Returns:
+        Optional[Tuple[str, str]]: (模式, 浮水印文字)，未偵測到則返回 None
+    """
+    for mode in modes:
+        text = EXTRACTORS[mode](frame)
+        if text and (expected is None or _payload_source(mode, text) == expected):
+            return mode, text
+    return None
+
+
+def _init_worker(shape: Tuple[int, int], positions: Optional[np.ndarray]):
+    """工作行程初始化：放入主行程算好的冗餘位置排列"""
+    if positions is not None:
+        preload_positions(shape, positions)
+
+
+def _shared_positions(shape: Tuple[int, int], modes: List[str]) -> Optional[np.ndarray]:
+    """
+    在主行程建立所選解碼器需要的冗餘位置排列（整個畫面只打亂一次）
+
+    以空白影格執行一次各解碼器，排列的長度因此涵蓋所有解碼器；不需要排列時返回 None。
+    """
+    blank = np.zeros((shape[0], shape[1], 3), dtype=np.uint8)
+    for mode in modes:
+        EXTRACTORS[mode](blank)
+    return redundancy_positions(shape) if positions_cached(shape) else None
+
+
+def _scan_segment(path: str, start: int, end: int, step: float, window: int,
+                  max_misses: int, modes: List[str], expected_text: Optional[str],
+                  candidates: Optional[List[int]] = None) -> Dict:
+    """
+    掃描單一區段（於工作行程中執行）
+
+    step 為浮水印在影片中的平均間隔（可為小數），搜尋時一個週期為 ceil(step) + window - 1 幀，
+    涵蓋對應到輸出影格時取整造成的較大間隔（預設 window 為 1 且不需換算時即為 interval 幀）。
+    尚未鎖定相位時，每 max_misses + 1 個週期逐格檢查其中一個週期（涵蓋所有相位），其餘影格只解封包不解碼；
+    偵測到浮水印後只檢查距上次命中 step 倍數 ± window 的影格，連續多個週期未命中則回到搜尋。
+    搜尋的間隔不超過時間軸合併的最大間隔，浮水印區間的開頭最多延後 max_misses 個週期才被偵測到。
+    提供 candidates（來自錄影索引）時只檢查這些影格，其餘影格只解封包不解碼。
+
+    Returns:
+        Dict: 區段內的偵測結果與統計
+    """
+    cap = cv2.VideoCapture(path)
+    detections = []
+    tested = 0
+    try:
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        idx = start
+        expected = None
+        misses = 0
+        search_from = start  # 目前或下一個逐格搜尋週期的起點
+        period = math.ceil(step) + window - 1
+        search_stride = period * (max_misses + 1)
+        indexed = set(candidates) if candidates is not None else None
+        while idx < end:
+            if not cap.grab():
+                break
+
+            if indexed is not None:
+                if idx in indexed:
+                    ok, frame = cap.retrieve()
+                    if ok:
+                        tested += 1
+                        result = _detect(frame, modes, expected_text)
+                        if result:
+                            detections.append({"frame": idx, "mode": result[0], "payload": result[1]})
+                idx += 1
+                continue
+
+            if expected is not None and idx > expected + window:
+                # 預期位置與搜尋窗都已錯過，記為一次未命中
+                misses += 1
+                expected += step
+                if misses > max_misses:
+                    expected = None
+                    misses = 0
+                    search_from = idx
+            if expected is None:
+                if idx >= search_from + period:
+                    # 整個週期都沒有命中，跳過幾個週期再搜尋
+                    search_from += search_stride
+                is_candidate = search_from <= idx < search_from + period
+            else:
+                is_candidate = abs(idx - expected) <= window
+
+            if is_candidate:
+                ok, frame = cap.retrieve()
+                if ok:
+                    tested += 1
+                    result = _detect(frame, modes, expected_text)
+                    if result:
+                        mode, text = result
+                        detections.append({"frame": idx, "mode": mode, "payload": text})
+                        expected = idx + step
+                        misses = 0
+            idx += 1
+    finally:
+        cap.release()
+    return {"start": start, "end": idx, "tested": tested, "detections": detections}
+
+
+def build_timeline(detections: List[Dict], fps: float, max_gap: int, min_hits: int = 2) -> List[Dict]:
+    """
+    將逐格偵測結果合併為時間軸區間（動態浮水印依裝置名稱合併）
+
+    Args:
+        detections: 依影格編號排序的偵測結果
+        fps: 錄影檔的影格率
+        max_gap: 同一浮水印兩次命中之間允許的最大影格間隔
+        min_hits: 區間至少需要的命中次數，用來排除雜訊造成的單次誤判
+
+    Returns:
+        List[Dict]: 時間軸區間列表
+    """
+    timeline = []
+    for det in detections:
+        last = timeline[-1] if timeline else None
+        payload = _payload_source(det["mode"], det["payload"])
+        if (last and last["payload"] == payload and last["mode"] == det["mode"]
+                and det["frame"] - last["last_frame"] <= max_gap):
+            last["last_frame"] = det["frame"]
+            last["end"] = round(det["frame"] / fps, 3)
+            last["hits"] += 1
+        else:
+            timeline.append({
+                "payload": payload,
+                "mode": det["mode"],
+                "first_frame": det["frame"],
+                "last_frame": det["frame"],
+                "start": round(det["frame"] / fps, 3),
+                "end": round(det["frame"] / fps, 3),
+                "hits": 1,
+            })
+    return [span for span in timeline if span["hits"] >= min_hits]
+
+
+def scan_video(path: str, interval: int = 5, window: int = 1, workers: Optional[int] = None,
+               segments: Optional[int] = None, modes: Optional[List[str]] = None,
+               expected: Optional[str] = None, max_misses: int = 3, use_index: bool = True,
+               capture_fps: Optional[float] = None) -> Dict:
+    """
+    平行掃描錄影檔中的浮水印
+
+    Args:
+        path: 錄影檔路徑
+        interval: 錄影時的處理頻率（每 N 個擷取影格嵌入一次）
+        window: 預期位置前後額外檢查的影格數；依擷取幀率換算間隔時再加 1 幀，容納對應到輸出影格時的取整
+        workers: 工作行程數，預設為 CPU 核心數
+        segments: 區段數，預設為工作行程數的兩倍以平衡負載
+        modes: 使用的解碼器，預設為全部（一般 mp4v 錄影只有 dct 偵測得到，見模組說明）
+        expected: 若提供，只接受與此文字（動態浮水印為裝置名稱）相符的浮水印
+        max_misses: 連續未命中多少個週期後重新逐格搜尋
+        use_index: 錄影檔旁有索引檔時，只檢查索引標記為已嵌入浮水印的影格
+        capture_fps: 錄影時的實際擷取幀率，None 表示讀取索引檔頭，兩者都沒有時視為與影格率相同
+
+    Returns:
+        Dict: 包含時間軸、逐格偵測結果與掃描統計
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"無法開啟錄影檔: {path}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+    cap.release()
+
+    interval = max(1, interval)
+    workers = workers or os.cpu_count() or 1
+    segments = max(1, min(segments or workers * 2, total or 1))
+    modes = modes or list(EXTRACTORS)
+    for mode in modes:
+        if mode not in EXTRACTORS:
+            raise ValueError(f"不支援的解碼模式: {mode}")
+
+    records = None
+    if os.path.exists(index_path_for(path)):
+        info, indexed = read_index(path)
+        capture_fps = capture_fps or info["capture_fps"]
+        if use_index:
+            records = indexed
+    # 處理頻率以擷取影格計算，換算為影片中的間隔
+    step = interval
+    if capture_fps and abs(capture_fps - fps) > 0.01:
+        step = interval * fps / capture_fps
+        window += 1
+
+    started = time.perf_counter()
+    positions = _shared_positions(shape, modes) if shape[0] and shape[1] else None
+    if records is not None:
+        # 依索引只檢查已嵌入浮水印的影格，候選影格平均分配到各區段
+        frames = watermarked_frames(records, payload_id(expected) if expected else None)
+        frames = frames[frames < total] if total else frames
+        jobs = [(int(chunk[0]), int(chunk[-1]) + 1, chunk.tolist())
+                for chunk in np.array_split(frames, min(segments, len(frames))) if len(chunk)] if len(frames) else []
+    else:
+        bounds = np.linspace(0, total, segments + 1).astype(int)
+        jobs = [(int(bounds[i]), int(bounds[i + 1]), None) for i in range(segments) if bounds[i + 1] > bounds[i]]
+    # 以 spawn 建立工作行程，避免 fork 時複製到其他執行緒正持有的鎖
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(shape, positions)) as executor:
+        futures = [
+            executor.submit(_scan_segment, path, start, end, step, window, max_misses, modes, expected, candidates)
+            for start, end, candidates in jobs
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    detections = [det for result in results for det in result["detections"]]
+    for det in detections:
+        det["timestamp"] = round(det["frame"] / fps, 3)
+        if records is not None and det["frame"] < len(records):
+            det["captured_at"] = float(records["timestamp"][det["frame"]])
+    duration = total / fps if fps else 0
+
+    return {
+        "path": path,
+        "fps": fps,
+        "frames": total,
+        "frames_tested": sum(result["tested"] for result in results),
+        "indexed": records is not None,
+        "capture_fps": capture_fps,
+        "step": round(step, 3),
+        "elapsed": round(elapsed, 3),
+        "realtime_factor": round(elapsed / duration, 4) if duration else None,
+        "timeline": build_timeline(detections, fps, math.ceil(step) * (max_misses + 1) + window),
+        "detections": detections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="平行掃描錄影檔中的浮水印")
+    parser.add_argument("path", help="錄影檔路徑")
+    parser.add_argument("--interval", type=int, default=5,
+                        help="錄影時的處理頻率（每 N 個擷取影格）；影片中的間隔依擷取幀率換算，見 --capture-fps")
+    parser.add_argument("--window", type=int, default=1, help="預期位置前後的搜尋影格數")
+    parser.add_argument("--workers", type=int, default=None, help="工作行程數")
+    parser.add_argument("--segments", type=int, default=None, help="區段數")
+    parser.add_argument("--modes", default=",".join(EXTRACTORS), help="解碼模式，以逗號分隔")
+    parser.add_argument("--expect", default=None, help="只接受此浮水印文字")
+    parser.add_argument("--capture-fps", type=float, default=None,
+                        help="錄影時的實際擷取幀率，預設讀取索引檔頭，沒有索引檔時視為與影片影格率相同")
+    parser.add_argument("--no-index", action="store_true", help="不依錄影索引檔挑選影格，逐格搜尋（仍讀取檔頭的擷取幀率）")
+    parser.add_argument("--json", dest="json_path", default=None, help="將結果寫入 JSON 檔")
+    args = parser.parse_args()
+
+    report = scan_video(args.path, args.interval, args.window, args.workers, args.segments,
+                        [mode for mode in args.modes.split(",") if mode], args.expect,
+                        use_index=not args.no_index, capture_fps=args.capture_fps)
+
+    print(f"掃描完成: {report['frames_tested']}/{report['frames']} 幀，耗時 {report['elapsed']} 秒，"
+          f"浮水印間隔 {report['step']} 幀")
+    for span in report["timeline"]:
+        print(f"  [{span['start']:>9.3f}s - {span['end']:>9.3f}s] "
+              f"幀 {span['first_frame']}-{span['last_frame']} ({span['mode']}, {span['hits']} 次): {span['payload']}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
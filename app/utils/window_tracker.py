@@ -0,0 +1,94 @@
+"""
+視窗追蹤模組
+
+依視窗標題找出目標視窗在擷取畫面中的矩形範圍，供浮水印只處理該區域。
+視窗查詢有系統呼叫成本，因此依固定間隔輪詢並快取結果；
+矩形需連續兩次輪詢都相同才會採用，拖曳或縮放視窗的過程中沿用上一個穩定位置，
+浮水印的位置與排列快取只在視窗真正移動或改變大小後重新計算一次。
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+# (x0, y0, x1, y1)，相對於擷取畫面左上角
+Region = Tuple[int, int, int, int]
+
+
+class WindowTracker:
+    """追蹤一個或多個視窗的位置"""
+
+    def __init__(self, titles: List[str], poll_interval: float = 0.25):
+        """
+        初始化視窗追蹤器
+
+        Args:
+            titles: 視窗標題（部分符合即可）
+            poll_interval: 重新查詢視窗位置的間隔秒數
+        """
+        self.titles = [title for title in titles if title]
+        self.poll_interval = poll_interval
+        self.available = True  # 目前平台是否支援視窗查詢
+        self.version = 0  # 每次採用新的矩形時加一
+        self._regions: List[Region] = []
+        self._pending: Optional[List[Region]] = None
+        self._last_poll = 0.0
+
+    def _query(self, monitor: Dict) -> List[Region]:
+        """
+        查詢目標視窗目前的矩形，並裁切到擷取範圍內
+
+        Args:
+            monitor: 擷取範圍（mss 的 left、top、width、height）
+
+        Returns:
+            List[Region]: 可見的視窗矩形
+        """
+        import pygetwindow
+
+        regions = []
+        for title in self.titles:
+            for window in pygetwindow.getWindowsWithTitle(title):
+                if window.isMinimized or window.width <= 0 or window.height <= 0:
+                    continue
+                x0 = max(0, window.left - monitor["left"])
+                y0 = max(0, window.top - monitor["top"])
+                x1 = min(monitor["width"], window.left + window.width - monitor["left"])
+                y1 = min(monitor["height"], window.top + window.height - monitor["top"])
+                if x1 > x0 and y1 > y0 and (x0, y0, x1, y1) not in regions:
+                    regions.append((x0, y0, x1, y1))
+        return regions
+
+    def regions(self, monitor: Dict) -> Optional[List[Region]]:
+        """
+        取得目標視窗的矩形
+
+        Args:
+            monitor: 擷取範圍（mss 的 left、top、width、height）
+
+        Returns:
+            Optional[List[Region]]: 視窗矩形列表（找不到視窗時為空列表），
+                目前平台無法查詢視窗時返回 None
+        """
+        if not self.available:
+            return None
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval:
+            return self._regions
+        self._last_poll = now
+
+        try:
+            current = self._query(monitor)
+        except Exception as e:
+            # pygetwindow 未安裝或目前平台不支援
+            print(f"無法查詢視窗位置，改為處理整個畫面: {str(e)}")
+            self.available = False
+            return None
+
+        if current == self._regions:
+            self._pending = None
+        elif current == self._pending or not self._regions:
+            self._regions = current
+            self._pending = None
+            self.version += 1
+        else:
+            self._pending = current
+        return self._regions
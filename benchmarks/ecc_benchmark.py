@@ -0,0 +1,208 @@
+"""
+錯誤更正浮水印測試
+
+比較標準 LSB、冗餘 LSB（每個位元重複 REDUNDANCY 次）、Reed-Solomon 錯誤更正
+（標準與分散版面）與多位元平面 LSB（三通道各 2 位元，單份與重複 BITPLANE_REPEAT 份）
+在隨機位元翻轉與裁切下的還原率，以及每幀的寫入位置數、改動的像素數與嵌入耗時。
+
+位元翻轉：每個位元組的最低位元以指定機率翻轉。
+裁切：保留左上角，去掉下方與右側各指定比例。錯誤更正解碼器會收到原始大小，
+缺少的位置視為抹除；其他解碼器沒有大小資訊，以補零還原為原始大小後解碼。
+長文字之後另以數個短文字測試一次：錯誤更正的標頭與同位位元組在短文字時佔比最高，
+分散版面的極短 ASCII 文字會改用冗餘 LSB（見 ecc_payload.prefers_repetition）。
+
+使用方式：
+    python -m benchmarks.ecc_benchmark --trials 20
+    python -m benchmarks.ecc_benchmark --flips 0.01 0.05 0.1 --crops 0.1 0.3
+    python -m benchmarks.ecc_benchmark --short-texts A ABCDE ABCDEFGHI
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from app.core.decoder import extract_ecc_redundant_text, extract_lsb_text, extract_redundant_text
+from app.utils.bitplane_payload import read_bitplane_text
+from app.utils.ecc_payload import read_ecc_text
+from app.utils.lsb_layout import REDUNDANCY
+from app.utils.screen_capture import ScreenCapture
+from benchmarks.dct_jpeg_benchmark import synthetic_desktop
+
+# (名稱, set_watermark 參數, 解碼函式 (影像, 原始大小) -> 文字)
+# 分散版面錯誤更正的極短文字以冗餘 LSB 嵌入，讀不到標頭時補零還原為原始大小，改用 ecc_redundant 解碼器
+SCHEMES = [
+    ("lsb", {}, lambda frame, shape: extract_lsb_text(frame)),
+    ("redundant", {"redundancy": True}, lambda frame, shape: extract_redundant_text(frame)),
+    ("ecc", {"ecc": True}, lambda frame, shape: read_ecc_text(frame, False, shape)),
+    ("ecc_redundant", {"redundancy": True, "ecc": True},
+     lambda frame, shape: read_ecc_text(frame, True, shape) or extract_ecc_redundant_text(pad(frame, shape))),
+    ("bitplane", {"bitplane": True}, lambda frame, shape: read_bitplane_text(frame)),
+    ("bitplane_redundant", {"redundancy": True, "bitplane": True}, lambda frame, shape: read_bitplane_text(frame)),
+]
+
+
+def flip_bits(frame: np.ndarray, rate: float, rng: np.random.Generator) -> np.ndarray:
+    """以指定機率翻轉每個位元組的最低位元"""
+    return frame ^ (rng.random(frame.shape) < rate).astype(np.uint8)
+
+
+def crop(frame: np.ndarray, ratio: float) -> np.ndarray:
+    """保留左上角，去掉下方與右側各 ratio 比例"""
+    height, width = frame.shape[:2]
+    return frame[:max(1, round(height * (1 - ratio))), :max(1, round(width * (1 - ratio)))]
+
+
+def pad(frame: np.ndarray, shape) -> np.ndarray:
+    """補零還原為原始大小（給沒有大小資訊的解碼器使用）"""
+    padded = np.zeros((shape[0], shape[1], 3), dtype=np.uint8)
+    padded[:frame.shape[0], :frame.shape[1]] = frame
+    return padded
+
+
+def changed_positions(frame: np.ndarray, marked: np.ndarray) -> int:
+    """嵌入前後改變的位置（像素 × 通道）數"""
+    return int(np.count_nonzero(frame != marked))
+
+
+def changed_pixels(frame: np.ndarray, marked: np.ndarray) -> int:
+    """嵌入前後任一通道改變的像素數"""
+    return int(np.count_nonzero((frame != marked).any(axis=2)))
+
+
+def scheme_writes(capture: ScreenCapture, name: str, text: str) -> int:
+    """目前設定下每幀寫入的位置數（錯誤更正分散版面改用冗餘 LSB 時以冗餘 LSB 計算）"""
+    if name == "lsb":
+        return (len(text.encode("utf-8")) + 1) * 8
+    if name == "redundant" or (name == "ecc_redundant" and capture._ecc_repetition()):
+        return (len(text) + 1) * 8 * REDUNDANCY
+    if name.startswith("bitplane"):
+        return capture._bitplane_payload[1].writes
+    return capture._ecc_payload[1].writes
+
+
+def measure(frames, text: str, flips, crops, trials: int, rng: np.random.Generator):
+    """
+    以一段文字測試所有模式
+
+    Args:
+        frames: BGR 影像列表
+        text: 浮水印文字
+        flips: 位元翻轉機率
+        crops: 裁切比例
+        trials: 每種破壞、每個畫面的測試次數
+        rng: 亂數產生器
+
+    Returns:
+        list: 每個模式一列 (名稱, 寫入位置, 實際改變, 改變像素, 嵌入 ms, 翻轉還原率, 裁切還原率)
+    """
+    capture = ScreenCapture()
+    rows = []
+    for name, options, extract in SCHEMES:
+        capture.set_watermark(text, **options)
+        embed_times, changed, pixels = [], [], []
+        marked_frames = []
+        for frame in frames:
+            # 冗餘模式每次嵌入都會輸出訊息，測試時略過；第一次嵌入會建立排列與編碼器，不計入耗時
+            with contextlib.redirect_stdout(io.StringIO()):
+                capture._apply_watermark_region(frame.copy())
+                for _ in range(5):
+                    source = frame.copy()
+                    start = time.perf_counter()
+                    marked = capture._apply_watermark_region(source)
+                    embed_times.append(time.perf_counter() - start)
+            marked_frames.append(marked)
+            changed.append(changed_positions(frame, marked))
+            pixels.append(changed_pixels(frame, marked))
+        writes = scheme_writes(capture, name, text)
+
+        flip_rates = {}
+        for rate in flips:
+            passed = sum(extract(flip_bits(marked, rate, rng), marked.shape[:2]) == text
+                         for marked in marked_frames for _ in range(trials))
+            flip_rates[rate] = passed / (len(marked_frames) * trials)
+        crop_rates = {}
+        for ratio in crops:
+            passed = 0
+            for marked in marked_frames:
+                cropped = crop(marked, ratio)
+                if name.startswith("ecc"):
+                    passed += extract(cropped, marked.shape[:2]) == text
+                else:
+                    passed += extract(pad(cropped, marked.shape[:2]), marked.shape[:2]) == text
+            crop_rates[ratio] = passed / len(marked_frames)
+        rows.append((name, writes, np.mean(changed), np.mean(pixels), np.mean(embed_times) * 1000,
+                     flip_rates, crop_rates))
+    return rows
+
+
+def run(frames, text: str, flips, crops, trials: int, seed: int, short_texts=()):
+    """
+    執行測試並輸出結果表
+
+    Args:
+        frames: BGR 影像列表
+        text: 浮水印文字
+        flips: 位元翻轉機率
+        crops: 裁切比例
+        trials: 每種破壞、每個畫面的測試次數
+        seed: 亂數種子
+        short_texts: 另外測試的短文字，結果合併為一張表
+    """
+    rng = np.random.default_rng(seed)
+    print(f"畫面數: {len(frames)}  大小: {frames[0].shape[1]}x{frames[0].shape[0]}  文字長度: {len(text)}  "
+          f"每格測試次數: {trials}")
+    print_table([(len(text), row) for row in measure(frames, text, flips, crops, trials, rng)], flips, crops)
+    if short_texts:
+        print()
+        print("短文字：")
+        rows = [(len(short), row) for short in short_texts
+                for row in measure(frames, short, flips, crops, trials, rng)]
+        print_table(rows, flips, crops, lengths=True)
+
+
+def print_table(rows, flips, crops, lengths: bool = False):
+    """
+    輸出 Markdown 結果表
+
+    Args:
+        rows: (文字長度, measure 返回的一列) 列表
+        flips: 位元翻轉機率
+        crops: 裁切比例
+        lengths: 是否加上文字長度欄
+    """
+    header = ["模式"] + (["文字長度"] if lengths else []) + ["寫入位置", "實際改變", "改變像素", "嵌入 ms"]
+    header += [f"翻轉 {rate * 100:g}%" for rate in flips] + [f"裁切 {ratio * 100:g}%" for ratio in crops]
+    print("| " + " | ".join(header) + " |")
+    print("|" + "---|" * len(header))
+    for length, (name, writes, changed, pixels, cost, flip_rates, crop_rates) in rows:
+        cells = [name] + ([str(length)] if lengths else [])
+        cells += [str(writes), f"{changed:.0f}", f"{pixels:.0f}", f"{cost:.3f}"]
+        cells += [f"{flip_rates[rate] * 100:.0f}%" for rate in flips]
+        cells += [f"{crop_rates[ratio] * 100:.0f}%" for ratio in crops]
+        print("| " + " | ".join(cells) + " |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="錯誤更正浮水印測試")
+    parser.add_argument("--frames", type=int, default=3, help="合成畫面數")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--text", default="LSB-Watermark-Benchmark user=alice@example.com", help="浮水印文字")
+    parser.add_argument("--flips", type=float, nargs="+", default=[0.001, 0.01, 0.05, 0.1, 0.15],
+                        help="位元翻轉機率，可指定多個")
+    parser.add_argument("--crops", type=float, nargs="+", default=[0.1, 0.25, 0.5], help="裁切比例，可指定多個")
+    parser.add_argument("--short-texts", nargs="*", default=["A", "ABCDE", "ABCDEFGHI"],
+                        help="另外測試的短文字，可指定多個；不指定任何文字則略過")
+    parser.add_argument("--trials", type=int, default=10, help="每種翻轉機率、每個畫面的測試次數")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    frames = [synthetic_desktop(rng, args.width, args.height) for _ in range(args.frames)]
+    run(frames, args.text, args.flips, args.crops, args.trials, args.seed, args.short_texts)
+
+
+if __name__ == "__main__":
+    main()
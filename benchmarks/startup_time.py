@@ -0,0 +1,86 @@
+"""
+匯入與啟動時間測試
+
+分別在乾淨的子行程中測量：
+1. 匯入 app.main 的耗時，以及匯入後是否已載入 cv2、numpy、mss、psutil 等重量級模組
+2. 以 uvicorn 啟動伺服器到首頁第一次回應的耗時
+
+使用方式：
+    python -m benchmarks.startup_time --runs 5
+"""
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+HEAVY_MODULES = ("cv2", "numpy", "mss", "psutil", "pygetwindow")
+
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import() -> dict:
+    """在子行程中匯入 app.main 並回報耗時與已載入的重量級模組"""
+    output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(timeout: float = 30.0) -> float:
+    """啟動 uvicorn 並測量到首頁第一次回應的秒數"""
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                    return time.perf_counter() - start
+            except urllib.error.HTTPError:
+                # 伺服器已能處理請求，狀態碼不影響啟動時間
+                return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError("伺服器未在時限內回應")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="匯入與啟動時間測試")
+    parser.add_argument("--runs", type=int, default=5, help="重複次數")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    startups = [measure_first_response() for _ in range(args.runs)]
+
+    import_ms = [result["elapsed"] * 1000 for result in imports]
+    startup_ms = [elapsed * 1000 for elapsed in startups]
+    print(f"匯入 app.main: 中位數 {statistics.median(import_ms):.1f} ms（最小 {min(import_ms):.1f} ms）")
+    print(f"啟動到首頁回應: 中位數 {statistics.median(startup_ms):.1f} ms（最小 {min(startup_ms):.1f} ms）")
+    loaded = imports[-1]["loaded"]
+    print(f"匯入後已載入的重量級模組: {', '.join(loaded) if loaded else '無'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+WebSocket 壓力測試
+
+以合成畫面來源（LSB_CAPTURE_SOURCE=synthetic）啟動伺服器，依序以不同數量的並行用戶端連線：
+- /api/stream 用戶端接收畫面，並依設定的頻率送出 config、screenshot、compare_images 訊息
+- /api/ws 控制用戶端反覆送出帶有新設定的 start 訊息並等待 performance 回應
+
+每一輪輸出每個用戶端實際收到的幀率、擷取到收到畫面的延遲百分位數、
+控制訊息往返時間，以及伺服器行程的 CPU 與記憶體用量。
+
+使用方式：
+    python -m benchmarks.ws_load --clients 1 4 16 --duration 10
+    python -m benchmarks.ws_load --clients 8 --control-clients 8 --size 3840x2160
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import cv2
+import numpy as np
+import psutil
+import websockets
+
+from app.utils.synthetic_capture import read_timestamp
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# 解碼畫面時縮小的倍數，只為讀出時間戳，降低壓測端本身的負擔
+DECODE_SCALE = 4
+
+
+def create_app():
+    """
+    uvicorn 工廠函式：主應用程式再加上舊版 /api/ws 控制端點
+
+    主應用程式只掛載 /api/stream，壓力測試需要同時涵蓋舊版控制通道。
+    """
+    from app.main import app
+    from app.api.watermark import router as legacy_router
+    app.include_router(legacy_router, prefix="/api")
+    return app
+
+
+def start_server(port: int, size: str, workdir: str) -> subprocess.Popen:
+    """
+    在子行程中以合成畫面來源啟動伺服器
+
+    Args:
+        port: 連接埠
+        size: 合成畫面解析度，例如 1920x1080
+        workdir: 伺服器工作目錄（截圖與比較圖會寫在這裡）
+
+    Returns:
+        subprocess.Popen: 伺服器行程
+    """
+    env = dict(os.environ)
+    env.update({
+        "LSB_CAPTURE_SOURCE": "synthetic",
+        "LSB_SYNTHETIC_SIZE": size,
+        "LSB_NO_OPEN_FOLDER": "1",
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")])),
+    })
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.ws_load:create_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1):
+                return server
+        except (urllib.error.URLError, OSError):
+            if server.poll() is not None:
+                raise RuntimeError("伺服器啟動失敗")
+            time.sleep(0.1)
+    server.terminate()
+    raise TimeoutError("伺服器未在時限內啟動")
+
+
+def _config_message(processing: bool = True) -> str:
+    """產生一則隨機但合理的 config 訊息"""
+    visibility = random.choice(["invisible", "invisible", "visible", "dct"])
+    return json.dumps({"type": "config", "data": {
+        "watermarkText": f"load-test-{random.randint(0, 999)}",
+        "watermarkVisible": visibility == "visible",
+        "watermarkRedundancy": False,
+        "watermarkTemporal": False,
+        "watermarkDct": visibility == "dct",
+        "frameInterval": random.choice([1, 5, 10]),
+        "processing": processing,
+    }})
+
+
+async def _send_schedule(ws, duration: float, rates: dict, stats: dict):
+    """依各訊息類型的頻率（每秒次數）隨機送出控制訊息"""
+    end = time.perf_counter() + duration
+    messages = {
+        "config": lambda: _config_message(),
+        "screenshot": lambda: json.dumps({"type": "screenshot"}),
+        "compare_images": lambda: json.dumps({"type": "compare_images"}),
+    }
+    total_rate = sum(rates.values())
+    if total_rate <= 0:
+        return
+    while True:
+        delay = random.expovariate(total_rate)
+        if time.perf_counter() + delay >= end:
+            return
+        await asyncio.sleep(delay)
+        kind = random.choices(list(rates), weights=list(rates.values()))[0]
+        await ws.send(messages[kind]())
+        stats["sent"] += 1
+
+
+async def stream_client(url: str, duration: float, rates: dict, sample_every: int) -> dict:
+    """
+    /api/stream 用戶端：接收畫面並量測幀率與延遲
+
+    Returns:
+        dict: frames、latencies（毫秒）、sent、errors
+    """
+    stats = {"frames": 0, "latencies": [], "sent": 0, "errors": 0, "replies": 0}
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            await ws.send(_config_message())
+            sender = asyncio.create_task(_send_schedule(ws, duration, rates, stats))
+            end = time.perf_counter() + duration
+            while (remaining := end - time.perf_counter()) > 0:
+                try:
+                    message = await asyncio.wait_for(ws.recv(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if isinstance(message, str):
+                    stats["replies"] += 1
+                    continue
+                stats["frames"] += 1
+                if stats["frames"] % sample_every:
+                    continue
+                # 比較圖也是二進位訊息，讀不出合理時間戳的直接略過
+                frame = cv2.imdecode(np.frombuffer(message, dtype=np.uint8), cv2.IMREAD_REDUCED_COLOR_4)
+                stamp = read_timestamp(frame, DECODE_SCALE) if frame is not None else None
+                latency = time.time() * 1000 - stamp if stamp else None
+                if latency is not None and 0 <= latency < 60000:
+                    stats["latencies"].append(latency)
+            sender.cancel()
+    except Exception:
+        stats["errors"] += 1
+    return stats
+
+
+async def control_client(url: str, duration: float, rate: float) -> dict:
+    """
+    /api/ws 控制用戶端：送出設定並量測 performance 回應的往返時間
+
+    Returns:
+        dict: rtts（毫秒）、sent、errors
+    """
+    stats = {"rtts": [], "sent": 0, "errors": 0}
+    try:
+        async with websockets.connect(url) as ws:
+            await ws.send(json.dumps({"type": "start", "watermark_text": "load-test", "process_interval": 5}))
+            await asyncio.wait_for(ws.recv(), timeout=5)
+            end = time.perf_counter() + duration
+            while rate > 0 and time.perf_counter() < end:
+                await asyncio.sleep(random.expovariate(rate))
+                start = time.perf_counter()
+                # 舊版端點的處理狀態是全域共用的，任一控制端斷線就會停止處理而不再回應，
+                # 因此每次都以 start 帶入新設定，避免把其他用戶端結束誤判為逾時
+                await ws.send(json.dumps({"type": "start", "watermark_text": "load-test",
+                                          "process_interval": random.choice([1, 5, 10])}))
+                stats["sent"] += 1
+                await asyncio.wait_for(ws.recv(), timeout=5)
+                stats["rtts"].append((time.perf_counter() - start) * 1000)
+    except Exception:
+        stats["errors"] += 1
+    return stats
+
+
+async def _sample_server(process: psutil.Process, duration: float) -> dict:
+    """在測試期間取樣伺服器行程的 CPU 與記憶體"""
+    process.cpu_percent(None)
+    peak_rss = process.memory_info().rss
+    end = time.perf_counter() + duration
+    started = time.perf_counter()
+    while time.perf_counter() < end:
+        await asyncio.sleep(0.5)
+        peak_rss = max(peak_rss, process.memory_info().rss)
+    cpu = process.cpu_percent(None)
+    return {"cpu": cpu, "rss_mb": peak_rss / (1024 * 1024), "elapsed": time.perf_counter() - started}
+
+
+async def run_step(port: int, clients: int, control_clients: int, duration: float,
+                   rates: dict, control_rate: float, sample_every: int, process: psutil.Process) -> dict:
+    """以指定的用戶端數量執行一輪測試並彙整結果"""
+    stream_url = f"ws://127.0.0.1:{port}/api/stream"
+    control_url = f"ws://127.0.0.1:{port}/api/ws"
+    tasks = [stream_client(stream_url, duration, rates, sample_every) for _ in range(clients)]
+    tasks += [control_client(control_url, duration, control_rate) for _ in range(control_clients)]
+    results, server = await asyncio.gather(asyncio.gather(*tasks), _sample_server(process, duration))
+
+    streams, controls = results[:clients], results[clients:]
+    latencies = np.array([value for result in streams for value in result["latencies"]])
+    rtts = np.array([value for result in controls for value in result["rtts"]])
+    fps = [result["frames"] / duration for result in streams]
+
+    def percentile(values, q):
+        return float(np.percentile(values, q)) if len(values) else float("nan")
+
+    return {
+        "clients": clients,
+        "control_clients": control_clients,
+        "fps_per_client": float(np.mean(fps)) if fps else 0.0,
+        "fps_min": float(np.min(fps)) if fps else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "control_rtt_p50": percentile(rtts, 50),
+        "control_rtt_p95": percentile(rtts, 95),
+        "messages_sent": sum(result["sent"] for result in results),
+        "errors": sum(result["errors"] for result in results),
+        "server_cpu": server["cpu"],
+        "server_rss_mb": server["rss_mb"],
+    }
+
+
+def print_table(rows):
+    """以 markdown 表格輸出結果"""
+    print("| 用戶端 | 控制端 | fps/用戶端 (最低) | 延遲 p50/p95/p99 (ms) | 控制往返 p50/p95 (ms) "
+          "| 伺服器 CPU % | 伺服器記憶體 (MB) | 訊息數 | 錯誤 |")
+    print("|---|---|---|---|---|---|---|---|---|")
+    for row in rows:
+        print(f"| {row['clients']} | {row['control_clients']} "
+              f"| {row['fps_per_client']:.1f} ({row['fps_min']:.1f}) "
+              f"| {row['latency_p50']:.0f}/{row['latency_p95']:.0f}/{row['latency_p99']:.0f} "
+              f"| {row['control_rtt_p50']:.1f}/{row['control_rtt_p95']:.1f} "
+              f"| {row['server_cpu']:.0f} | {row['server_rss_mb']:.0f} "
+              f"| {row['messages_sent']} | {row['errors']} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket 壓力測試")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8], help="每一輪的 /api/stream 用戶端數")
+    parser.add_argument("--control-clients", type=int, default=None,
+                        help="每一輪的 /api/ws 控制用戶端數，預設與串流用戶端相同")
+    parser.add_argument("--duration", type=float, default=10.0, help="每一輪的秒數")
+    parser.add_argument("--size", default="1920x1080", help="合成畫面解析度")
+    parser.add_argument("--config-rate", type=float, default=0.5, help="每個用戶端每秒送出的 config 數")
+    parser.add_argument("--screenshot-rate", type=float, default=0.05, help="每個用戶端每秒送出的 screenshot 數")
+    parser.add_argument("--compare-rate", type=float, default=0.02, help="每個用戶端每秒送出的 compare_images 數")
+    parser.add_argument("--control-rate", type=float, default=2.0, help="每個控制用戶端每秒送出的設定更新數")
+    parser.add_argument("--sample-every", type=int, default=1, help="每 N 幀量測一次延遲")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", dest="json_path", default=None, help="將結果寫入 JSON 檔")
+    args = parser.parse_args()
+
+    rates = {"config": args.config_rate, "screenshot": args.screenshot_rate, "compare_images": args.compare_rate}
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="lsb-load-") as workdir:
+        server = start_server(args.port, args.size, workdir)
+        try:
+            process = psutil.Process(server.pid)
+            for clients in args.clients:
+                control_clients = clients if args.control_clients is None else args.control_clients
+                row = asyncio.run(run_step(args.port, clients, control_clients, args.duration, rates,
+                                           args.control_rate, max(1, args.sample_every), process))
+                rows.append(row)
+                print(f"完成 {clients} 個用戶端: {row['fps_per_client']:.1f} fps/用戶端", file=sys.stderr)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print_table(rows)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""錯誤更正浮水印測試：同位位元組數隨文字長度變化、裁切抹除與短文字改用冗餘 LSB"""
+import numpy as np
+import pytest
+
+from app.core.decoder import extract_ecc_redundant_text
+from app.utils.ecc_payload import (DEFAULT_NSYM, ECC_REPEAT, MIN_NSYM, EccPayload, encode_text, parity_size,
+                                   prefers_repetition, read_ecc_text)
+from app.utils.lsb_layout import REDUNDANCY
+
+SHAPE = (180, 320)
+
+
+def _frame(seed=0):
+    return np.random.default_rng(seed).integers(0, 256, SHAPE + (3,), dtype=np.uint8)
+
+
+def test_parity_scales_with_block_length():
+    assert parity_size(1) == MIN_NSYM
+    assert parity_size(20) == 20
+    assert parity_size(200) == DEFAULT_NSYM
+    # 標頭 14 個位元組 + 資料 + 同位
+    assert len(encode_text("A")) == 14 + 1 + MIN_NSYM
+    assert len(encode_text("x" * 46)) == 14 + 46 + DEFAULT_NSYM
+
+
+@pytest.mark.parametrize("text", ["A", "short text", "x" * 46, "浮水印測試", "y" * 600])
+@pytest.mark.parametrize("redundant", [False, True])
+def test_round_trip(text, redundant):
+    encoder = EccPayload(text, SHAPE, redundant)
+    assert encoder.fits()
+    assert read_ecc_text(encoder.embed(_frame()), redundant) == text
+
+
+def test_crop_is_decoded_as_erasures():
+    text = "cropped payload"
+    marked = EccPayload(text, SHAPE, True).embed(_frame())
+    cropped = marked[:, :int(SHAPE[1] * 0.9)]
+    assert read_ecc_text(cropped, True) is None
+    assert read_ecc_text(cropped, True, SHAPE) == text
+
+
+@pytest.mark.parametrize("text", ["A", "ABCDE", "ABCDEFGH", "ABCDEFGHI", "x" * 46])
+def test_redundant_layout_never_writes_more_than_repetition(text):
+    repetition = (len(text) + 1) * 8 * REDUNDANCY
+    writes = repetition if prefers_repetition(text) else len(encode_text(text)) * 8 * ECC_REPEAT
+    assert writes <= repetition
+
+
+def test_non_ascii_text_keeps_ecc():
+    # 冗餘 LSB 每個字元固定 8 位元，無法表示非 ASCII 文字
+    assert not prefers_repetition("測")
+
+
+def test_short_text_falls_back_to_redundant_lsb():
+    from app.utils.screen_capture import ScreenCapture
+
+    capture = ScreenCapture()
+    capture.set_watermark("ABCDE", redundancy=True, ecc=True)
+    assert capture._watermark_mode_label() == "lsb_redundant"
+    marked = capture._apply_watermark_region(_frame())
+    assert read_ecc_text(marked, True) is None
+    assert extract_ecc_redundant_text(marked) == "ABCDE"
+
+    capture.set_watermark("ABCDEFGHI", redundancy=True, ecc=True)
+    assert capture._watermark_mode_label() == "ecc_redundant"
+    assert extract_ecc_redundant_text(capture._apply_watermark_region(_frame())) == "ABCDEFGHI"
@@ -0,0 +1,107 @@
+"""Reed-Solomon 編解碼測試：系統式編碼、錯誤與抹除修正、縮短碼與超出修正能力"""
+import numpy as np
+import pytest
+
+from app.utils.reed_solomon import FIELD_SIZE, gf_mul, rs_decode, rs_encode, syndromes
+
+
+def _messages(rng, blocks, length):
+    return rng.integers(0, 256, (blocks, length), dtype=np.uint8)
+
+
+def _corrupt(codewords, rng, count):
+    """每個區塊在 count 個不同位置寫入不同的值，返回損毀後的碼字與位置"""
+    damaged = codewords.copy()
+    positions = []
+    for row in damaged:
+        where = rng.choice(len(row), count, replace=False)
+        row[where] ^= rng.integers(1, 256, count, dtype=np.uint8)
+        positions.append(where)
+    return damaged, positions
+
+
+def test_gf_mul_identities():
+    values = np.arange(256, dtype=np.uint8)
+    assert np.array_equal(gf_mul(values, 1), values)
+    assert not gf_mul(values, 0).any()
+    # 2 的 255 次方回到 1
+    acc = np.uint8(1)
+    for _ in range(FIELD_SIZE):
+        acc = gf_mul(acc, 2)
+    assert acc == 1
+
+
+@pytest.mark.parametrize("nsym", [8, 16, 32])
+def test_encode_is_systematic_with_zero_syndromes(nsym):
+    rng = np.random.default_rng(nsym)
+    messages = _messages(rng, 4, 40)
+    codewords = rs_encode(messages, nsym)
+    assert codewords.shape == (4, 40 + nsym)
+    assert np.array_equal(codewords[:, :40], messages)
+    assert not syndromes(codewords, nsym).any()
+
+
+@pytest.mark.parametrize("length,nsym", [(1, 8), (9, 9), (46, 32), (FIELD_SIZE - 32, 32)])
+def test_decode_clean_round_trip(length, nsym):
+    rng = np.random.default_rng(length)
+    messages = _messages(rng, 3, length)
+    data, ok = rs_decode(rs_encode(messages, nsym), nsym)
+    assert ok.all()
+    assert np.array_equal(data, messages)
+
+
+@pytest.mark.parametrize("length,nsym", [(5, 8), (40, 16), (FIELD_SIZE - 32, 32)])
+def test_corrects_up_to_half_nsym_errors(length, nsym):
+    rng = np.random.default_rng(length + nsym)
+    messages = _messages(rng, 5, length)
+    damaged, _ = _corrupt(rs_encode(messages, nsym), rng, nsym // 2)
+    data, ok = rs_decode(damaged, nsym)
+    assert ok.all()
+    assert np.array_equal(data, messages)
+
+
+@pytest.mark.parametrize("length,nsym", [(5, 8), (40, 16), (100, 32)])
+def test_corrects_nsym_erasures(length, nsym):
+    rng = np.random.default_rng(length * nsym)
+    messages = _messages(rng, 5, length)
+    damaged, positions = _corrupt(rs_encode(messages, nsym), rng, nsym)
+    data, ok = rs_decode(damaged, nsym, positions)
+    assert ok.all()
+    assert np.array_equal(data, messages)
+
+
+def test_corrects_mixed_errors_and_erasures():
+    rng = np.random.default_rng(7)
+    nsym = 16
+    messages = _messages(rng, 6, 30)
+    codewords = rs_encode(messages, nsym)
+    damaged = codewords.copy()
+    erasures = []
+    for row in damaged:
+        # 2 × 錯誤數 + 抹除數 = 4 × 2 + 8 = nsym
+        where = rng.choice(len(row), 12, replace=False)
+        row[where] ^= rng.integers(1, 256, 12, dtype=np.uint8)
+        erasures.append(where[:8])
+    data, ok = rs_decode(damaged, nsym, erasures)
+    assert ok.all()
+    assert np.array_equal(data, messages)
+
+
+def test_erasure_of_undamaged_position_is_harmless():
+    rng = np.random.default_rng(3)
+    messages = _messages(rng, 2, 20)
+    codewords = rs_encode(messages, 8)
+    data, ok = rs_decode(codewords, 8, [[0, 5, 27], []])
+    assert ok.all()
+    assert np.array_equal(data, messages)
+
+
+def test_reports_failure_beyond_capacity():
+    rng = np.random.default_rng(11)
+    nsym = 16
+    messages = _messages(rng, 8, 60)
+    damaged, _ = _corrupt(rs_encode(messages, nsym), rng, nsym)
+    data, ok = rs_decode(damaged, nsym)
+    # 超出修正能力的區塊不得回報成功卻返回錯誤的資料
+    assert not (ok & ~(data == messages).all(axis=1)).any()
+    assert not ok.all()